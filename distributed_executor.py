@@ -1,12 +1,20 @@
 import threading
-import queue
 import time
 import json
-from typing import Callable, Dict, List
+import asyncio
+import itertools
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
 import socket
 from zeroconf import Zeroconf, ServiceBrowser, ServiceInfo
 import logging
-import requests  # ✅ تأكد من استيراده
+
+from offload_core import (admission, http_pool, batching, wire, result_cache, single_flight, map_reduce,
+                          object_store)
+from offload_core.priority import INTERACTIVE, BATCH, DeadlineQueue, make_envelope
+from offload_core.scheduler import LOCAL, get_scheduler
+from offload_core.peer_health import get_health, observe
 
 logging.basicConfig(level=logging.INFO)
 
@@ -14,23 +22,42 @@ class PeerRegistry:
     def __init__(self):
         self._peers = {}
         self._zeroconf = Zeroconf()
+        self._service = None
         self.local_node_id = socket.gethostname()
 
-    def register_service(self, name: str, port: int, load: float = 0.0):
+    def register_service(self, name: str, port: int, load: float = None):
+        """تسجيل العقدة عبر mDNS؛ خصائص load / capacity / free_* / queued تُحدَّث بعدها
+        من حالة منافذ العقدة (offload_core.admission.publish)"""
+        properties = admission.idle_advertisement()
+        if load is not None:
+            properties["load"] = load
+        properties["node_id"] = self.local_node_id
         service_info = ServiceInfo(
             "_tasknode._tcp.local.",
             f"{name}._tasknode._tcp.local.",
             addresses=[socket.inet_aton(self._get_local_ip())],
             port=port,
-            properties={
-                b'load': str(load).encode(),   # تأكد من أنها bytes
-                b'node_id': self.local_node_id.encode()
-            },
+            properties={k.encode(): str(v).encode() for k, v in properties.items()},   # تأكد من أنها bytes
             server=f"{name}.local."
         )
         self._zeroconf.register_service(service_info)
+        self._service = service_info
+        admission.register_advertiser(self.advertise)
         logging.info(f"✅ Service registered: {name} @ {self._get_local_ip()}:{port}")
 
+    def advertise(self, **props) -> bool:
+        """تحديث خصائص TXT للخدمة المسجّلة (False إن لم تُسجَّل بعد)"""
+        info = self._service
+        if info is None:
+            return False
+        properties = dict(info.properties or {})
+        properties.update({k.encode(): str(v).encode() for k, v in props.items()})
+        info = ServiceInfo(info.type, info.name, addresses=info.addresses, port=info.port,
+                           properties=properties, server=info.server)
+        self._zeroconf.update_service(info)
+        self._service = info
+        return True
+
     def discover_peers(self, timeout: int = 3) -> List[Dict]:
         class Listener:
             def __init__(self):
@@ -44,6 +71,7 @@ class PeerRegistry:
                         'ip': ip,
                         'port': info.port,
                         'load': float(info.properties.get(b'load', b'0')),
+                        'capacity': int(info.properties.get(b'capacity', b'1')),
                         'node_id': info.properties.get(b'node_id', b'unknown').decode(),
                         'last_seen': time.time()
                     }
@@ -73,13 +101,23 @@ class PeerRegistry:
         return ip
 
 class DistributedExecutor:
-    def __init__(self, shared_secret: str):
+    def __init__(self, shared_secret: str, max_workers: int = 32, max_cached_results: int = 1000,
+                 use_batching: bool = False, use_map_reduce: bool = False, interactive_workers: int = None):
         self.peer_registry = PeerRegistry()
         self.shared_secret = shared_secret
-        self.task_queue = queue.PriorityQueue()
-        self.result_cache = {}
+        self.task_queue = DeadlineQueue()
+        self.result_cache = OrderedDict()
+        self._results_lock = threading.Lock()   # العمّال يكتبون result_cache من خيوط متعددة
+        self.max_cached_results = max_cached_results
         self.available_peers = []
+        self.use_batching = use_batching
+        self.use_map_reduce = use_map_reduce
+        self._seq = itertools.count()
+        self._workers: List[threading.Thread] = []
         self._init_peer_discovery()
+        # عمّال محجوزون للمهام التفاعلية كي لا يحجبها حمل الخلفية
+        reserved = max(1, max_workers // 8) if interactive_workers is None else interactive_workers
+        self._start_workers(max_workers, min(reserved, max_workers - 1))
 
     def _init_peer_discovery(self):
         def discovery_loop():
@@ -90,35 +128,168 @@ class DistributedExecutor:
 
         threading.Thread(target=discovery_loop, daemon=True).start()
 
-    def submit(self, task_func: Callable, *args, **kwargs):
-        """إرسال مهمة جديدة للنظام"""
-        task_id = f"{task_func.__name__}_{time.time()}"
+    def _start_workers(self, count: int, reserved: int = 0):
+        """تشغيل مجموعة العمّال التي تسحب المهام من task_queue (أول reserved منها للمهام التفاعلية فقط)"""
+        for i in range(count):
+            max_class = INTERACTIVE if i < reserved else BATCH
+            worker = threading.Thread(target=self._worker_loop, args=(max_class,),
+                                      name=f"dts-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, task_func: Callable, *args, **kwargs) -> Future:
+        """إرسال مهمة جديدة للنظام وإرجاع Future بالنتيجة"""
+        return self._enqueue(task_func, args, kwargs)
+
+    def submit_ref(self, task_func: Callable, *args, **kwargs) -> Future:
+        """مثل submit لكن النتيجة تبقى على الجهاز المنفِّذ ويكتمل الـFuture بمرجع إليها.
+        يمكن تمرير المرجع وسيطاً لمهام لاحقة (تُفضَّل جدولتها حيث توجد البيانات)، وجلب قيمته بـ fetch."""
+        return self._enqueue(task_func, args, kwargs, keep=True)
+
+    def schedule(self, task_func: Callable, args=(), kwargs=None, priority: int = None,
+                 deadline: float = None, keep: bool = False) -> Future:
+        """مثل submit مع تحديد فئة الأولوية (INTERACTIVE / NORMAL / BATCH من offload_core.priority) والمهلة بالثواني.
+        الافتراضي فئة المهمة المعلنة ومهلة فئتها؛ مهمة انقضت مهلتها في الطابور تُسقط أو تُخفَّض،
+        ويمكن إلغاؤها بـ future.cancel() ما دامت لم تبدأ."""
+        return self._enqueue(task_func, args, kwargs or {}, keep=keep, priority=priority, deadline=deadline)
+
+    def fetch(self, ref: Dict):
+        """قيمة مرجع كائن من الجهاز الذي يملكه"""
+        return object_store.fetch(ref)
+
+    def release(self, ref: Dict):
+        """حذف كائن لم يعد مطلوباً من الجهاز الذي يملكه"""
+        object_store.release(ref)
+
+    def _enqueue(self, task_func: Callable, args, kwargs, keep: bool = False,
+                 priority: int = None, deadline: float = None) -> Future:
+        seq = next(self._seq)
+        task_id = f"{task_func.__name__}_{time.time()}_{seq}"
 
         task = {
             'task_id': task_id,
             'function': task_func.__name__,
+            'func': task_func.__name__,
             'args': args,
             'kwargs': kwargs,
-            'sender_id': self.peer_registry.local_node_id
+            'sender_id': self.peer_registry.local_node_id,
+            'keep': keep
         }
 
-        if self.available_peers:
-            # ترتيب الأجهزة: LAN أولاً ثم WAN
-            lan_peers = [p for p in self.available_peers if self._is_local_ip(p['ip'])]
-            wan_peers = [p for p in self.available_peers if not self._is_local_ip(p['ip'])]
-            
-            # اختيار من LAN أولاً
-            if lan_peers:
-                peer = min(lan_peers, key=lambda x: x['load'])
-                logging.info(f"✅ Sending task {task_id} to LAN peer {peer['node_id']}")
+        future = Future()
+        future.task_id = task_id
+        envelope = make_envelope(task, task_func, future, seq, priority, deadline)
+        task['priority'] = envelope.priority
+        self.task_queue.put(envelope)
+        return future
+
+    async def submit_async(self, task_func: Callable, *args, **kwargs):
+        """نسخة asyncio من submit: تنتظر النتيجة دون حجز حلقة الأحداث"""
+        return await asyncio.wrap_future(self.submit(task_func, *args, **kwargs))
+
+    def get_result(self, task_id: str):
+        """إرجاع نتيجة مهمة مكتملة من result_cache (أو None)"""
+        with self._results_lock:
+            return self.result_cache.get(task_id)
+
+    def shutdown(self, wait: bool = True):
+        """إيقاف العمّال بعد تفريغ الطابور"""
+        self.task_queue.close()
+        if wait:
+            for worker in self._workers:
+                worker.join()
+        self._workers = []
+
+    def _worker_loop(self, max_class: int = BATCH):
+        while True:
+            envelope = self.task_queue.get(max_class)
+            if envelope is None:
+                return
+            task_func, task, future = envelope.func, envelope.task, envelope.future
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if task['keep']:
+                    # كل مرجع كائن مستقل: بلا توحيد للاستدعاءات ولا ذاكرة نتائج
+                    result = self._execute_uncached(task_func, task)
+                else:
+                    result = single_flight.do(task_func, task['args'], task['kwargs'],
+                                              self._execute, task_func, task)
+            except BaseException as e:
+                future.set_exception(e)
             else:
-                # إذا لم تتوفر أجهزة محلية، استخدم WAN
-                peer = min(wan_peers, key=lambda x: x['load'])
-                logging.info(f"✅ Sending task {task_id} to WAN peer {peer['node_id']}")
-            
-            self._send_to_peer(peer, task)
+                self._cache_result(task['task_id'], result)
+                future.set_result(result)
+
+    def _execute(self, task_func: Callable, task: Dict):
+        """تنفيذ المهمة على أفضل جهاز متاح، أو محلياً عند التعذّر"""
+        key = result_cache.key_for_call(task_func, task['args'], task['kwargs'])
+        if key is None:
+            return self._execute_uncached(task_func, task)
+        cache = result_cache.get_result_cache()
+        cached = cache.lookup(key, [http_pool.peer_key(p) for p in self.available_peers])
+        if cached is not result_cache.MISS:
+            logging.info(f"♻️ نتيجة {task['task_id']} من ذاكرة النتائج")
+            return cached
+        result = self._execute_uncached(task_func, task)
+        cache.put(key, result)
+        return result
+
+    def _execute_uncached(self, task_func: Callable, task: Dict):
+        data = object_store.locality([task['args'], task['kwargs']])
+        if self.use_map_reduce and self.available_peers and not data and map_reduce.splittable(task['func'], task_func):
+            logging.info(f"🧩 تقسيم {task['task_id']} على {len(self.available_peers)} جهاز")
+            peers = [http_pool.peer_key(p) for p in self.available_peers]
+            result = map_reduce.run(task['func'], task['args'], task['kwargs'], peers)
+            return object_store.keep(result) if task['keep'] else result
+        scheduler = get_scheduler()
+        payload_bytes = wire.estimate_size(task)
+        peer = self._select_peer(task, payload_bytes, data)
+        if peer:
+            logging.info(f"✅ Sending task {task['task_id']} to peer {peer['node_id']}")
+            start = time.perf_counter()
+            # المراجع المملوكة لهذه العملية تُرسل بقيمها؛ البقية يحلّها الجهاز المنفِّذ
+            outgoing = {**task, 'args': object_store.inline_local(task['args']),
+                        'kwargs': object_store.inline_local(task['kwargs'])}
+            with scheduler.track(peer):
+                response = self._send_to_peer(peer, outgoing)
+            if response is not None and 'result' in response:
+                wall = time.perf_counter() - start
+                if not response.get('cached'):
+                    scheduler.record(peer, task['func'], response.get('took', wall), wall, payload_bytes)
+                return response['result']
+            logging.warning(f"⚠️ تعذّر تنفيذ {task['task_id']} على {peer['node_id']} - سيتم التنفيذ محلياً")
+        elif self.available_peers:
+            logging.info(f"ℹ️ نموذج الكلفة يفضّل تنفيذ {task['task_id']} محلياً")
         else:
             logging.warning("⚠️ لا توجد أجهزة متاحة - سيتم تنفيذ المهمة محلياً")
+        args, kwargs = object_store.resolve([task['args'], task['kwargs']]) if data else (task['args'], task['kwargs'])
+        start = time.perf_counter()
+        with scheduler.track(LOCAL):
+            result = task_func(*args, **kwargs)
+        scheduler.record(LOCAL, task['func'], time.perf_counter() - start)
+        return object_store.keep(result) if task['keep'] else result
+
+    def _select_peer(self, task: Dict, payload_bytes: int = 0, data: Dict = None) -> Optional[Dict]:
+        """أسرع جهاز متوقع وفق نموذج الكلفة، أو None إذا كان التنفيذ المحلي أسرع"""
+        if not self.available_peers:
+            return None
+        scheduler = get_scheduler()
+        for peer in self.available_peers:
+            # load = نسبة منافذ الجهاز المشغولة (offload_core.admission)
+            scheduler.advertise(peer, load=peer['load'] * peer['capacity'], slots=peer['capacity'])
+        # ترتيب الأجهزة: LAN أولاً ثم WAN، بعد استبعاد الأجهزة ذات القاطع المفتوح
+        healthy = get_health().healthy(self.available_peers)
+        lan_peers = [p for p in healthy if self._is_local_ip(p['ip'])]
+        wan_peers = [p for p in healthy if not self._is_local_ip(p['ip'])]
+        choice = scheduler.choose(task['func'], lan_peers or wan_peers, payload_bytes, data=data)
+        return None if choice == LOCAL else choice
+
+    def _cache_result(self, task_id: str, result):
+        with self._results_lock:
+            self.result_cache[task_id] = result
+            while len(self.result_cache) > self.max_cached_results:
+                self.result_cache.popitem(last=False)
 
     def _is_local_ip(self, ip: str) -> bool:
         """فحص إذا كان IP في الشبكة المحلية"""
@@ -130,24 +301,36 @@ class DistributedExecutor:
         )
 
     def _send_to_peer(self, peer: Dict, task: Dict):
+        if self.use_batching:
+            return self._send_batched(peer, task)
         try:
             url = f"http://{peer['ip']}:{peer['port']}/run"
-            response = requests.post(url, json=task, timeout=10)
-            response.raise_for_status()
-            logging.info(f"✅ Response from peer: {response.text}")
-            return response.json()
+            with observe(peer):
+                response = wire.post(url, task, timeout=10)
+            logging.info(f"✅ Response from peer {peer['node_id']}: {str(response)[:120]}")
+            return response
         except Exception as e:
             logging.error(f"❌ فشل إرسال المهمة لـ {peer['node_id']}: {e}")
             return None
 
+    def _send_batched(self, peer: Dict, task: Dict):
+        """إرسال المهمة عبر مجمّع الدفعات الخاص بالجهاز (/run_batch)"""
+        call = {'func': task['func'], 'args': task['args'], 'kwargs': task['kwargs'], 'keep': task['keep']}
+        try:
+            return batching.get_coalescer(peer).submit(call).result(timeout=batching.BATCH_TIMEOUT)
+        except Exception as e:
+            logging.error(f"❌ فشل إرسال المهمة ضمن دفعة لـ {peer['node_id']}: {e}")
+            return None
+
 if __name__ == "__main__":
     executor = DistributedExecutor("my_secret_key")
-    executor.peer_registry.register_service("node1", 7520, load=0.1)
+    executor.peer_registry.register_service("node1", 7520)
     print("✅ نظام توزيع المهام جاهز...")
 
     # مثال لإرسال مهمة:
     def example_task(x):
         return x * x
 
-    executor.submit(example_task, 5)
+    future = executor.submit(example_task, 5)
+    print("✅ النتيجة:", future.result())
 
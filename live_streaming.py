@@ -13,6 +13,7 @@ from datetime import datetime
 from processor_manager import should_offload
 from remote_executor import execute_remotely
 from functools import wraps
+from offload_core import complexity, priority
 
 logging.basicConfig(level=logging.INFO)
 
@@ -47,27 +48,40 @@ def stream_offload(func):
     """ديكوراتور خاص بالبث المباشر"""
     @wraps(func)
     def wrapper(*args, **kwargs):
-        complexity = estimate_stream_complexity(func, args, kwargs)
+        estimate = complexity.estimate(func.__name__, args, kwargs, default=40)
         
-        if complexity > 70 or should_offload(complexity):
+        if complexity.is_heavy(estimate, 70) or should_offload():
             logging.info(f"📺 إرسال مهمة البث {func.__name__} للمعالجة الموزعة")
             return execute_remotely(func.__name__, args, kwargs)
         
         logging.info(f"📺 معالجة البث محلياً: {func.__name__}")
-        return func(*args, **kwargs)
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        complexity.observe(func.__name__, estimate["work"], time.perf_counter() - start)
+        return result
     return wrapper
 
-def estimate_stream_complexity(func, args, kwargs):
-    """تقدير تعقيد معالجة البث"""
-    if func.__name__ == "process_game_stream":
-        return args[1] * args[2] / 10000  # FPS × الدقة
-    elif func.__name__ == "real_time_video_enhancement":
-        return args[0] * 20  # عدد التحسينات × 20
-    elif func.__name__ == "multi_stream_processing":
-        return len(args[0]) * 25  # عدد البثوث × 25
-    elif func.__name__ == "ai_commentary_generation":
-        return args[1] * 15  # طول النص × 15
-    return 40
+def _megapixels(resolution):
+    """"1920x1080" → 2.07 (ميغابكسل)"""
+    try:
+        width, height = str(resolution).lower().split("x")
+        return int(width) * int(height) / 1e6
+    except ValueError:
+        return 1.0
+
+# دوال الكلفة (وحدات عمل) لمهام البث؛ المهام غير المعلنة تأخذ 40
+complexity.register_cost("process_game_stream",
+                         lambda stream_data, fps, resolution, *a, **k: fps * _megapixels(resolution))
+complexity.register_cost("real_time_video_enhancement",
+                         lambda enhancement_types, *a, **k: len(enhancement_types) * 20)
+complexity.register_cost("multi_stream_processing", lambda streams_data, *a, **k: len(streams_data) * 25)
+complexity.register_cost("ai_commentary_generation",
+                         lambda game_events, commentary_length, *a, **k: commentary_length * 15)
+
+# مهام البث حساسة للتأخير: تُخدم قبل أعمال الخلفية وتُسقط إن فات موعدها في الطابور
+for _name in ("process_game_stream", "real_time_video_enhancement", "multi_stream_processing",
+              "ai_commentary_generation", "stream_quality_optimization"):
+    priority.register_class(_name, priority.INTERACTIVE)
 
 # ═══════════════════════════════════════════════════════════════
 # معالجة بث الألعاب المباشر
@@ -1,18 +1,21 @@
 # load_balancer.py
-import  requests, time, smart_tasks, psutil, socket
-from offload_core import peer_discovery
+import  time, smart_tasks, psutil, socket
+from offload_core import peer_discovery, http_pool
+from offload_core.scheduler import LOCAL, get_scheduler
+from offload_core.peer_health import observe
 
 def send(peer, func, *args, **kw):
     try:
-        r = requests.post(peer, json={"func": func,
-                                      "args": list(args),
-                                      "kwargs": kw}, timeout=12)
+        with observe(peer):
+            r = http_pool.post(peer, json={"func": func,
+                                          "args": list(args),
+                                          "kwargs": kw}, timeout=12)
         return r.json()
     except Exception as e:
         return {"error": str(e)}
 
-def choose_peer():
-    """اختيار أفضل جهاز - أولوية LAN ثم WAN"""
+def choose_peer(func_name="prime_calculation"):
+    """اختيار أفضل جهاز - أولوية LAN ثم WAN؛ None يعني أن التنفيذ المحلي أسرع"""
     import socket
     
     lan_peers = []
@@ -27,27 +30,19 @@ def choose_peer():
             wan_peers.append(p)
     
     # أولاً: جرب الأجهزة المحلية (LAN)
-    best_lan = find_best_peer(lan_peers)
-    if best_lan:
-        return best_lan
+    if lan_peers:
+        return find_best_peer(lan_peers, func_name)
     
     # ثانياً: إذا لم تتوفر أجهزة محلية، جرب WAN
-    if internet_available():
-        best_wan = find_best_peer(wan_peers)
-        return best_wan
+    if wan_peers and internet_available():
+        return find_best_peer(wan_peers, func_name)
     
     return None
 
-def find_best_peer(peers):
-    """العثور على أفضل جهاز من قائمة معينة"""
-    best = None
-    for p in peers:
-        try:
-            cpu = requests.get(p.replace("/run", "/cpu"), timeout=2).json()["usage"]
-            best = (p, cpu) if best is None or cpu < best[1] else best
-        except: 
-            continue
-    return best[0] if best else None
+def find_best_peer(peers, func_name="prime_calculation"):
+    """أسرع خيار متوقع وفق نموذج الكلفة (بلا استطلاع /cpu)؛ None يعني التنفيذ محلياً"""
+    best = get_scheduler().choose(func_name, peers)
+    return None if best in (None, LOCAL) else best
 
 def is_local_ip(ip):
     """فحص إذا كان IP محلي"""
@@ -67,12 +62,20 @@ def internet_available():
         return False
 
 while True:
+    scheduler = get_scheduler()
     peer = choose_peer()
+    start = time.perf_counter()
     if peer:
         print(f"\n🛰️  إرسال إلى {peer}")
-        res = send(peer, "prime_calculation", 30000)
+        with scheduler.track(peer):
+            res = send(peer, "prime_calculation", 30000)
+        wall = time.perf_counter() - start
+        if "error" not in res and not res.get("cached"):
+            scheduler.record(peer, "prime_calculation", res.get("took", wall), wall)
     else:
-        print("\n⚙️  لا أقران؛ العمل محليّ على", socket.gethostname())
-        res = smart_tasks.prime_calculation(30000)
+        print("\n⚙️  العمل محليّ على", socket.gethostname())
+        with scheduler.track(LOCAL):
+            res = smart_tasks.prime_calculation(30000)
+        scheduler.record(LOCAL, "prime_calculation", time.perf_counter() - start)
     print("🔹 النتيجة (جزئية):", str(res)[:120])
     time.sleep(10)
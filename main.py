@@ -1,7 +1,7 @@
 # main.py – نسخة مُنقَّحة ومستقرة
 
 """
-تشغيل خادم FastAPI + واجهة أوامر موزّعة.
+تشغيل خادم العقدة (ASGI) + واجهة أوامر موزّعة.
 - يعتمد على حزمة offload_core (tasks + peer_discovery + smart_tasks).
 - يفعّل Zeroconf لاكتشاف العقد.
 - يُشغّل ماسح الإنترنت وخوادم الخلفية.
@@ -16,20 +16,12 @@ import subprocess
 import threading
 from pathlib import Path
 
-from fastapi import FastAPI
-from pydantic import BaseModel
-from offload_core.smart_tasks import (
-    matrix_multiply,
-    prime_calculation,
-    data_processing,
-)
-
 # ---- مسارات المشروع ---------------------------------------------------------
 BASE_DIR = Path(__file__).resolve().parent
 sys.path.append(str(BASE_DIR))  # يضمن العثور على offload_core
 
 # ---- حزمة المنطق ------------------------------------------------------------
-from offload_core import tasks  # offload_core/tasks.py بعد النقل
+from offload_core import node_server  # خادم ASGI فوق سجل offload_core.tasks
 from offload_core.smart_tasks import (
     matrix_multiply,
     prime_calculation,
@@ -38,20 +30,6 @@ from offload_core.smart_tasks import (
 )
 from distributed_executor import DistributedExecutor
 
-# ---- إعداد FastAPI ----------------------------------------------------------
-app = FastAPI(title="Offload Helper API")
-
-class TaskRequest(BaseModel):
-    func: str
-    args: list | None = []
-    kwargs: dict | None = {}
-    complexity: int | float | None = None
-
-@app.post("/run")
-async def run_task(req: TaskRequest):
-    """End‑point موحّد يستدعي dispatch في offload_core.tasks"""
-    return tasks.dispatch(req)
-
 # ---- إعدادات النظام ---------------------------------------------------------
 CPU_PORT = 7520
 PYTHON_EXE = sys.executable  # python أو python3 حسب البيئة
@@ -65,10 +43,9 @@ def benchmark(fn, *args):
 
 
 def start_background():
-    """تشغيل Peer Server وLoad Balancer في الخلفية"""
-    subprocess.Popen([PYTHON_EXE, "peer_server.py"])
+    """تشغيل Load Balancer في الخلفية (خادم العقدة على 7520 يحل محل peer_server)"""
     subprocess.Popen([PYTHON_EXE, "load_balancer.py"])
-    logging.info("✅ تم تشغيل الخدمات الخلفيّة (peer_server & load_balancer)")
+    logging.info("✅ تم تشغيل الخدمات الخلفيّة (load_balancer)")
 
 
 def cli_menu(executor: DistributedExecutor):
@@ -108,13 +85,12 @@ def main() -> None:
 
     # تهيئة مُنفذ موزّع
     executor = DistributedExecutor("my_shared_secret_123")
-    executor.peer_registry.register_service("node_main", CPU_PORT, load=0.2)
+    executor.peer_registry.register_service("node_main", CPU_PORT)
     logging.info("✅ النظام جاهز للعمل")
 
-    # تشغيل خادم FastAPI في خيط منفصل
-    import uvicorn
+    # تشغيل خادم العقدة في خيط منفصل
     threading.Thread(
-        target=lambda: uvicorn.run(app, host="0.0.0.0", port=CPU_PORT, log_level="warning"),
+        target=lambda: node_server.serve(port=CPU_PORT),
         daemon=True,
     ).start()
 
@@ -0,0 +1,206 @@
+# admission.py
+"""
+التحكم في القبول (admission control): منافذ تنفيذ محدودة لكل فئة موارد على العقدة.
+
+- كل مهمة مسجّلة تنتمي لفئة موارد (TaskSpec.resource): "cpu" حسابية، "memory" تحجز ذاكرة كبيرة،
+  "io" انتظار؛ المهام الخفيفة جداً (inline) بلا فئة ولا تحجز منفذاً.
+- لكل فئة عدد منافذ (DTS_SLOTS_CPU / DTS_SLOTS_MEMORY / DTS_SLOTS_IO) وطابور انتظار بطول
+  المنافذ × QUEUE_FACTOR؛ ما يتجاوز ذلك يُرفض بـ 429 بدل تشغيل كل شيء دفعة واحدة.
+- العقدة تعلن انشغالها في خاصية TXT "load" عبر mDNS: (الجاري + المنتظر) ÷ المنافذ لأشد الفئات
+  انشغالاً، فـ 1.0 تعني أن كل المنافذ مشغولة وما فوقها أن هناك طابوراً؛ وتعلن أيضاً
+  "capacity" (منافذ cpu) و "free_<فئة>" لكل فئة. الخصائص تُنشر في كل خدمة mDNS مسجّلة في العملية:
+  خدمة PeerRegistry (register_advertiser) وخدمة offload_core.peer_discovery إن كانت تعمل.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from offload_core.executors import CPU_COUNT
+
+SLOTS = {
+    "cpu": int(os.getenv("DTS_SLOTS_CPU", str(CPU_COUNT))),
+    "memory": int(os.getenv("DTS_SLOTS_MEMORY", str(max(1, CPU_COUNT // 2)))),
+    "io": int(os.getenv("DTS_SLOTS_IO", str(4 * CPU_COUNT))),
+}
+QUEUE_FACTOR = int(os.getenv("DTS_ADMISSION_QUEUE_FACTOR", "2"))   # منتظرون لكل منفذ
+ADVERTISE_EVERY = 2.0                                                # أقل فاصل بين تحديثات mDNS
+
+
+class Busy(Exception):
+    """كل منافذ الفئة مشغولة وطابورها ممتلئ"""
+
+
+def resource_of(spec) -> Optional[str]:
+    return getattr(spec, "resource", None)
+
+
+def advertisement(states: Dict[str, tuple], **extra) -> dict:
+    """خصائص TXT من حالة الفئات {فئة: (جارٍ، منتظر، منافذ)}"""
+    props = {"load": round(max(((a + w) / c for a, w, c in states.values() if c), default=0.0), 2),
+             "capacity": states.get("cpu", (0, 0, SLOTS["cpu"]))[2]}
+    props.update({f"free_{name}": max(0, c - a) for name, (a, w, c) in states.items()})
+    props.update(extra)
+    return props
+
+
+_advertisers = []   # دوال update(**props) لخدمات mDNS المسجّلة في هذه العملية
+
+
+def register_advertiser(update):
+    """إضافة خدمة mDNS تُحدَّث خصائصها بحالة المنافذ (مثل PeerRegistry.advertise)"""
+    _advertisers.append(update)
+
+
+def idle_advertisement() -> dict:
+    """خصائص عقدة لم تبدأ أي مهمة (عند تسجيل الخدمة قبل أول نشر)"""
+    return advertisement({name: (0, 0, n) for name, n in SLOTS.items()})
+
+
+def publish(props: dict) -> bool:
+    """نشر الخصائص عبر كل خدمة mDNS مسجّلة في هذه العملية؛ True إن حُدِّثت واحدة على الأقل"""
+    updates = list(_advertisers)
+    discovery = sys.modules.get("offload_core.peer_discovery") or sys.modules.get("peer_discovery")
+    if discovery is not None:
+        updates.append(discovery.advertise)
+    published = False
+    for update in updates:
+        try:
+            published = bool(update(**props)) or published
+        except Exception as e:
+            logging.debug(f"تعذّر تحديث خصائص mDNS: {e}")
+    return published
+
+
+class SlotPool:
+    """منافذ محدودة (لفئة موارد أو لدالة واحدة) مع طابور انتظار محدود (backpressure).
+    acquire للخوادم المبنية على الخيوط (peer_server)، و acquire_async داخل حلقة الأحداث
+    (node_server)؛ المنفذ المحرَّر يُسلَّم مباشرة لأقدم منتظر غير متزامن إن وُجد."""
+
+    def __init__(self, slots: int, max_pending: int):
+        self.slots = max(1, slots)
+        self.max_pending = max_pending
+        self.active = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+        self._async_waiters = deque()   # futures منتظري حلقة الأحداث بترتيب الوصول
+
+    def saturated(self) -> bool:
+        """كل المنافذ مشغولة والطابور ممتلئ (الطلب التالي يُرفض)"""
+        return self.active >= self.slots and self.waiting >= self.max_pending
+
+    def acquire(self, reject: bool = True):
+        with self._cond:
+            if self.active >= self.slots:
+                if reject and self.waiting >= self.max_pending:
+                    raise Busy()
+                self.waiting += 1
+                try:
+                    while self.active >= self.slots:
+                        self._cond.wait()
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+
+    async def acquire_async(self, reject: bool = True):
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            if self.active < self.slots:
+                self.active += 1
+                return
+            if reject and self.waiting >= self.max_pending:
+                raise Busy()
+            waiter = loop.create_future()
+            self._async_waiters.append(waiter)
+            self.waiting += 1
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            with self._cond:
+                handed = waiter not in self._async_waiters
+                if not handed:
+                    self._async_waiters.remove(waiter)
+                    self.waiting -= 1
+            if handed:
+                self.release()   # سُلِّم المنفذ قبل الإلغاء: مرّره للمنتظر التالي
+            raise
+
+    def release(self):
+        with self._cond:
+            if self._async_waiters:
+                # تسليم المنفذ مباشرة (active لا يتغيّر)
+                waiter = self._async_waiters.popleft()
+                self.waiting -= 1
+                waiter.get_loop().call_soon_threadsafe(_wake, waiter)
+                return
+            self.active -= 1
+            self._cond.notify()
+
+    def state(self) -> tuple:
+        return (self.active, self.waiting, self.slots)
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class NodeSlots:
+    """منافذ العقدة لكل فئة موارد"""
+
+    def __init__(self, slots: Dict[str, int] = None, queue_factor: int = QUEUE_FACTOR):
+        slots = slots or SLOTS
+        self.pools = {name: SlotPool(n, n * queue_factor) for name, n in slots.items()}
+
+    def acquire(self, spec, reject: bool = True) -> Optional[SlotPool]:
+        """حجز منفذ لفئة المهمة (يُرجع ما يُمرَّر إلى release)؛ Busy إن امتلأت الفئة وطابورها"""
+        pool = self.pools.get(resource_of(spec))
+        if pool is not None:
+            pool.acquire(reject)
+        return pool
+
+    @staticmethod
+    def release(pool: Optional[SlotPool]):
+        if pool is not None:
+            pool.release()
+
+    @contextmanager
+    def slot(self, spec, reject: bool = True):
+        """حجز منفذ لفئة المهمة طوال التنفيذ"""
+        pool = self.acquire(spec, reject)
+        try:
+            yield
+        finally:
+            self.release(pool)
+
+    def states(self) -> Dict[str, tuple]:
+        return {name: pool.state() for name, pool in self.pools.items()}
+
+    def advertise_forever(self, every: float = ADVERTISE_EVERY):
+        """نشر الحالة عبر mDNS كلما تغيّرت (يعمل في خيط خلفي)"""
+        advertised = None
+        while True:
+            props = advertisement(self.states())
+            if props != advertised and publish(props):
+                advertised = props
+            time.sleep(every)
+
+
+_slots = None
+_slots_lock = threading.Lock()
+
+
+def get_node_slots() -> NodeSlots:
+    """منافذ العقدة المشتركة على مستوى العملية (يبدأ نشر الحالة عند أول استخدام)"""
+    global _slots
+    with _slots_lock:
+        if _slots is None:
+            _slots = NodeSlots()
+            threading.Thread(target=_slots.advertise_forever, name="dts-advertise", daemon=True).start()
+        return _slots
@@ -0,0 +1,139 @@
+# batching.py
+"""
+تجميع المهام الصغيرة في دفعات (/run_batch).
+- جهة الخادم: run_batch ينفّذ مصفوفة استدعاءات على مجمّع عمّال محلي ويعيد النتائج فور اكتمال كل منها.
+- جهة العميل: BatchCoalescer يجمع الاستدعاءات الصغيرة لكل جهاز حتى حد أقصى أو مهلة انتظار قصيرة،
+  ويسجّل نتيجة كل طلب دفعة في سجل صحة الجهاز (peer_health) كأي طلب /run.
+"""
+
+import os
+import json
+import time
+import socket
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+from offload_core import http_pool, wire
+from offload_core.peer_health import observe
+
+BATCH_MAX_SIZE = int(os.getenv("DTS_BATCH_MAX_SIZE", "32"))
+BATCH_LINGER = float(os.getenv("DTS_BATCH_LINGER", "0.005"))  # ثوانٍ
+BATCH_TIMEOUT = 30
+NDJSON = "application/x-ndjson"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _worker_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="dts-batch")
+        return _pool
+
+
+# ---- جهة الخادم -------------------------------------------------------------
+
+def run_call(resolve, call: dict) -> dict:
+    """تنفيذ استدعاء واحد {func,args,kwargs} وإرجاع عنصر نتيجة"""
+    fn = resolve(call.get("func"))
+    if fn is None:
+        return {"error": "function-not-found"}
+    start = time.time()
+    try:
+        result = fn(*call.get("args", []), **call.get("kwargs", {}))
+    except Exception as e:
+        return {"error": str(e)}
+    return {"result": result, "host": socket.gethostname(), "took": round(time.time() - start, 3)}
+
+
+def run_batch(calls, resolve, executor=None):
+    """ينفّذ الدفعة بالتوازي ويُرجع (yield) كل نتيجة مع رقمها فور اكتمالها"""
+    pool = executor or _worker_pool()
+    futures = {pool.submit(run_call, resolve, call): index for index, call in enumerate(calls)}
+    for fut in as_completed(futures):
+        item = fut.result()
+        item["index"] = futures[fut]
+        yield item
+
+
+def iter_ndjson(items):
+    for item in items:
+        yield json.dumps(wire.to_jsonable(item)) + "\n"
+
+
+# ---- جهة العميل -------------------------------------------------------------
+
+class BatchCoalescer:
+    """يجمع الاستدعاءات المتجهة لجهاز واحد ويرسلها دفعةً إلى /run_batch"""
+
+    def __init__(self, peer, max_batch: int = BATCH_MAX_SIZE, linger: float = BATCH_LINGER,
+                 max_inflight: int = 4, timeout: float = BATCH_TIMEOUT):
+        self.peer = http_pool.peer_key(peer)
+        self.url = f"http://{self.peer}/run_batch"
+        self.max_batch = max_batch
+        self.linger = linger
+        self.timeout = timeout
+        self._pending = []
+        self._cond = threading.Condition()
+        self._senders = ThreadPoolExecutor(max_workers=max_inflight, thread_name_prefix="dts-coalesce")
+        threading.Thread(target=self._flush_loop, daemon=True).start()
+
+    def submit(self, call: dict) -> Future:
+        """إضافة استدعاء للدفعة التالية؛ يكتمل الـFuture بعنصر النتيجة {result|error,...}"""
+        future = Future()
+        with self._cond:
+            self._pending.append((call, future))
+            self._cond.notify()
+        return future
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                deadline = time.monotonic() + self.linger
+                while len(self._pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.max_batch]
+                self._pending = self._pending[self.max_batch:]
+            self._senders.submit(self._send, batch)
+
+    def _send(self, batch):
+        live = [(call, fut) for call, fut in batch if fut.set_running_or_notify_cancel()]
+        if not live:
+            return
+        error = None
+        try:
+            with observe(self.peer), \
+                    http_pool.post(self.url, json={"calls": wire.to_jsonable([call for call, _ in live])},
+                                   stream=True, timeout=self.timeout) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if line:
+                        item = json.loads(line)
+                        live[item.pop("index")][1].set_result(item)
+        except Exception as e:
+            logging.warning(f"⚠️ فشل إرسال دفعة من {len(live)} مهمة إلى {self.url}: {e}")
+            error = e
+        for _, fut in live:
+            if not fut.done():
+                fut.set_exception(error or ConnectionError(f"دفعة غير مكتملة من {self.url}"))
+
+
+_coalescers = {}
+_coalescers_lock = threading.Lock()
+
+
+def get_coalescer(peer) -> BatchCoalescer:
+    """مجمّع دفعات مشترك لكل جهاز"""
+    key = http_pool.peer_key(peer)
+    with _coalescers_lock:
+        if key not in _coalescers:
+            _coalescers[key] = BatchCoalescer(key)
+        return _coalescers[key]
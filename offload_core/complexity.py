@@ -0,0 +1,145 @@
+# complexity.py
+"""
+تقدير كلفة المهام بدل جداول if func.__name__ == الثابتة.
+
+- كل مهمة تعلن دالة كلفة تُرجع "وحدات عمل" من وسائطها عبر register_cost().
+- نموذج متعلّم لكل (دالة، جهاز) يربط وحدات العمل بزمن التنفيذ الفعلي
+  (انحدار خطي متناقص الوزن: الزمن ≈ a + b × العمل) ويتنبأ بالثواني.
+- قرار التوزيع يعتمد على الزمن المتوقع على هذا الجهاز متى توفرت قياسات كافية،
+  ويعود إلى مقارنة وحدات العمل بالعتبة القديمة قبل ذلك.
+"""
+
+import os
+import math
+import logging
+import threading
+from numbers import Number
+from typing import Callable, Dict, Optional
+
+LOCAL = "local"
+OFFLOAD_SECONDS = float(os.getenv("DTS_OFFLOAD_SECONDS", "0.5"))  # أطول من هذا يُعتبر ثقيلاً
+MIN_SAMPLES = 3      # أقل عدد قياسات قبل الوثوق بالنموذج
+DECAY = 0.95         # وزن القياسات القديمة عند كل قياس جديد
+
+COSTS: Dict[str, Callable] = {}
+
+
+def register_cost(name: str, cost: Callable = None):
+    """إعلان دالة كلفة لمهمة (تستقبل نفس وسائط المهمة)؛ يُستخدم مباشرة أو كديكوراتور"""
+    def _register(fn):
+        COSTS[name] = fn
+        return fn
+    return _register(cost) if cost is not None else _register
+
+
+def default_work(args, kwargs) -> float:
+    """وحدات عمل تقريبية لمهمة بلا دالة كلفة: حاصل ضرب القيم العددية وأطوال المتسلسلات"""
+    work = 1.0
+    for value in list(args) + list(kwargs.values()):
+        if isinstance(value, bool):
+            continue
+        if isinstance(value, Number):
+            work *= max(1.0, abs(float(value)))
+        elif hasattr(value, "size") and isinstance(getattr(value, "size"), int):
+            work *= max(1, value.size)
+        elif isinstance(value, (list, tuple, dict, str, bytes)):
+            work *= max(1, len(value))
+    return work
+
+
+class RuntimeModel:
+    """انحدار خطي متناقص الوزن لزمن التنفيذ بدلالة وحدات العمل"""
+
+    def __init__(self, decay: float = DECAY):
+        self.decay = decay
+        self.n = 0
+        self.w = self.sx = self.sy = self.sxx = self.sxy = 0.0
+
+    def observe(self, work: float, seconds: float):
+        d = self.decay
+        self.n += 1
+        self.w = d * self.w + 1.0
+        self.sx = d * self.sx + work
+        self.sy = d * self.sy + seconds
+        self.sxx = d * self.sxx + work * work
+        self.sxy = d * self.sxy + work * seconds
+
+    def predict(self, work: float) -> Optional[float]:
+        if self.n == 0:
+            return None
+        mean_x, mean_y = self.sx / self.w, self.sy / self.w
+        var_x = self.sxx / self.w - mean_x * mean_x
+        if self.n < 2 or var_x <= 1e-12 * max(1.0, mean_x * mean_x):
+            # قياسات بحجم عمل واحد: افتراض تناسب الزمن مع العمل
+            return mean_y * work / mean_x if mean_x > 0 else mean_y
+        slope = max(0.0, (self.sxy / self.w - mean_x * mean_y) / var_x)
+        intercept = max(0.0, mean_y - slope * mean_x)
+        return intercept + slope * work
+
+
+class ComplexityEstimator:
+    def __init__(self, min_samples: int = MIN_SAMPLES):
+        self.min_samples = min_samples
+        self._models: Dict[tuple, RuntimeModel] = {}
+        self._lock = threading.Lock()
+
+    def work(self, name: str, args=(), kwargs=None, default: float = None) -> float:
+        """وحدات العمل من دالة الكلفة المعلنة، أو default (أو التقدير العام) عند غيابها"""
+        kwargs = kwargs or {}
+        cost = COSTS.get(name)
+        if cost is not None:
+            try:
+                return float(cost(*args, **kwargs))
+            except Exception as e:
+                logging.debug(f"دالة كلفة {name} فشلت: {e}")
+        return float(default) if default is not None else default_work(args, kwargs)
+
+    def predict(self, name: str, work: float, node: str = LOCAL) -> Optional[float]:
+        """الزمن المتوقع بالثواني على node؛ عند نقص قياساته يُستخدم متوسط بقية الأجهزة"""
+        with self._lock:
+            model = self._models.get((name, node))
+            if model is not None and model.n >= self.min_samples:
+                return model.predict(work)
+            others = [m.predict(work) for (f, _), m in self._models.items()
+                      if f == name and m.n >= self.min_samples]
+        return sum(others) / len(others) if others else None
+
+    def observe(self, name: str, work: float, seconds: float, node: str = LOCAL):
+        if work is None or seconds is None or not math.isfinite(seconds):
+            return
+        with self._lock:
+            model = self._models.setdefault((name, node), RuntimeModel())
+            model.observe(float(work), float(seconds))
+
+    def estimate(self, name: str, args=(), kwargs=None, default: float = None, node: str = LOCAL) -> dict:
+        """{"work": وحدات العمل، "seconds": الزمن المتوقع أو None}"""
+        work = self.work(name, args, kwargs, default)
+        return {"work": work, "seconds": self.predict(name, work, node)}
+
+
+def is_heavy(estimate: dict, threshold: float, seconds: float = None) -> bool:
+    """هل تستحق المهمة التوزيع؟ الزمن المتعلَّم إن وُجد، وإلا وحدات العمل مقابل العتبة"""
+    if estimate["seconds"] is not None:
+        return estimate["seconds"] > (OFFLOAD_SECONDS if seconds is None else seconds)
+    return estimate["work"] > threshold
+
+
+_estimator = None
+_estimator_lock = threading.Lock()
+
+
+def get_estimator() -> ComplexityEstimator:
+    """المقدِّر المشترك على مستوى العملية"""
+    global _estimator
+    with _estimator_lock:
+        if _estimator is None:
+            _estimator = ComplexityEstimator()
+        return _estimator
+
+
+def estimate(name: str, args=(), kwargs=None, default: float = None, node: str = LOCAL) -> dict:
+    return get_estimator().estimate(name, args, kwargs, default, node)
+
+
+def observe(name: str, work: float, seconds: float, node: str = LOCAL):
+    get_estimator().observe(name, work, seconds, node)
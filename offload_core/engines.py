@@ -0,0 +1,136 @@
+# engines.py
+"""
+محرّكات NumPy متجهة لأثقل دوال المهام، بجانب التنفيذات المرجعية بلغة Python الخالصة.
+
+- pick(name, reference, fast, sample) يختار المحرّك: في الوضع auto يُستخدم المتجه بعد فحص
+  تطابقه مع المرجعي على مدخلات العيّنة مرة واحدة لكل عملية؛ عند أي اختلاف يُعتمد المرجعي.
+- DTS_ENGINE=reference يفرض المرجعي، و DTS_ENGINE=numpy يفرض المتجه دون فحص.
+"""
+
+import os
+import math
+import logging
+import threading
+
+import numpy as np
+
+MODE = os.getenv("DTS_ENGINE", "auto")   # auto | numpy | reference
+SIEVE_BUDGET = int(float(os.getenv("DTS_SIEVE_MEMORY_MB", "4")) * 1024 * 1024)  # ذاكرة نافذة الغربال
+
+_verdicts = {}
+_lock = threading.Lock()
+
+
+def _same(a, b) -> bool:
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_same(a[k], b[k]) for k in a)
+    if isinstance(a, (list, tuple, np.ndarray)) and isinstance(b, (list, tuple, np.ndarray)):
+        if len(a) != len(b):
+            return False
+        if all(isinstance(x, (int, np.integer)) for x in list(a[:1]) + list(b[:1])):
+            return list(a) == list(b)
+        return bool(np.allclose(np.asarray(a, dtype=float), np.asarray(b, dtype=float)))
+    if isinstance(a, float) or isinstance(b, float):
+        return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9)
+    return a == b
+
+
+def pick(name: str, reference, fast, sample: tuple = ()):
+    """المحرّك المعتمد للدالة name"""
+    if MODE == "reference":
+        return reference
+    if MODE == "numpy":
+        return fast
+    with _lock:
+        verdict = _verdicts.get(name)
+        if verdict is None:
+            try:
+                verdict = _same(reference(*sample), fast(*sample))
+            except Exception as e:
+                logging.error(f"❌ فشل فحص المحرّك المتجه لـ {name}: {e}")
+                verdict = False
+            if not verdict:
+                logging.error(f"❌ المحرّك المتجه لـ {name} لا يطابق المرجعي - استخدام المرجعي")
+            _verdicts[name] = verdict
+    return fast if verdict else reference
+
+
+# ---- المحرّكات المتجهة ---------------------------------------------------------
+
+def sieve_primes(limit: int) -> np.ndarray:
+    """الأعداد الأولية حتى limit (غربال إراتوستينس)"""
+    if limit < 2:
+        return np.empty(0, dtype=np.int64)
+    is_prime = np.ones(limit + 1, dtype=bool)
+    is_prime[:2] = False
+    for p in range(2, math.isqrt(limit) + 1):
+        if is_prime[p]:
+            is_prime[p * p::p] = False
+    return np.flatnonzero(is_prime)
+
+
+def segment_span(budget: int = None) -> int:
+    """عدد الأعداد التي تغطيها نافذة غربال واحدة ضمن ميزانية budget بايت.
+    النافذة تخزن الأعداد الفردية فقط (بايت لكل عدد فردي) ومعها مصفوفة الأوليات الناتجة."""
+    budget = SIEVE_BUDGET if budget is None else budget
+    return max(1 << 12, budget // 5 * 2)  # بايت للعلامة + ≤8 بايت لكل أولي ناتج (كثافة < 1/2)
+
+
+def iter_primes(low: int, high: int, span: int = None):
+    """الأعداد الأولية في [low, high] نافذةً بعد نافذة (مصفوفة int64 لكل نافذة).
+    الذاكرة ثابتة: O(√high + span) مهما كبر high."""
+    low, span = max(2, low), span or segment_span()
+    if high < low:
+        return
+    base = sieve_primes(math.isqrt(high))[1:]   # الأوليات الفردية حتى √high
+    for start in range(low, high + 1, span):
+        stop = min(start + span, high + 1)
+        first = start | 1                         # أول عدد فردي في النافذة
+        odd = np.ones(max(0, (stop - first + 1) // 2), dtype=bool)
+        for p in base:
+            p = int(p)
+            if p * p >= stop:
+                break
+            m = max(p * p, -(-first // p) * p)
+            if m % 2 == 0:
+                m += p
+            odd[(m - first) // 2::p] = False
+        if first == 1 and odd.size:
+            odd[0] = False                        # 1 ليس أولياً
+        primes = np.flatnonzero(odd) * 2 + first
+        if start <= 2 < stop:
+            primes = np.concatenate(([2], primes))
+        yield primes.astype(np.int64, copy=False)
+
+
+def primes_in_range(low: int, high: int, span: int = None) -> np.ndarray:
+    """الأعداد الأولية في [low, high] بغربال مقطّع (الناتج وحده يكبر مع المجال)"""
+    chunks = list(iter_primes(low, high, span))
+    return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+
+
+def count_primes(low: int, high: int, span: int = None) -> int:
+    """عدد الأعداد الأولية في [low, high] دون الاحتفاظ بها"""
+    return sum(int(chunk.size) for chunk in iter_primes(low, high, span))
+
+
+def window_sums(values: np.ndarray, width: int) -> np.ndarray:
+    """مجموع كل نافذة منزلقة بطول width (عدد النوافذ = len(values) - width + 1)"""
+    csum = np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+    return csum[width:] - csum[:-width]
+
+
+def sin_cos_windows(count: int, width: int = 100) -> np.ndarray:
+    """لكل i < count: مجموع sin(x)·cos(x) لـ x في [i, i + width)"""
+    if count <= 0:
+        return np.empty(0)
+    x = np.arange(count + width - 1, dtype=np.float64)
+    return window_sums(np.sin(x) * np.cos(x), width)
+
+
+def sqrt_blocks(count: int, width: int = 100, start: int = 0) -> np.ndarray:
+    """لكل start ≤ i < start + count: مجموع √x لـ x في [i·width, (i + 1)·width)"""
+    if count <= 0:
+        return np.empty(0)
+    x = np.arange(start * width, (start + count) * width, dtype=np.float64)
+    return np.sqrt(x).reshape(count, width).sum(axis=1)
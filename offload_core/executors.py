@@ -0,0 +1,135 @@
+# executors.py
+"""
+خلفيات التنفيذ لخادم العقدة:
+- inline    : تنفيذ مباشر في الخيط الحالي (للمهام الخفيفة جداً).
+- threads   : مجمّع خيوط (مهام الانتظار/الإدخال والإخراج).
+- processes : مجمّع عمليات مُسبق التشغيل، عمّاله دافئون و NumPy مستورد مسبقاً؛
+              المصفوفات الكبيرة تمر بالذاكرة المشتركة (offload_core.shm) بدل pickle.
+- auto      : التوجيه حسب نوع المهمة المسجّل في offload_core.tasks (kind).
+يُختار الوضع عبر DTS_EXECUTOR.
+"""
+
+import os
+import logging
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+MODES = ("inline", "threads", "processes", "auto")
+DEFAULT_MODE = os.getenv("DTS_EXECUTOR", "auto")
+CPU_COUNT = os.cpu_count() or 1
+
+
+def _call(fn, args, kwargs):
+    return fn(*args, **kwargs)
+
+
+def _warm_worker():
+    """يُنفَّذ مرة واحدة في كل عامل: استيراد المكتبات الثقيلة مسبقاً"""
+    import numpy  # noqa: F401
+    from offload_core import smart_tasks  # noqa: F401
+
+
+def _ready():
+    return os.getpid()
+
+
+class InlineBackend:
+    name = "inline"
+
+    def submit(self, fn, args=(), kwargs=None) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args, **(kwargs or {})))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self):
+        pass
+
+
+class ThreadBackend:
+    name = "threads"
+
+    def __init__(self, workers: int = 4 * CPU_COUNT):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dts-exec")
+
+    def submit(self, fn, args=(), kwargs=None) -> Future:
+        return self._pool.submit(_call, fn, args, kwargs or {})
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+
+class ProcessBackend:
+    name = "processes"
+
+    def __init__(self, workers: int = CPU_COUNT, warm: bool = True):
+        from offload_core import shm
+        self.workers = workers
+        self._shm = shm if shm.ENABLED else None
+        if self._shm is not None:
+            # متتبّع موارد واحد يرثه كل العمّال فلا تُحذف كتل النتائج عند خروج عامل
+            from multiprocessing import resource_tracker
+            resource_tracker.ensure_running()
+        self._pool = ProcessPoolExecutor(max_workers=workers, initializer=_warm_worker)
+        if warm:
+            self.warm()
+
+    def warm(self):
+        """تشغيل كل العمّال الآن بدل أول طلب"""
+        pids = {f.result() for f in [self._pool.submit(_ready) for _ in range(self.workers)]}
+        logging.info(f"🔥 مجمّع العمليات جاهز: {len(pids)} عامل")
+
+    def submit(self, fn, args=(), kwargs=None) -> Future:
+        if self._shm is not None:
+            return self._shm.submit(self._pool, fn, args, kwargs)
+        return self._pool.submit(_call, fn, args, kwargs or {})
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+
+class BackendRouter:
+    """يختار خلفية التنفيذ لكل مهمة حسب الوضع المضبوط ونوع المهمة"""
+
+    def __init__(self, mode: str = DEFAULT_MODE):
+        if mode not in MODES:
+            raise ValueError(f"وضع تنفيذ غير معروف: {mode} (المتاح: {', '.join(MODES)})")
+        self.mode = mode
+        self._backends = {}
+        self._lock = threading.Lock()
+
+    def backend(self, name: str):
+        with self._lock:
+            if name not in self._backends:
+                factory = {"inline": InlineBackend, "threads": ThreadBackend, "processes": ProcessBackend}[name]
+                self._backends[name] = factory()
+            return self._backends[name]
+
+    def backend_for(self, spec):
+        if self.mode != "auto":
+            return self.backend(self.mode)
+        return self.backend({"cpu": "processes", "io": "threads", "inline": "inline"}[spec.kind])
+
+    def submit(self, spec, args=(), kwargs=None) -> Future:
+        return self.backend_for(spec).submit(spec.func, args, kwargs)
+
+    def shutdown(self):
+        with self._lock:
+            for backend in self._backends.values():
+                backend.shutdown()
+            self._backends.clear()
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> BackendRouter:
+    """الموجّه المشترك على مستوى العملية"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = BackendRouter()
+        return _router
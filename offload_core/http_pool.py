@@ -0,0 +1,94 @@
+# http_pool.py
+"""
+مجمّع جلسات HTTP مشترك لكل مرسِلي المهام.
+- جلسة requests.Session واحدة لكل جهاز (host:port) تبقي اتصالات TCP حيّة (keep-alive).
+- عدد الأجهزة المحفوظة محدود، وتُغلق الجلسات الخاملة بعد مهلة.
+"""
+
+import threading
+import time
+import logging
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+MAX_PEERS = 64          # أقصى عدد أجهزة لها جلسة مفتوحة
+IDLE_TIMEOUT = 120.0    # ثوانٍ قبل إغلاق جلسة خاملة
+CONNECTIONS_PER_PEER = 16
+
+
+def peer_key(peer) -> str:
+    """توحيد عنوان الجهاز إلى الصيغة host:port"""
+    if isinstance(peer, dict):
+        return f"{peer['ip']}:{peer['port']}"
+    peer = str(peer)
+    if "://" not in peer:
+        peer = f"http://{peer}"
+    parts = urlsplit(peer)
+    return f"{parts.hostname}:{parts.port or 80}"
+
+
+class SessionPool:
+    """جلسة keep-alive لكل جهاز مع حد أقصى وإخلاء للجلسات الخاملة"""
+
+    def __init__(self, max_peers: int = MAX_PEERS, idle_timeout: float = IDLE_TIMEOUT,
+                 connections_per_peer: int = CONNECTIONS_PER_PEER):
+        self.max_peers = max_peers
+        self.idle_timeout = idle_timeout
+        self.connections_per_peer = connections_per_peer
+        self._sessions = OrderedDict()  # key -> (session, last_used)
+        self._lock = threading.Lock()
+
+    def session_for(self, peer) -> requests.Session:
+        key = peer_key(peer)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.pop(key, None)
+            session = entry[0] if entry else self._new_session()
+            self._sessions[key] = (session, now)
+            evicted = self._evict(now)
+        for old in evicted:
+            old.close()
+        return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        return self.session_for(url).request(method, url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            sessions = [s for s, _ in self._sessions.values()]
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.connections_per_peer)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _evict(self, now: float):
+        """إخراج الجلسات الأقدم استخداماً (تُستدعى والقفل مأخوذ)"""
+        evicted = []
+        while self._sessions:
+            key, (session, last_used) = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_peers and now - last_used < self.idle_timeout:
+                break
+            del self._sessions[key]
+            evicted.append(session)
+            logging.debug(f"🔌 إغلاق جلسة خاملة: {key}")
+        return evicted
+
+
+POOL = SessionPool()
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return POOL.request("POST", url, **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return POOL.request("GET", url, **kwargs)
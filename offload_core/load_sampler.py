@@ -0,0 +1,86 @@
+# load_sampler.py
+"""
+قياس حمل الجهاز في الخلفية دون أي انتظار في مسار اتخاذ القرار.
+خيط واحد يأخذ عيّنة CPU/ذاكرة كل SAMPLE_INTERVAL ويحتفظ بمتوسطات متحركة،
+وتقرأ snapshot() آخر قيمة جاهزة مباشرة.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+
+import psutil
+
+SAMPLE_INTERVAL = 0.5   # ثوانٍ بين العيّنات
+WINDOW = 10             # عدد العيّنات في المتوسط المتحرك
+
+
+class LoadSampler:
+    def __init__(self, interval: float = SAMPLE_INTERVAL, window: int = WINDOW):
+        self.interval = interval
+        self.cpu_history = deque(maxlen=window)
+        self.mem_history = deque(maxlen=window)
+        self._snapshot = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return self
+            psutil.cpu_percent(interval=None)  # القراءة الأولى مرجعية فقط
+            self._sample()
+            self._thread = threading.Thread(target=self._loop, name="dts-load-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def snapshot(self) -> dict:
+        """آخر قياس: {"instant": {cpu, mem}, "average": {cpu, mem}, "load_avg", "timestamp"}"""
+        return self._snapshot
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self._sample()
+            except Exception as e:
+                logging.warning(f"⚠️ فشل قياس الحمل: {e}")
+
+    def _sample(self):
+        cpu = psutil.cpu_percent(interval=None) / 100.0  # كنسبة (0.0 - 1.0)
+        mem = psutil.virtual_memory().available / (1024**2)  # MB
+        self.cpu_history.append(cpu)
+        self.mem_history.append(mem)
+        try:
+            load_avg = psutil.getloadavg()[0] / (os.cpu_count() or 1)
+        except (AttributeError, OSError):
+            load_avg = cpu
+        # استبدال القاموس كاملاً يجعل القراءة آمنة دون قفل
+        self._snapshot = {
+            "instant": {"cpu": cpu, "mem": mem},
+            "average": {
+                "cpu": sum(self.cpu_history) / len(self.cpu_history),
+                "mem": sum(self.mem_history) / len(self.mem_history),
+            },
+            "load_avg": load_avg,
+            "timestamp": time.time(),
+        }
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler() -> LoadSampler:
+    """القائس المشترك على مستوى العملية (يبدأ عند أول استخدام)"""
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = LoadSampler().start()
+        return _sampler
+
+
+def snapshot() -> dict:
+    return get_sampler().snapshot()
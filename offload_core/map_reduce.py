@@ -0,0 +1,122 @@
+# map_reduce.py
+"""
+توزيع المهام القابلة للتقسيم على مجال مدخلاتها (map/reduce).
+- المهمة تعلن Splitter عند تسجيلها في offload_core.tasks: كيف يُقسَّم مجالها إلى أجزاء،
+  وأي دالة تنفّذ الجزء الواحد، وكيف تُدمج نتائج الأجزاء.
+- run يقسّم المهمة إلى أجزاء أكثر من عدد العمّال (OVERSPLIT)، ولكل جهاز متاح ولكل نواة محلية
+  عامل يسحب الجزء التالي متى فرغ؛ فيأخذ الجهاز الأسرع أجزاء أكثر تلقائياً.
+- فشل جهاز يعيد جزأه إلى الطابور ويُخرجه من التوزيع؛ وما يتبقى يُنفَّذ محلياً.
+  الأجهزة ذات القاطع المفتوح (offload_core.peer_health) لا تُعطى أجزاء أصلاً.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple
+
+from offload_core import executors, wire
+from offload_core.peer_health import get_health, observe
+from offload_core.scheduler import LOCAL, get_scheduler
+
+OVERSPLIT = int(os.getenv("DTS_MAP_REDUCE_OVERSPLIT", "4"))   # أجزاء لكل عامل
+SHARD_TIMEOUT = 60                                             # ثوانٍ لكل جزء بعيد
+
+
+class Splitter:
+    """وصف تقسيم مهمة:
+    split(args, kwargs, parts) → [(args, kwargs), ...] لاستدعاءات shard_func،
+    merge(calls, results) → النتيجة النهائية بنفس شكل نتيجة المهمة الأصلية."""
+
+    def __init__(self, split: Callable, merge: Callable, shard_func: str = None):
+        self.split = split
+        self.merge = merge
+        self.shard_func = shard_func
+
+    def __repr__(self):
+        return f"Splitter(shard_func={self.shard_func!r})"
+
+
+def split_range(low: int, high: int, parts: int, min_size: int = 1) -> List[Tuple[int, int]]:
+    """تقسيم المجال المغلق [low, high] إلى حتى parts مقطعاً متجاوراً لا يقل طول أيّها عن min_size"""
+    total = high - low + 1
+    if total <= 0:
+        return []
+    parts = max(1, min(parts, total // max(1, min_size)))
+    bounds = [low + total * i // parts for i in range(parts + 1)]
+    return [(bounds[i], bounds[i + 1] - 1) for i in range(parts)]
+
+
+def splittable(func: str, impl: Callable = None) -> bool:
+    """هل للمهمة المسجّلة func مقسِّم؟ مع impl: فقط إن كانت الدالة المسجّلة هي impl نفسها،
+    فالأجزاء تنفّذ دوال السجل ودمجها بشكل نتيجتها هي لا بشكل دالة أخرى تحمل الاسم نفسه"""
+    from offload_core import tasks
+    spec = tasks.get(func)
+    if spec is None or spec.splitter is None:
+        return False
+    return impl is None or spec.func is getattr(impl, "__wrapped__", impl)
+
+
+def run(func: str, args=(), kwargs=None, peers=(), local_workers: int = executors.CPU_COUNT):
+    """تنفيذ func مقسّمة على peers (host:port) وعلى local_workers نواة محلية، ثم دمج النتائج"""
+    from offload_core import tasks
+    spec = tasks.get(func)
+    if spec is None or spec.splitter is None:
+        raise ValueError(f"المهمة غير قابلة للتقسيم: {func}")
+    splitter = spec.splitter
+    shard_spec = tasks.get(splitter.shard_func) if splitter.shard_func else spec
+    peers = get_health().healthy(peers)
+    workers = list(peers) + [LOCAL] * max(1, local_workers)
+    calls = splitter.split(tuple(args), dict(kwargs or {}), len(workers) * OVERSPLIT)
+    results = [None] * len(calls)
+    pending = deque(enumerate(calls))
+    lock = threading.Lock()
+
+    def work(node):
+        while True:
+            with lock:
+                if not pending:
+                    return
+                index, (shard_args, shard_kwargs) = pending.popleft()
+            try:
+                results[index] = _run_shard(node, shard_spec, shard_args, shard_kwargs)
+            except Exception as e:
+                with lock:
+                    pending.appendleft((index, (shard_args, shard_kwargs)))
+                if node == LOCAL:
+                    raise
+                logging.warning(f"⚠️ فشل جزء {index} من {func} على {node}: {e} - إخراجه من التوزيع")
+                return
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(workers), thread_name_prefix="dts-map") as pool:
+        for future in [pool.submit(work, node) for node in workers]:
+            future.result()
+    # أجزاء أعادها جهاز فشل بعد انتهاء العمّال المحليين
+    while pending:
+        index, (shard_args, shard_kwargs) = pending.popleft()
+        results[index] = _run_shard(LOCAL, shard_spec, shard_args, shard_kwargs)
+    logging.info(f"🧩 {func}: {len(calls)} جزء على {len(peers)} جهاز + {local_workers} نواة "
+                 f"في {time.perf_counter() - start:.3f}s")
+    return splitter.merge(calls, results)
+
+
+def _run_shard(node, spec, args, kwargs):
+    scheduler = get_scheduler()
+    start = time.perf_counter()
+    if node == LOCAL:
+        with scheduler.track(LOCAL):
+            result = executors.get_router().submit(spec, args, kwargs).result()
+        scheduler.record(LOCAL, spec.name, time.perf_counter() - start)
+        return result
+    payload = {"func": spec.name, "args": list(args), "kwargs": kwargs}
+    with scheduler.track(node), observe(node):
+        response = wire.post(f"http://{node}/run", payload, timeout=SHARD_TIMEOUT)
+    if "error" in response:
+        raise RuntimeError(response["error"])
+    wall = time.perf_counter() - start
+    if not response.get("cached"):
+        scheduler.record(node, spec.name, response.get("took", wall), wall, wire.estimate_size(payload))
+    return response["result"]
@@ -0,0 +1,424 @@
+# node_server.py
+"""
+خادم العقدة غير المتزامن (ASGI) على المنفذ 7520.
+- يستقبل /run و /run_batch ويوجّهها عبر سجل offload_core.tasks.
+- التنفيذ يمر عبر offload_core.executors (inline / threads / processes) حسب نوع المهمة،
+  فلا تُحجز حلقة الأحداث وتُستخدم كل أنوية الجهاز.
+- لكل دالة حد توازي وطابور انتظار محدود؛ عند الامتلاء يُرد 429 مع Retry-After.
+- وفوق ذلك منافذ للعقدة كلها لكل فئة موارد (cpu / memory / io، offload_core.admission):
+  الاستدعاءات بعد امتلاء منافذ الفئة وطابورها تُرفض بـ 429، وتُعلن العقدة انشغالها في
+  خاصية "load" عبر mDNS كي لا يتكدّس العملاء على عقدة مشبعة.
+- مع DTS_WORK_STEALING=1 تصبح المهام المنتظرة قابلة للسرقة من العقد الفارغة
+  (/steal و /steal/complete)، وتبحث هذه العقدة بدورها عن عمل عند فراغ منافذها.
+- مع DTS_RESULT_CACHE=1 تُجاب المهام الحتمية من offload_core.result_cache (محلياً أو من
+  ذاكرة جهاز آخر)، وتُتاح النتائج المحفوظة هنا للأجهزة الأخرى عبر GET /cache/<key>.
+- الاستدعاءات المتطابقة الجارية في نفس الوقت لمهمة حتمية تشترك في تنفيذ واحد (offload_core.single_flight).
+- المهام المولِّدة تُبث أجزاؤها عبر /run_stream بصيغة SSE (offload_core.streaming).
+- "keep": true يُبقي النتيجة في مخزن الكائنات هنا ويُرجع مرجعاً إليها، والمراجع في الوسائط
+  تُحل من المخزن المحلي أو من مالكها (offload_core.object_store، GET /objects/<id>).
+"""
+
+import os
+import json
+import time
+import socket
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+import psutil
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from offload_core import (admission, executors, object_store, result_cache, single_flight, streaming, tasks,
+                          tiled_matmul, wire, work_stealing)
+from offload_core.batching import NDJSON
+
+PORT = 7520
+QUEUE_FACTOR = int(os.getenv("DTS_QUEUE_FACTOR", "4"))   # طول الطابور = الحد × هذا المعامل
+RETRY_AFTER = int(os.getenv("DTS_RETRY_AFTER", "1"))     # ثوانٍ
+STEAL_SLOTS = int(os.getenv("DTS_STEAL_SLOTS", str(executors.CPU_COUNT)))  # منافذ تُعلن للسرقة
+
+STEAL_QUEUE = work_stealing.StealQueue()
+IN_FLIGHT = single_flight.AsyncSingleFlight()
+_SELF = None   # host:port لهذه العقدة (يُحسب عند أول حاجة)
+
+
+@asynccontextmanager
+async def lifespan(_app):
+    # تشغيل عمّال مجمّع العمليات قبل أول طلب
+    router = executors.get_router()
+    if router.mode in ("auto", "processes"):
+        await asyncio.get_running_loop().run_in_executor(None, router.backend, "processes")
+    advertiser = asyncio.create_task(_advertise_loop())
+    stealer = asyncio.create_task(_steal_loop()) if work_stealing.ENABLED else None
+    yield
+    advertiser.cancel()
+    if stealer is not None:
+        stealer.cancel()
+
+
+app = FastAPI(title="DTS Node Server", lifespan=lifespan)
+
+
+# حدود التوازي لكل دالة ومنافذ العقدة لكل فئة موارد: نفس SlotPool الذي يستخدمه peer_server
+_limiters = {}
+NODE_SLOTS = admission.NodeSlots()
+
+
+def _limiter_for(spec: tasks.TaskSpec) -> admission.SlotPool:
+    limiter = _limiters.get(spec.name)
+    if limiter is None:
+        limiter = admission.SlotPool(spec.max_concurrency, spec.max_concurrency * QUEUE_FACTOR)
+        _limiters[spec.name] = limiter
+    return limiter
+
+
+def _slots_for(spec: tasks.TaskSpec):
+    """منافذ فئة موارد المهمة على العقدة (None للمهام التي لا تحجز منفذاً)"""
+    return NODE_SLOTS.pools.get(spec.resource)
+
+
+async def execute(spec: tasks.TaskSpec, args, kwargs):
+    """تنفيذ المهمة خارج حلقة الأحداث عبر خلفية التنفيذ المناسبة، بعد حجز منفذ من فئتها"""
+    if executors.get_router().backend_for(spec).name == "inline":
+        return spec.func(*args, **kwargs)
+    slots = _slots_for(spec)
+    if slots is not None:
+        await slots.acquire_async(reject=False)
+    try:
+        return await asyncio.wrap_future(executors.get_router().submit(spec, args, kwargs))
+    finally:
+        if slots is not None:
+            slots.release()
+
+
+async def run_call(call: dict, reject: bool = True) -> dict:
+    """تنفيذ استدعاء واحد مع حدود التوازي؛ يُرجع عنصر نتيجة.
+    reject=False ينتظر دوره في الطابور بدل رفض الطلب (لعناصر الدفعة الواحدة)."""
+    spec = tasks.get(call.get("func"))
+    if spec is None:
+        return {"error": "function-not-found", "status": 404}
+    if spec.streaming:
+        return {"error": "streaming-task: use /run_stream", "status": 400}
+    loop = asyncio.get_running_loop()
+    if object_store.refs_in([call.get("args"), call.get("kwargs")]):
+        try:
+            args, kwargs = await loop.run_in_executor(
+                None, object_store.resolve, [call.get("args") or [], call.get("kwargs") or {}], _self_key())
+        except Exception as e:
+            return {"error": f"object-ref: {e}", "status": 404 if isinstance(e, KeyError) else 502}
+        call = {**call, "args": args, "kwargs": kwargs}
+    key = None
+    if single_flight.ENABLED and spec.deterministic and "lease_id" not in call:
+        # تجزئة المصفوفات خارج حلقة الأحداث
+        key = await loop.run_in_executor(None, single_flight.flight_key, spec.name,
+                                         call.get("args") or [], call.get("kwargs") or {})
+    if key is None:
+        item = await _run_call(spec, call, reject)
+    else:
+        item = dict(await IN_FLIGHT.do(key, _run_call, spec, call, reject))
+    if call.get("keep") and "result" in item:
+        item["result"] = object_store.keep(item["result"], owner=_self_key())
+    return item
+
+
+def _self_key() -> str:
+    """عنوان هذه العقدة host:port كما تراه الأجهزة الأخرى"""
+    global _SELF
+    if _SELF is None:
+        _SELF = f"{work_stealing.local_ip()}:{PORT}"
+    return _SELF
+
+
+async def _run_call(spec: tasks.TaskSpec, call: dict, reject: bool) -> dict:
+    if not (result_cache.ENABLED and spec.deterministic):
+        return await _run_limited(spec, call, reject)
+    loop = asyncio.get_running_loop()
+    key = await loop.run_in_executor(None, result_cache.key_for_call, spec.name,
+                                     call.get("args") or [], call.get("kwargs") or {})
+    if key is None:
+        return await _run_limited(spec, call, reject)
+    cached = await loop.run_in_executor(None, _cache_lookup, key)
+    if cached is not result_cache.MISS:
+        return {"result": cached, "host": socket.gethostname(), "took": 0.0, "cached": True}
+    item = await _run_limited(spec, call, reject)
+    if "result" in item:
+        await loop.run_in_executor(None, result_cache.get_result_cache().put, key, item["result"])
+    return item
+
+
+def _cache_lookup(key: str):
+    """بحث في ذاكرة النتائج المحلية ثم لدى الأجهزة الأخرى"""
+    from offload_core.peer_table import get_peer_table
+    me = _self_key()
+    peers = [p for p in get_peer_table().peers() if p != me]
+    return result_cache.get_result_cache().lookup(key, peers)
+
+
+async def _run_limited(spec: tasks.TaskSpec, call: dict, reject: bool) -> dict:
+    limiter = _limiter_for(spec)
+    busy = {"error": "busy", "status": 429, "retry_after": RETRY_AFTER}
+    slots = _slots_for(spec)
+    if reject and slots is not None and slots.saturated():
+        return busy
+    stealable = work_stealing.ENABLED and spec.kind != "inline" and "lease_id" not in call
+    if stealable and limiter.active >= limiter.slots:
+        if reject and limiter.saturated():
+            return busy
+        return await _run_stealable(spec, limiter, call)
+    try:
+        await limiter.acquire_async(reject)
+    except admission.Busy:
+        return busy
+    return await _run_owned(spec, limiter, call)
+
+
+async def _run_owned(spec: tasks.TaskSpec, limiter: admission.SlotPool, call: dict) -> dict:
+    """تنفيذ استدعاء حجز منفذه مسبقاً، ثم تحرير المنفذ"""
+    try:
+        start = time.time()
+        result = await execute(spec, call.get("args") or [], call.get("kwargs") or {})
+        # نواتج على القرص (tiled_matmul) تصبح مراجع كائنات هنا بدل مسارات لا يصل إليها المرسِل
+        result = tiled_matmul.adopt(result, owner=_self_key())
+    except Exception as e:
+        logging.error(f"🔥 خطأ أثناء تنفيذ {spec.name}: {e}")
+        return {"error": str(e), "status": 500}
+    finally:
+        limiter.release()
+    return {"result": result, "host": socket.gethostname(), "took": round(time.time() - start, 3)}
+
+
+async def _run_stealable(spec: tasks.TaskSpec, limiter: admission.SlotPool, call: dict) -> dict:
+    """انتظار منفذ محلي مع إتاحة المهمة للسرقة؛ أيهما يسبق ينفّذها"""
+    entry = STEAL_QUEUE.put(spec.name, call)
+    try:
+        while True:
+            acquire = asyncio.ensure_future(limiter.acquire_async(reject=False))
+            await asyncio.wait({acquire, entry.future}, return_when=asyncio.FIRST_COMPLETED)
+            if entry.future.done():
+                if not acquire.cancel() and acquire.exception() is None:
+                    limiter.release()
+                return entry.future.result()
+            if STEAL_QUEUE.claim_local(entry):
+                return await _run_owned(spec, limiter, call)
+            # مسروقة حالياً: انتظار نتيجتها حتى نهاية الإيجار
+            limiter.release()
+            try:
+                return await asyncio.wait_for(asyncio.shield(entry.future), entry.remaining() + 0.1)
+            except asyncio.TimeoutError:
+                STEAL_QUEUE.reap()
+    finally:
+        STEAL_QUEUE.discard(entry)
+
+
+# ---- سرقة المهام (جهة السارق) ------------------------------------------------
+
+def _free_slots() -> int:
+    """منافذ حرة لسرقة عمل: لا شيء إن كان لدينا طابور خاص بنا"""
+    if len(STEAL_QUEUE):
+        return 0
+    busy = sum(limiter.active + limiter.waiting for limiter in _limiters.values())
+    cpu = NODE_SLOTS.pools["cpu"]
+    return max(0, min(STEAL_SLOTS - busy, cpu.slots - cpu.active - cpu.waiting))
+
+
+def _slot_states() -> dict:
+    return NODE_SLOTS.states()
+
+
+async def _run_stolen(victim: str, task: dict):
+    item = await run_call(task, reject=False)
+    item["stolen_by"] = socket.gethostname()
+    await asyncio.get_running_loop().run_in_executor(
+        None, work_stealing.complete_on, victim, task["lease_id"], item)
+
+
+async def _steal_loop():
+    from offload_core.peer_table import get_peer_table
+    loop = asyncio.get_running_loop()
+    table = await loop.run_in_executor(None, get_peer_table)
+    me = _self_key()
+    while True:
+        await asyncio.sleep(work_stealing.INTERVAL)
+        free = _free_slots()
+        for victim in work_stealing.victims(table.all(), exclude={me}):
+            if free <= 0:
+                break
+            try:
+                reply = await loop.run_in_executor(
+                    None, work_stealing.steal_from, victim, me,
+                    min(free, work_stealing.MAX_STEAL), list(tasks.REGISTRY))
+            except Exception as e:
+                logging.debug(f"تعذّرت السرقة من {victim}: {e}")
+                continue
+            for task in reply.get("tasks", []):
+                logging.info(f"🦝 سرقة {task['func']} من {victim}")
+                asyncio.create_task(_run_stolen(victim, task))
+                free -= 1
+
+
+async def _advertise_loop():
+    """نشر انشغال منافذ العقدة (ومنافذ السرقة وطول طابورها) عبر mDNS كلما تغيّر"""
+    loop = asyncio.get_running_loop()
+    advertised = None
+    while True:
+        props = admission.advertisement(_slot_states(), slots=_free_slots(), queued=len(STEAL_QUEUE))
+        if props != advertised and await loop.run_in_executor(None, admission.publish, props):
+            advertised = props
+        await asyncio.sleep(admission.ADVERTISE_EVERY)
+
+
+def _reply(request: Request, payload: dict, status: int = 200, headers=None):
+    body, content_type = wire.encode_body(payload, request.headers.get("accept"))
+    return Response(body, status_code=status, media_type=content_type, headers=headers)
+
+
+# ---- نقاط النهاية -----------------------------------------------------------
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "port": PORT}
+
+
+@app.get("/cpu")
+async def cpu():
+    return {"usage": psutil.cpu_percent(interval=None)}
+
+
+@app.get("/slots")
+async def slots():
+    return {"free": _free_slots(), **STEAL_QUEUE.stats(),
+            "classes": {name: dict(zip(("active", "waiting", "slots"), state))
+                        for name, state in _slot_states().items()}}
+
+
+@app.get("/cache/{key}")
+async def cache_entry(key: str, request: Request):
+    """نتيجة محفوظة محلياً لمفتاح محتوى؛ 404 إن لم توجد (لا يُسأل أي جهاز آخر)"""
+    if not result_cache.ENABLED:
+        return JSONResponse({"error": "cache-disabled"}, status_code=404)
+    value = await asyncio.get_running_loop().run_in_executor(None, result_cache.get_result_cache().get, key)
+    if value is result_cache.MISS:
+        return JSONResponse({"error": "not-found"}, status_code=404)
+    return _reply(request, {"result": value})
+
+
+@app.get("/objects/{object_id}")
+async def get_object(object_id: str, request: Request):
+    """قيمة كائن محفوظ هنا (لمهمة تُنفَّذ على جهاز آخر)"""
+    try:
+        value = object_store.get_store().get(object_id)
+    except KeyError:
+        return JSONResponse({"error": "not-found"}, status_code=404)
+    return _reply(request, {"result": value})
+
+
+@app.delete("/objects/{object_id}")
+async def delete_object(object_id: str):
+    return {"deleted": object_store.get_store().delete(object_id)}
+
+
+@app.get("/project_info")
+async def project_info():
+    from project_identifier import get_project_info
+    return get_project_info()
+
+
+@app.post("/run")
+async def run(request: Request):
+    data = wire.decode_body(request.headers.get("content-type"), await request.body())
+    item = await run_call(data)
+    status = item.pop("status", 200)
+    if status == 429:
+        return JSONResponse({"error": "busy"}, status_code=429,
+                            headers={"Retry-After": str(item["retry_after"])})
+    return _reply(request, item, status)
+
+
+@app.post("/run_stream")
+async def run_stream(request: Request):
+    """تنفيذ مهمة مولِّدة وبث أجزائها (SSE) فور إنتاجها"""
+    data = wire.decode_body(request.headers.get("content-type"), await request.body())
+    spec = tasks.get(data.get("func"))
+    if spec is None:
+        return JSONResponse({"error": "function-not-found"}, status_code=404)
+    if not spec.streaming:
+        return JSONResponse({"error": "not-a-streaming-task: use /run"}, status_code=400)
+    limiter, slots = _limiter_for(spec), _slots_for(spec)
+    try:
+        await limiter.acquire_async()
+    except admission.Busy:
+        return JSONResponse({"error": "busy"}, status_code=429, headers={"Retry-After": str(RETRY_AFTER)})
+    if slots is not None:
+        try:
+            await slots.acquire_async()
+        except admission.Busy:
+            limiter.release()
+            return JSONResponse({"error": "busy"}, status_code=429, headers={"Retry-After": str(RETRY_AFTER)})
+
+    async def events():
+        start, count = time.time(), 0
+        try:
+            async for chunk in streaming.aiter_chunks(spec.func, data.get("args") or [], data.get("kwargs") or {}):
+                count += 1
+                yield streaming.sse_event("chunk", chunk)
+        except Exception as e:
+            logging.error(f"🔥 خطأ أثناء بث {spec.name}: {e}")
+            yield streaming.sse_event("error", {"error": str(e)})
+            return
+        finally:
+            limiter.release()
+            if slots is not None:
+                slots.release()
+        yield streaming.sse_event("end", {"host": socket.gethostname(),
+                                          "took": round(time.time() - start, 3), "chunks": count})
+
+    return StreamingResponse(events(), media_type=streaming.SSE, headers={"Cache-Control": "no-cache"})
+
+
+@app.post("/run_batch")
+async def run_batch(request: Request):
+    data = wire.decode_body(request.headers.get("content-type"), await request.body())
+    calls = data.get("calls", [])
+
+    async def indexed(index, call):
+        item = await run_call(call, reject=False)
+        item.pop("status", None)
+        item["index"] = index
+        return item
+
+    async def stream():
+        for done in asyncio.as_completed([indexed(i, c) for i, c in enumerate(calls)]):
+            yield json.dumps(wire.to_jsonable(await done)) + "\n"
+
+    return StreamingResponse(stream(), media_type=NDJSON)
+
+
+@app.post("/steal")
+async def steal(request: Request):
+    """تأجير مهام منتظرة لعقدة فارغة"""
+    data = wire.decode_body(request.headers.get("content-type"), await request.body())
+    funcs = set(data.get("funcs") or []) or None
+    limit = max(0, min(int(data.get("max", 1)), work_stealing.MAX_STEAL))
+    entries = STEAL_QUEUE.steal(data.get("thief", request.client.host), limit, funcs)
+    tasks_out = [{"lease_id": e.id, "func": e.func, "args": e.call.get("args") or [],
+                  "kwargs": e.call.get("kwargs") or {}, "lease": STEAL_QUEUE.lease} for e in entries]
+    return _reply(request, {"tasks": tasks_out, **STEAL_QUEUE.stats()})
+
+
+@app.post("/steal/complete")
+async def steal_complete(request: Request):
+    """استلام نتيجة مهمة مسروقة؛ 410 إن انتهى إيجارها"""
+    data = wire.decode_body(request.headers.get("content-type"), await request.body())
+    accepted = STEAL_QUEUE.complete(data.pop("lease_id", None), data)
+    return JSONResponse({"accepted": accepted}, status_code=200 if accepted else 410)
+
+
+def serve(host: str = "0.0.0.0", port: int = PORT):
+    import uvicorn
+    uvicorn.run(app, host=host, port=port, log_level="warning")
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,185 @@
+# object_store.py
+"""
+مراجع كائنات بعيدة: إبقاء النتائج الوسيطة على الجهاز الذي أنتجها.
+
+- استدعاء /run مع "keep": true يحفظ النتيجة في مخزن الجهاز ويُرجع مرجعاً بدلها:
+      {"__objref__": <id>, "owner": "host:port", "nbytes": <الحجم التقريبي>}
+- يمكن تمرير المرجع وسيطاً لمهمة لاحقة؛ يحلّه الجهاز المنفِّذ من مخزنه مباشرة إن كان المالك،
+  وإلا يجلبه من المالك عبر GET /objects/<id>.
+- تفضّل الجدولة تشغيل المهمة حيث توجد بياناتها (locality) لأن نقل المراجع يُحتسب ضمن كلفة النقل.
+- المالك LOCAL يعني مخزن هذه العملية (نتيجة نُفّذت محلياً لدى المرسِل)؛ تُضمَّن قيمتها عند الإرسال.
+- كائن على القرص (np.memmap) يُحفظ مع on_drop يحذف ملفه عند حذفه أو انتهاء صلاحيته أو إخراجه،
+  ولا يُحتسب من سعة الذاكرة (resident=False).
+"""
+
+import os
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+
+from offload_core import http_pool, wire
+from offload_core.complexity import LOCAL
+
+REF_KEY = "__objref__"
+MAX_BYTES = int(os.getenv("DTS_OBJECT_STORE_MB", "1024")) * 1024 * 1024
+TTL = float(os.getenv("DTS_OBJECT_TTL", "600"))     # ثوانٍ قبل إسقاط كائن لم يُطلب
+FETCH_TIMEOUT = 60
+
+
+class ObjectStore:
+    """مخزن كائنات محدود الحجم (LRU) مع صلاحية لكل كائن"""
+
+    def __init__(self, max_bytes: int = MAX_BYTES, ttl: float = TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._objects = OrderedDict()   # id → (value, البايتات المحتسبة، expires)
+        self._on_drop = {}              # id → دالة تنظيف عند إزالة الكائن
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, value, on_drop=None, resident: bool = True) -> tuple:
+        """حفظ value وإرجاع (id, nbytes)؛ on_drop() تُستدعى عند إزالته أياً كان السبب"""
+        object_id, nbytes = uuid.uuid4().hex, wire.estimate_size(value)
+        accounted = nbytes if resident else 0
+        with self._lock:
+            self._objects[object_id] = (value, accounted, time.time() + self.ttl)
+            if on_drop is not None:
+                self._on_drop[object_id] = on_drop
+            self._bytes += accounted
+            self._evict()
+        return object_id, nbytes
+
+    def get(self, object_id: str):
+        """القيمة المحفوظة (تمدد صلاحيتها)؛ KeyError إن لم توجد أو انتهت"""
+        with self._lock:
+            value, nbytes, expires = self._objects[object_id]
+            if expires <= time.time():
+                self._drop(object_id)
+                raise KeyError(object_id)
+            self._objects[object_id] = (value, nbytes, time.time() + self.ttl)
+            self._objects.move_to_end(object_id)
+            return value
+
+    def delete(self, object_id: str) -> bool:
+        with self._lock:
+            return self._drop(object_id)
+
+    def stats(self) -> dict:
+        return {"objects": len(self._objects), "bytes": self._bytes}
+
+    def _drop(self, object_id) -> bool:
+        item = self._objects.pop(object_id, None)
+        if item is not None:
+            self._bytes -= item[1]
+        on_drop = self._on_drop.pop(object_id, None)
+        if on_drop is not None:
+            try:
+                on_drop()
+            except Exception as e:
+                logging.warning(f"⚠️ تعذّر تنظيف الكائن {object_id}: {e}")
+        return item is not None
+
+    def _evict(self):
+        now = time.time()
+        for object_id in [k for k, (_, _, expires) in self._objects.items() if expires <= now]:
+            self._drop(object_id)
+        while self._bytes > self.max_bytes and len(self._objects) > 1:
+            self._drop(next(iter(self._objects)))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> ObjectStore:
+    """مخزن الكائنات المشترك على مستوى العملية"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ObjectStore()
+        return _store
+
+
+# ---- المراجع -----------------------------------------------------------------
+
+def make_ref(object_id: str, owner: str, nbytes: int) -> dict:
+    return {REF_KEY: object_id, "owner": owner, "nbytes": nbytes}
+
+
+def keep(value, owner: str = LOCAL, on_drop=None, resident: bool = True) -> dict:
+    """حفظ value في مخزن هذه العملية وإرجاع مرجع مالكه owner"""
+    object_id, nbytes = get_store().put(value, on_drop, resident)
+    return make_ref(object_id, owner, nbytes)
+
+
+def is_ref(obj) -> bool:
+    return isinstance(obj, dict) and REF_KEY in obj
+
+
+def refs_in(obj) -> list:
+    if is_ref(obj):
+        return [obj]
+    if isinstance(obj, dict):
+        return [r for v in obj.values() for r in refs_in(v)]
+    if isinstance(obj, (list, tuple)):
+        return [r for v in obj for r in refs_in(v)]
+    return []
+
+
+def locality(obj) -> dict:
+    """{المالك: بايتات البيانات المشار إليها} لاستخدامها في الجدولة"""
+    owners = {}
+    for ref in refs_in(obj):
+        owners[ref["owner"]] = owners.get(ref["owner"], 0) + ref.get("nbytes", 0)
+    return owners
+
+
+def resolve(obj, me: str = LOCAL):
+    """استبدال كل مرجع بقيمته: من المخزن المحلي إن كان المالك me أو LOCAL، وإلا من المالك"""
+    if is_ref(obj):
+        if obj["owner"] in (me, LOCAL):
+            return get_store().get(obj[REF_KEY])
+        return fetch(obj)
+    if isinstance(obj, dict):
+        return {k: resolve(v, me) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [resolve(v, me) for v in obj]
+    return obj
+
+
+def inline_local(obj):
+    """تضمين قيم المراجع المملوكة لهذه العملية (LOCAL) قبل إرسال المهمة إلى جهاز آخر"""
+    if is_ref(obj):
+        return get_store().get(obj[REF_KEY]) if obj["owner"] == LOCAL else obj
+    if isinstance(obj, dict):
+        return {k: inline_local(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [inline_local(v) for v in obj]
+    return obj
+
+
+def fetch(ref: dict):
+    """جلب قيمة مرجع من الجهاز المالك"""
+    if ref["owner"] == LOCAL:
+        return get_store().get(ref[REF_KEY])
+    url = f"http://{http_pool.peer_key(ref['owner'])}/objects/{ref[REF_KEY]}"
+    response = http_pool.get(url, timeout=FETCH_TIMEOUT,
+                             headers={"Accept": f"{wire.CONTENT_TYPE}, {wire.JSON_TYPE}"})
+    if response.status_code == 404:
+        raise KeyError(f"الكائن {ref[REF_KEY]} لم يعد موجوداً لدى {ref['owner']}")
+    response.raise_for_status()
+    return wire.decode_response(response)["result"]
+
+
+def release(ref: dict):
+    """حذف كائن لم يعد مطلوباً من مالكه"""
+    if ref["owner"] == LOCAL:
+        get_store().delete(ref[REF_KEY])
+        return
+    try:
+        url = f"http://{http_pool.peer_key(ref['owner'])}/objects/{ref[REF_KEY]}"
+        http_pool.POOL.request("DELETE", url, timeout=5)
+    except Exception as e:
+        logging.debug(f"تعذّر حذف {ref[REF_KEY]} من {ref['owner']}: {e}")
@@ -5,6 +5,7 @@ import socket, threading, time, zeroconf
 SERVICE = "_tasknode._tcp.local."
 PORT = 7520
 PEERS = set()  # مجموعة URLs الجاهزة /run
+_registered = {}  # zc / info للخدمة المسجّلة (لتحديث خصائص TXT لاحقاً)
 
 
 # 🟢 دالة موثوقة لحساب IP المحلي (LAN)
@@ -36,11 +37,26 @@ def register_service():
 
     try:
         zc.register_service(info)
+        _registered.update(zc=zc, info=info)
         print(f"✅ Service registered: {SERVICE} on {local_ip}:{PORT}")
     except Exception as e:
         print(f"❌ Failed to register service: {e}")
 
 
+def advertise(**props):
+    """تحديث خصائص TXT للخدمة المسجّلة (مثل load / slots / queued)"""
+    zc, info = _registered.get("zc"), _registered.get("info")
+    if info is None:
+        return False
+    properties = dict(info.properties or {})
+    properties.update({k.encode(): str(v).encode() for k, v in props.items()})
+    info = zeroconf.ServiceInfo(info.type, info.name, addresses=info.addresses,
+                                port=info.port, properties=properties)
+    zc.update_service(info)
+    _registered["info"] = info
+    return True
+
+
 # ❷ Listener لاكتشاف الأجهزة
 class Listener:
     def _add(self, zc, t, name):
@@ -0,0 +1,197 @@
+# peer_health.py
+"""
+سجل صحة الأجهزة من جهة المرسل، تغذّيه نتائج الاستدعاءات الفعلية.
+
+- لكل جهاز: عدد الاستدعاءات والإخفاقات ومرات انتهاء المهلة، ونسبة نجاح وزمن رد بمتوسط متحرك (EWMA).
+- قاطع دائرة (circuit breaker) لكل جهاز:
+  closed: الطلبات تمر؛ بعد FAILURES إخفاقات متتالية يُفتح القاطع.
+  open: يُتخطى الجهاز دون أي اتصال لمدة COOLDOWN ثانية.
+  half-open: بعد المهلة يُسمح بطلب تجريبي واحد؛ نجاحه يغلق القاطع وفشله يعيد فتحه
+  بمهلة مضاعفة (حتى MAX_COOLDOWN).
+- usable() / healthy() لمسارات الجدولة: لا تُحجز بها محاولة تجريبية؛ allow() لمن سيرسل فعلاً.
+- observe(peer) يحيط طلباً واحداً ويسجّل نتيجته: 4xx يعني جهازاً حياً، و 5xx وأخطاء الاتصال إخفاق.
+"""
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict
+
+import requests
+
+from offload_core import http_pool
+
+FAILURES = int(os.getenv("DTS_BREAKER_FAILURES", "3"))
+COOLDOWN = float(os.getenv("DTS_BREAKER_COOLDOWN", "5"))     # ثوانٍ قبل أول طلب تجريبي
+MAX_COOLDOWN = 120.0
+PROBE_TIMEOUT = 60.0     # حجز الطلب التجريبي يسقط إن لم تُسجَّل نتيجته
+ALPHA = 0.2              # وزن النتيجة الجديدة في EWMA
+MIN_SUCCESS = 0.05       # أدنى نسبة نجاح تُستخدم في تضخيم كلفة الجهاز
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+
+class CircuitBreaker:
+    """حالة قاطع جهاز واحد"""
+
+    def __init__(self, failures: int = FAILURES, cooldown: float = COOLDOWN):
+        self.threshold = failures
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_at = None      # وقت حجز الطلب التجريبي الجاري
+
+    def usable(self, now: float) -> bool:
+        """هل يمكن إرسال طلب الآن؟ (دون حجز الطلب التجريبي)"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return now - self.opened_at >= self.cooldown
+        return self.probe_at is None or now - self.probe_at >= PROBE_TIMEOUT
+
+    def allow(self, now: float) -> bool:
+        """مثل usable لكن يحجز الطلب التجريبي الوحيد في half-open"""
+        if not self.usable(now):
+            return False
+        if self.state != CLOSED:
+            self.state, self.probe_at = HALF_OPEN, now
+        return True
+
+    def success(self):
+        self.state, self.failures, self.probe_at = CLOSED, 0, None
+        self.cooldown = self.base_cooldown
+
+    def failure(self, now: float) -> bool:
+        """تسجيل إخفاق؛ يُرجع True إن فُتح القاطع الآن"""
+        self.failures += 1
+        if self.state == HALF_OPEN:
+            self.cooldown = min(MAX_COOLDOWN, self.cooldown * 2)
+        elif self.failures < self.threshold or self.state == OPEN:
+            return False
+        self.state, self.opened_at, self.probe_at = OPEN, now, None
+        return True
+
+
+class PeerRecord:
+    """إحصاءات جهاز واحد مع قاطعه"""
+
+    def __init__(self, failures: int, cooldown: float):
+        self.breaker = CircuitBreaker(failures, cooldown)
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.success_rate = 1.0
+        self.latency = None       # EWMA زمن الرد بالثواني
+        self.last_error = None
+
+    def as_dict(self) -> dict:
+        return {"state": self.breaker.state, "calls": self.calls, "errors": self.errors,
+                "timeouts": self.timeouts, "success_rate": round(self.success_rate, 3),
+                "latency": None if self.latency is None else round(self.latency, 4),
+                "last_error": self.last_error}
+
+
+class PeerHealth:
+    """سجل صحة كل الأجهزة المعروفة لهذه العملية"""
+
+    def __init__(self, failures: int = FAILURES, cooldown: float = COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self._peers: Dict[str, PeerRecord] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, peer) -> PeerRecord:
+        key = http_pool.peer_key(peer)
+        record = self._peers.get(key)
+        if record is None:
+            record = self._peers[key] = PeerRecord(self.failures, self.cooldown)
+        return record
+
+    # ---- القراءة (مسارات الجدولة) ---------------------------------------------
+    def usable(self, peer) -> bool:
+        with self._lock:
+            return self._get(peer).breaker.usable(time.monotonic())
+
+    def healthy(self, peers) -> list:
+        """الأجهزة التي يمكن الإرسال إليها الآن، بنفس ترتيبها"""
+        now = time.monotonic()
+        with self._lock:
+            return [p for p in peers if self._get(p).breaker.usable(now)]
+
+    def success_rate(self, peer) -> float:
+        with self._lock:
+            return max(MIN_SUCCESS, self._get(peer).success_rate)
+
+    def state(self, peer) -> str:
+        with self._lock:
+            return self._get(peer).breaker.state
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {key: record.as_dict() for key, record in self._peers.items()}
+
+    # ---- الإرسال والتسجيل -------------------------------------------------------
+    def allow(self, peer) -> bool:
+        with self._lock:
+            return self._get(peer).breaker.allow(time.monotonic())
+
+    def success(self, peer, latency: float = None):
+        with self._lock:
+            record = self._get(peer)
+            record.calls += 1
+            record.success_rate = (1 - ALPHA) * record.success_rate + ALPHA
+            if latency is not None:
+                record.latency = latency if record.latency is None else (1 - ALPHA) * record.latency + ALPHA * latency
+            record.breaker.success()
+
+    def failure(self, peer, error: str = None, timeout: bool = False):
+        with self._lock:
+            record = self._get(peer)
+            record.calls += 1
+            record.errors += 1
+            record.timeouts += int(timeout)
+            record.success_rate *= 1 - ALPHA
+            record.last_error = error
+            opened = record.breaker.failure(time.monotonic())
+        if opened:
+            logging.warning(f"🔌 فتح قاطع {http_pool.peer_key(peer)} بعد إخفاقات متتالية")
+
+
+_health = None
+_health_lock = threading.Lock()
+
+
+def get_health() -> PeerHealth:
+    """سجل الصحة المشترك على مستوى العملية"""
+    global _health
+    with _health_lock:
+        if _health is None:
+            _health = PeerHealth()
+        return _health
+
+
+@contextmanager
+def observe(peer):
+    """تسجيل نتيجة طلب واحد إلى peer في سجل الصحة (الاستثناء يُعاد رفعه كما هو)"""
+    health = get_health()
+    start = time.perf_counter()
+    try:
+        yield
+    except requests.HTTPError as e:
+        status = e.response.status_code if e.response is not None else 500
+        if status < 500:
+            health.success(peer)   # الجهاز حي ويرد
+        else:
+            health.failure(peer, str(e))
+        raise
+    except requests.Timeout as e:
+        health.failure(peer, str(e), timeout=True)
+        raise
+    except Exception as e:
+        health.failure(peer, str(e))
+        raise
+    health.success(peer, time.perf_counter() - start)
@@ -0,0 +1,263 @@
+# peer_table.py
+"""
+جدول أجهزة مشترك على مستوى العملية تغذّيه ServiceBrowser واحدة طويلة العمر.
+- أحداث add / update / remove من Zeroconf تحدّث الجدول مباشرة، ويمكن الاشتراك فيها.
+- فحص توافق المشروع (/project_info) يتم في الخلفية ويُخزَّن مع مدة صلاحية (TTL).
+- peers() تُرجع لقطة جاهزة من الأجهزة المتوافقة (LAN أولاً) دون أي انتظار.
+- مصادر الأجهزة الثابتة (add_source، مثل PEERS في peer_discovery) تُسحب عند كل قراءة،
+  فكل من يقرأ الجدول يرى نفس المجموعة (LAN و WAN والإنترنت).
+"""
+
+import sys
+import time
+import socket
+import logging
+import ipaddress
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from zeroconf import Zeroconf, ServiceBrowser
+
+from offload_core import http_pool
+from offload_core.peer_health import get_health, observe
+
+SERVICE_TYPES = ("_http._tcp.local.", "_tasknode._tcp.local.")
+COMPAT_TTL = 300.0       # صلاحية نتيجة فحص التوافق بالثواني
+REFRESH_INTERVAL = 30.0  # دورة إعادة فحص النتائج المنتهية
+
+
+def is_private(ip: str) -> bool:
+    try:
+        return ipaddress.ip_address(ip).is_private
+    except ValueError:
+        return False
+
+
+def check_compatibility(ip: str, port: int = 7520) -> bool:
+    """فحص إذا كان الجهاز يحتوي على نفس المشروع"""
+    from project_identifier import verify_project_compatibility
+    try:
+        with observe(f"{ip}:{port}"):
+            response = http_pool.get(f"http://{ip}:{port}/project_info", timeout=2)
+        if response.status_code == 200:
+            return verify_project_compatibility(response.json())
+    except Exception:
+        pass
+    return False
+
+
+class PeerTable:
+    """جدول الأجهزة المكتشفة: key = "ip:port" → معلومات الجهاز"""
+
+    def __init__(self, service_types=SERVICE_TYPES, compat_ttl: float = COMPAT_TTL):
+        self.service_types = list(service_types)
+        self.compat_ttl = compat_ttl
+        self._peers = {}
+        self._names = {}  # اسم خدمة Zeroconf → key
+        self._snapshot = ()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._callbacks = {"add": [], "update": [], "remove": []}
+        self._sources = []
+        self._pulled = set()  # مفاتيح أُضيفت من المصادر
+        self._checker = ThreadPoolExecutor(max_workers=4, thread_name_prefix="dts-compat")
+        self._zc = None
+        self._browser = None
+
+    # ---- دورة الحياة ----------------------------------------------------------
+    def start(self):
+        with self._lock:
+            if self._zc is not None:
+                return self
+            self._zc = Zeroconf()
+        self._browser = ServiceBrowser(self._zc, self.service_types, self)
+        threading.Thread(target=self._refresh_loop, daemon=True).start()
+        logging.info(f"🔍 جدول الأجهزة يعمل على {', '.join(self.service_types)}")
+        return self
+
+    def close(self):
+        with self._lock:
+            zc, self._zc = self._zc, None
+        if zc is not None:
+            zc.close()
+
+    # ---- القراءة ---------------------------------------------------------------
+    def peers(self):
+        """الأجهزة المتوافقة بصيغة host:port (LAN أولاً) - بلا انتظار"""
+        self._pull_sources()
+        return self._snapshot
+
+    def get(self, key: str):
+        return self._peers.get(http_pool.peer_key(key))
+
+    def all(self):
+        self._pull_sources()
+        with self._lock:
+            return [dict(info) for info in self._peers.values()]
+
+    def wait_for_peers(self, timeout: float) -> tuple:
+        """انتظار ظهور جهاز متوافق واحد على الأقل حتى timeout"""
+        self._pull_sources()
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while not self._snapshot:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._changed.wait(remaining)
+        return self._snapshot
+
+    def on(self, event: str, callback):
+        """الاشتراك في أحداث add / update / remove (تُستدعى بقاموس معلومات الجهاز)"""
+        self._callbacks[event].append(callback)
+
+    # ---- الإضافة اليدوية --------------------------------------------------------
+    def add_static(self, peer, **props):
+        """إضافة جهاز معروف مسبقاً (WAN أو ناتج مسح الإنترنت)"""
+        key = http_pool.peer_key(peer)
+        ip, port = key.rsplit(":", 1)
+        self._upsert(None, ip, int(port), props)
+
+    def add_source(self, source):
+        """مصدر أجهزة ثابتة: دالة بلا معاملات تُرجع عناوين (host:port أو URL)، تُسحب عند كل قراءة"""
+        self._sources.append(source)
+
+    def _pull_sources(self):
+        for source in self._sources:
+            try:
+                keys = {http_pool.peer_key(peer) for peer in list(source())}
+            except Exception as e:
+                logging.debug(f"تعذّرت قراءة مصدر أجهزة: {e}")
+                continue
+            with self._lock:
+                new = keys - self._pulled
+                self._pulled |= new
+            for key in new:
+                self.add_static(key)
+
+    # ---- واجهة Zeroconf --------------------------------------------------------
+    def add_service(self, zc, type_, name):
+        info = zc.get_service_info(type_, name)
+        if info and info.addresses:
+            props = {k.decode(): (v.decode() if v else "") for k, v in (info.properties or {}).items()}
+            self._upsert(name, socket.inet_ntoa(info.addresses[0]), info.port, props)
+
+    def update_service(self, zc, type_, name):
+        self.add_service(zc, type_, name)
+
+    def remove_service(self, zc, type_, name):
+        with self._lock:
+            key = self._names.pop(name, None)
+            info = self._peers.pop(key, None) if key else None
+            self._rebuild()
+        if info:
+            logging.info(f"❌ جهاز غادر الشبكة: {key}")
+            self._emit("remove", info)
+
+    # ---- داخلي -----------------------------------------------------------------
+    def _upsert(self, name, ip, port, props):
+        key = f"{ip}:{port}"
+        with self._lock:
+            if name:
+                self._names[name] = key
+            info = self._peers.get(key)
+            event = "update" if info else "add"
+            if info is None:
+                info = self._peers[key] = {"key": key, "ip": ip, "port": port,
+                                           "compatible": None, "checked_at": float("-inf")}
+            info.update(props)
+            info["load"] = _as_float(props.get("load"), info.get("load", 0.0))
+            info["slots"] = int(_as_float(props.get("slots"), info.get("slots", 0)))
+            info["queued"] = int(_as_float(props.get("queued"), info.get("queued", 0)))
+            info["capacity"] = int(_as_float(props.get("capacity"), info.get("capacity", 1)))
+            info["last_seen"] = time.time()
+            stale = self._claim_check(info, time.monotonic())
+            self._rebuild()
+        if event == "add":
+            logging.info(f"🔗 جهاز مكتشف: {key}")
+        if stale:
+            self._checker.submit(self._check, key)
+        self._emit(event, info)
+
+    def _check(self, key):
+        info = self._peers.get(key)
+        if info is None:
+            return
+        if not get_health().usable(key):
+            # قاطع مفتوح: لا استطلاع قبل موعد المحاولة التجريبية؛ يُعاد الفحص في الدورة التالية
+            with self._lock:
+                info["checking"] = False
+            return
+        compatible = check_compatibility(info["ip"], info["port"])
+        with self._lock:
+            info["compatible"] = compatible
+            info["checked_at"] = time.monotonic()
+            info["checking"] = False
+            self._rebuild()
+
+    def _claim_check(self, info, now) -> bool:
+        """هل انتهت صلاحية فحص التوافق؟ (يحجز الفحص لتفادي تكراره)"""
+        if info.get("checking") or now - info["checked_at"] <= self.compat_ttl:
+            return False
+        info["checking"] = True
+        return True
+
+    def _rebuild(self):
+        """إعادة بناء اللقطة (تُستدعى والقفل مأخوذ)"""
+        ready = [i for i in self._peers.values() if i["compatible"]]
+        ready.sort(key=lambda i: (not is_private(i["ip"]), i["load"]))
+        self._snapshot = tuple(i["key"] for i in ready)
+        self._changed.notify_all()
+
+    def _refresh_loop(self):
+        while self._zc is not None:
+            time.sleep(REFRESH_INTERVAL)
+            now = time.monotonic()
+            with self._lock:
+                due = [key for key, info in self._peers.items() if self._claim_check(info, now)]
+            for key in due:
+                self._checker.submit(self._check, key)
+
+    def _emit(self, event, info):
+        for callback in self._callbacks[event]:
+            try:
+                callback(dict(info))
+            except Exception as e:
+                logging.warning(f"⚠️ خطأ في معالج حدث {event}: {e}")
+
+
+def _as_float(value, default):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_peer_table() -> PeerTable:
+    """الجدول المشترك على مستوى العملية (يبدأ الاكتشاف عند أول استخدام)"""
+    global _table
+    with _table_lock:
+        if _table is None:
+            _table = PeerTable()
+            _table.add_source(_discovery_peers)
+            _table.on("add", _advertise_load)
+            _table.on("update", _advertise_load)
+            _table.start()
+        return _table
+
+
+def _discovery_peers():
+    """أجهزة الإنترنت إن كان نظام peer_discovery يعمل في هذه العملية"""
+    for module_name in ("offload_core.peer_discovery", "peer_discovery"):
+        yield from list(getattr(sys.modules.get(module_name), "PEERS", ()))
+
+
+def _advertise_load(info):
+    """تمرير انشغال الجهاز المُعلَن (load = نسبة منافذه المشغولة) إلى نموذج الكلفة"""
+    from offload_core.scheduler import get_scheduler
+    capacity = max(1, info.get("capacity", 1))
+    get_scheduler().advertise(info["key"], load=info["load"] * capacity, slots=capacity)
@@ -0,0 +1,184 @@
+# priority.py
+"""
+فئات الأولوية والجدولة حسب أقرب موعد نهائي (EDF) لطابور مهام DistributedExecutor.
+
+- كل مهمة تُغلَّف في TaskEnvelope يحمل: الفئة (INTERACTIVE / NORMAL / BATCH)، الموعد النهائي،
+  والـFuture الذي يُلغى به (future.cancel) ما دام في الطابور.
+- DeadlineQueue يخدم الفئة الأعلى أولاً، وداخل الفئة الموعد الأقرب أولاً، ثم ترتيب الوصول.
+- مهمة انقضى موعدها قبل أن تبدأ: التفاعلية تُسقط (إطار بث متأخر لا قيمة له) بخطأ DeadlineExceeded،
+  وغيرها تُخفَّض إلى BATCH بلا موعد فتُنفَّذ حين يفرغ العمّال.
+- بعض العمّال محجوزون للمهام التفاعلية (get(max_class=INTERACTIVE)) فلا يحجبها حمل الخلفية.
+- الوحدات تعلن فئة مهامها كما تعلن دوال الكلفة: priority.register_class("process_game_stream", INTERACTIVE)
+"""
+
+import os
+import math
+import time
+import heapq
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Dict, Optional
+
+INTERACTIVE, NORMAL, BATCH = 0, 1, 2
+NAMES = {INTERACTIVE: "interactive", NORMAL: "normal", BATCH: "batch"}
+# المهلة الافتراضية من لحظة الإرسال لكل فئة (ثوانٍ؛ inf = بلا موعد)
+DEFAULT_DEADLINES = {
+    INTERACTIVE: float(os.getenv("DTS_DEADLINE_INTERACTIVE", "1.0")),
+    NORMAL: float(os.getenv("DTS_DEADLINE_NORMAL", "inf")),
+    BATCH: float(os.getenv("DTS_DEADLINE_BATCH", "inf")),
+}
+
+CLASSES: Dict[str, int] = {}
+
+
+class DeadlineExceeded(TimeoutError):
+    """انقضى موعد المهمة قبل أن يبدأ تنفيذها"""
+
+
+def register_class(name: str, cls: int):
+    """إعلان فئة أولوية مهمة (المهام غير المعلنة NORMAL)"""
+    if cls not in NAMES:
+        raise ValueError(f"فئة أولوية غير معروفة: {cls}")
+    CLASSES[name] = cls
+
+
+def class_of(name: str) -> int:
+    return CLASSES.get(name, NORMAL)
+
+
+class TaskEnvelope:
+    """مهمة في الطابور مع بيانات جدولتها"""
+
+    __slots__ = ("task", "func", "future", "priority", "deadline", "seq", "queued")
+
+    def __init__(self, task: dict, func, future: Future, priority: int, deadline: float, seq: int):
+        self.task = task
+        self.func = func
+        self.future = future
+        self.priority = priority
+        self.deadline = deadline          # time.monotonic() مطلق، أو inf
+        self.seq = seq
+        self.queued = False               # ما زالت في DeadlineQueue
+
+    @property
+    def key(self):
+        return (self.priority, self.deadline, self.seq)
+
+    def __lt__(self, other):
+        return self.key < other.key
+
+
+def make_envelope(task: dict, func, future: Future, seq: int, priority: Optional[int] = None,
+             deadline: Optional[float] = None) -> TaskEnvelope:
+    """تغليف مهمة: الفئة من السجل إن لم تُحدَّد، والمهلة (ثوانٍ من الآن) من فئتها"""
+    priority = class_of(task["func"]) if priority is None else priority
+    timeout = DEFAULT_DEADLINES[priority] if deadline is None else deadline
+    return TaskEnvelope(task, func, future, priority, time.monotonic() + timeout, seq)
+
+
+class DeadlineQueue:
+    """طابور EDF بفئات أولوية؛ يعامل المهام المنتهية والملغاة عند السحب.
+
+    كومة التنفيذ مرتبة بـ (الفئة، الموعد، الوصول) وكومة ثانية بالمواعيد وحدها، فلا يُفحص عند كل
+    get إلا رأس كومة المواعيد (وما انقضى منها). المدخلات التي تغيّرت (تخفيض أو إسقاط) تبقى في
+    الكومتين وتُتجاهل عند وصولها للرأس، والإلغاء يُفحص فقط على المهمة المسحوبة."""
+
+    def __init__(self):
+        self._heap = []            # (priority, deadline, seq, item)
+        self._deadlines = []       # (deadline, seq, item) للمواعيد المحدودة فقط
+        self._cond = threading.Condition()
+        self._closed = False
+        self._size = 0
+        self.dropped = 0
+        self.downgraded = 0
+
+    def put(self, item: TaskEnvelope):
+        with self._cond:
+            item.queued = True
+            self._push(item)
+            self._size += 1
+            self._cond.notify_all()
+
+    def close(self):
+        """إيقاف كل من ينتظر get (يُرجع None بعد تفريغ الطابور)"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def get(self, max_class: int = BATCH) -> Optional[TaskEnvelope]:
+        """أول مهمة صالحة فئتها ≤ max_class، أو None بعد close وفراغ ما يخصّ المستدعي"""
+        with self._cond:
+            while True:
+                self._expire(time.monotonic())
+                head = self._head()
+                if head is not None and head.priority <= max_class:
+                    heapq.heappop(self._heap)
+                    head.queued = False
+                    self._size -= 1
+                    if head.future.cancelled():
+                        continue
+                    return head
+                if self._closed:
+                    return None
+                self._cond.wait(self._wait_time())
+
+    def __len__(self):
+        with self._cond:
+            return self._size
+
+    def stats(self) -> dict:
+        with self._cond:
+            waiting = {name: 0 for name in NAMES.values()}
+            for entry in self._heap:
+                if self._live(entry[3], entry[0], entry[1]):
+                    waiting[NAMES[entry[0]]] += 1
+            return {"waiting": waiting, "dropped": self.dropped, "downgraded": self.downgraded}
+
+    # ---- داخلي -----------------------------------------------------------------
+    @staticmethod
+    def _live(item: TaskEnvelope, priority: int, deadline: float) -> bool:
+        """هل ما زال المدخل يمثّل حالة المهمة الحالية في الطابور؟"""
+        return item.queued and item.priority == priority and item.deadline == deadline
+
+    def _push(self, item: TaskEnvelope):
+        heapq.heappush(self._heap, (item.priority, item.deadline, item.seq, item))
+        if item.deadline != math.inf:
+            heapq.heappush(self._deadlines, (item.deadline, item.seq, item))
+
+    def _head(self) -> Optional[TaskEnvelope]:
+        while self._heap:
+            priority, deadline, _, item = self._heap[0]
+            if self._live(item, priority, deadline):
+                return item
+            heapq.heappop(self._heap)
+        return None
+
+    def _wait_time(self):
+        """الانتظار حتى أقرب موعد في الطابور (ليُعامل عند انقضائه) أو حتى إشعار جديد"""
+        while self._deadlines:
+            deadline, _, item = self._deadlines[0]
+            if item.queued and item.deadline == deadline:
+                return max(0.0, deadline - time.monotonic())
+            heapq.heappop(self._deadlines)
+        return None
+
+    def _expire(self, now: float):
+        """إسقاط أو تخفيض المهام التي انقضى موعدها (من رأس كومة المواعيد فقط)"""
+        while self._deadlines and self._deadlines[0][0] <= now:
+            deadline, _, item = heapq.heappop(self._deadlines)
+            if not (item.queued and item.deadline == deadline) or item.future.cancelled():
+                continue   # سُحبت أو تغيّرت أو أُلغيت (تُزال من كومة التنفيذ عند وصولها للرأس)
+            if item.priority == INTERACTIVE:
+                item.queued = False
+                self._size -= 1
+                self.dropped += 1
+                if item.future.set_running_or_notify_cancel():
+                    item.future.set_exception(DeadlineExceeded(
+                        f"انقضى موعد {item.task['task_id']} قبل التنفيذ"))
+                logging.warning(f"⏰ إسقاط {item.task['task_id']}: انقضى موعده قبل التنفيذ")
+            else:
+                self.downgraded += 1
+                item.priority, item.deadline = BATCH, math.inf   # seq الأقدم يسبق مهام BATCH الأحدث
+                self._push(item)
+                logging.info(f"⏬ تخفيض {item.task['task_id']} إلى batch: انقضى موعده")
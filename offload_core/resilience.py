@@ -0,0 +1,156 @@
+# resilience.py
+"""
+إرسال مهمة إلى /run بسياسة مرونة بدل إعادة المحاولة على نفس الجهاز:
+
+- failover: كل محاولة تالية تذهب إلى المرشح التالي (الأفضل ترتيباً أولاً) بعد انتظار عشوائي
+  (full jitter) ينمو أُسياً؛ الأجهزة ذات القاطع المفتوح (offload_core.peer_health) تُتخطى،
+  وكل نتيجة تُسجَّل في سجل صحة الأجهزة.
+- hedging: إن تأخر الرد أكثر من p95 لأزمنة هذه الدالة المُقاسة، يُرسل نفس الطلب إلى المرشح التالي
+  الذي ليس لديه نسخة جارية (ولا تحوّط إن لم يوجد) ويُعتمد أول رد ناجح
+  (الطلب الخاسر يكمل في الخلفية ويُحتسب في القواطع والأزمنة).
+- 4xx (عدا 429) خطأ في الطلب نفسه فلا يُعاد؛ 429 يعني جهازاً حياً مشغولاً فيُنتقل لغيره.
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import requests
+
+from offload_core import http_pool, wire
+from offload_core.peer_health import get_health, observe
+
+
+class Policy:
+    """معاملات المرونة لاستدعاء واحد"""
+
+    def __init__(self, attempts: int = None, timeout: float = 10, backoff: float = 0.1,
+                 max_backoff: float = 2.0, hedge: bool = None, hedge_quantile: float = 0.95,
+                 min_hedge_delay: float = 0.05):
+        self.attempts = attempts or int(os.getenv("DTS_OFFLOAD_ATTEMPTS", "3"))
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge = os.getenv("DTS_HEDGE", "1") == "1" if hedge is None else hedge
+        self.hedge_quantile = hedge_quantile
+        self.min_hedge_delay = min_hedge_delay
+
+    def sleep_for(self, attempt: int) -> float:
+        """انتظار عشوائي في [0, min(max_backoff, backoff × 2^attempt)]"""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+
+class LatencyHistory:
+    """آخر أزمنة الردود الناجحة لكل دالة لحساب مهلة التحوّط"""
+
+    MIN_SAMPLES = 5
+
+    def __init__(self, size: int = 200):
+        self._samples = defaultdict(lambda: deque(maxlen=size))
+        self._lock = threading.Lock()
+
+    def record(self, func: str, seconds: float):
+        with self._lock:
+            self._samples[func].append(seconds)
+
+    def quantile(self, func: str, q: float):
+        """الزمن عند الشريحة q، أو None إن لم تكفِ القياسات"""
+        with self._lock:
+            samples = sorted(self._samples.get(func, ()))
+        if len(samples) < self.MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class NotRetryable(Exception):
+    """رفض الجهاز الطلب نفسه (4xx)؛ إرساله لجهاز آخر لن يغيّر النتيجة"""
+
+
+_history = LatencyHistory()
+_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="dts-hedge")
+
+
+def get_latency_history() -> LatencyHistory:
+    return _history
+
+
+def _attempt(peer, payload: dict, timeout: float):
+    """طلب واحد مع تسجيل نتيجته في سجل الصحة وسجل الأزمنة"""
+    start = time.perf_counter()
+    try:
+        with observe(peer):
+            response = wire.post(f"http://{http_pool.peer_key(peer)}/run", payload, timeout=timeout)
+    except requests.HTTPError as e:
+        if e.response is not None and e.response.status_code < 500 and e.response.status_code != 429:
+            raise NotRetryable(f"{peer}: {e}") from e
+        raise
+    _history.record(payload.get("func"), time.perf_counter() - start)
+    return response
+
+
+def call(candidates, payload: dict, policy: Policy = None):
+    """إرسال payload إلى أول مرشح متاح من candidates مع failover و hedging؛ يُرجع (الجهاز، الرد).
+    ConnectionError إن فشلت كل المحاولات."""
+    policy = policy or Policy()
+    health = get_health()
+    candidates = list(candidates)
+    used = []
+
+    def next_peer(busy=()):
+        # من لم يُجرَّب أولاً، ثم إعادة من جُرِّب بالترتيب نفسه؛ busy: أجهزة لديها نسخة جارية
+        for peer in [p for p in candidates if p not in used] + used:
+            if peer not in busy and health.allow(peer):
+                if peer in used:
+                    used.remove(peer)
+                used.append(peer)
+                return peer
+        return None
+
+    errors = []
+    for attempt in range(policy.attempts):
+        peer = next_peer()
+        if peer is None:
+            break
+        try:
+            return _hedged(peer, next_peer, payload, policy)
+        except NotRetryable:
+            raise
+        except Exception as e:
+            errors.append(e)
+            logging.warning(f"فشل المحاولة {attempt + 1} لـ {peer}: {e}")
+        if attempt + 1 < policy.attempts:
+            time.sleep(policy.sleep_for(attempt))
+    raise ConnectionError(f"فشل جميع المحاولات ({', '.join(map(str, used)) or 'لا جهاز متاح'})"
+                          + (f": {errors[-1]}" if errors else ""))
+
+
+def _hedged(peer, next_peer, payload: dict, policy: Policy):
+    """طلب إلى peer، ومعه طلب تحوّط إلى جهاز آخر إن تجاوز زمنُه p95"""
+    delay = None
+    if policy.hedge and not payload.get("keep"):   # المراجع لا تُكرَّر: كل نسخة تنشئ كائناً
+        delay = _history.quantile(payload.get("func"), policy.hedge_quantile)
+        delay = None if delay is None else max(policy.min_hedge_delay, delay)
+    pending = {_pool.submit(_attempt, peer, payload, policy.timeout): peer}
+    error = None
+    while pending:
+        done, _ = wait(pending, timeout=delay, return_when=FIRST_COMPLETED)
+        if not done:
+            delay = None   # تحوّط واحد لكل محاولة
+            second = next_peer(set(pending.values()))
+            if second is not None:
+                logging.info(f"⏱️ {peer} تجاوز p95 - إرسال نسخة تحوّط إلى {second}")
+                pending[_pool.submit(_attempt, second, payload, policy.timeout)] = second
+            continue
+        for future in done:
+            winner = pending.pop(future)
+            try:
+                return winner, future.result()
+            except NotRetryable:
+                raise
+            except Exception as e:
+                error = e
+    raise error
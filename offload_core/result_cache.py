@@ -0,0 +1,249 @@
+# result_cache.py
+"""
+ذاكرة نتائج مُعنونة بالمحتوى للمهام الحتمية (اختيارية: DTS_RESULT_CACHE=1).
+
+- المفتاح: sha256 لاسم الدالة + نسختها + المعاملات بصيغة قانونية (المصفوفات تُجزّأ ببياناتها).
+- طبقتان محلياً: LRU في الذاكرة ثم ملفات DTSF على القرص، ولكل مدخل صلاحية (TTL).
+- عند الغياب محلياً يمكن سؤال الأجهزة الأخرى عبر GET /cache/<key> بمهلة قصيرة.
+- لا تُخزَّن إلا المهام المعلنة deterministic=True في offload_core.tasks، ومن جهة العميل فقط إن كانت
+  الدالة المنفَّذة هي الدالة المسجّلة نفسها (دالة أخرى بنفس الاسم لا تشارك مفاتيحها).
+- القيم تُحفظ مرمّزة (إطار DTSF) في الطبقتين، فكل get يُرجع نسخة مستقلة: تعديلها لا يصل إلى
+  مستدعين آخرين ولا إلى المحفوظ.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+from offload_core import http_pool, wire
+from offload_core.peer_health import get_health, observe
+
+ENABLED = os.getenv("DTS_RESULT_CACHE", "0") == "1"
+TTL = float(os.getenv("DTS_CACHE_TTL", "3600"))                       # ثوانٍ
+MAX_ENTRIES = int(os.getenv("DTS_CACHE_ENTRIES", "1024"))             # مدخلات الذاكرة
+DISK_DIR = os.getenv("DTS_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "dts", "results"))
+DISK_MAX_BYTES = int(os.getenv("DTS_CACHE_DISK_MB", "512")) * 1024 * 1024
+PEER_TIMEOUT = float(os.getenv("DTS_CACHE_PEER_TIMEOUT", "0.3"))      # مهلة سؤال جهاز آخر
+
+MISS = object()
+
+
+# ---- المفتاح -----------------------------------------------------------------
+
+def _canonical(obj):
+    if isinstance(obj, np.ndarray):
+        arr = np.ascontiguousarray(obj)
+        digest = hashlib.sha256(memoryview(arr).cast("B") if arr.size else b"").hexdigest()
+        return {"__ndarray__": [arr.dtype.str, list(arr.shape), digest]}
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, dict):
+        return {str(k): _canonical(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_canonical(v) for v in obj]
+    return obj
+
+
+def _unkeyable(obj):
+    raise TypeError(f"لا صيغة قانونية لـ {type(obj).__name__}")
+
+
+def cache_key(func: str, version: str, args=(), kwargs=None, strict: bool = False) -> str:
+    """مفتاح المحتوى لاستدعاء func(*args, **kwargs) بنسخة version.
+    strict=True يرفض (TypeError) المعاملات التي لا تُمثَّل إلا بـ repr بدل الاعتماد عليه."""
+    body = json.dumps([func, str(version), _canonical(list(args)), _canonical(kwargs or {})],
+                      sort_keys=True, separators=(",", ":"), default=_unkeyable if strict else repr)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def key_for_call(func, args=(), kwargs=None):
+    """مفتاح الاستدعاء إن كانت الذاكرة مفعّلة والدالة حتمية، وإلا None.
+    func: الاسم المسجّل (في الخوادم) أو الدالة نفسها (في مسارات العميل)"""
+    if not ENABLED:
+        return None
+    from offload_core import tasks
+    spec = tasks.spec_for(func)
+    if spec is None or not spec.deterministic:
+        return None
+    return cache_key(spec.name, spec.version, args, kwargs)
+
+
+# ---- الذاكرة -----------------------------------------------------------------
+
+class ResultCache:
+    def __init__(self, max_entries: int = MAX_ENTRIES, ttl: float = TTL,
+                 disk_dir: str = DISK_DIR, disk_max_bytes: int = DISK_MAX_BYTES):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._memory = OrderedDict()   # key → (expires, إطار {"expires", "value"})
+        self._disk_bytes = None        # يُحسب عند أول كتابة
+        self._lock = threading.Lock()
+        self.hits = {"memory": 0, "disk": 0, "peer": 0}
+        self.misses = 0
+
+    def get(self, key: str):
+        """نسخة مستقلة من القيمة في الذاكرة أو القرص، أو MISS"""
+        now = time.time()
+        with self._lock:
+            item = self._memory.get(key)
+            if item is not None:
+                if item[0] > now:
+                    self._memory.move_to_end(key)
+                    self.hits["memory"] += 1
+                    frame = item[1]
+                else:
+                    del self._memory[key]
+                    frame = None
+            else:
+                frame = None
+        if frame is not None:
+            return wire.loads(frame)["value"]
+        frame = self._read_disk(key)
+        if frame is None:
+            return MISS
+        try:
+            entry = wire.loads(frame)
+        except Exception as e:
+            logging.debug(f"مدخل تالف في ذاكرة النتائج {key}: {e}")
+            return MISS
+        if entry["expires"] <= now:
+            return MISS
+        self._remember(key, frame, entry["expires"])
+        self.hits["disk"] += 1
+        return entry["value"]
+
+    def lookup(self, key: str, peers=()):
+        """get ثم سؤال الأجهزة بالتوازي؛ أول جهاز يملك النتيجة يجيب"""
+        value = self.get(key)
+        peers = get_health().healthy(peers)
+        if value is MISS and peers:
+            value = self._ask_peers(key, peers)
+            if value is not MISS:
+                self.hits["peer"] += 1
+                self.put(key, value)
+        if value is MISS:
+            self.misses += 1
+        return value
+
+    def put(self, key: str, value, ttl: float = None):
+        expires = time.time() + (self.ttl if ttl is None else ttl)
+        try:
+            frame = wire.dumps({"expires": expires, "value": value})
+        except Exception as e:
+            logging.debug(f"تعذّر ترميز نتيجة {key}: {e}")
+            return
+        self._remember(key, frame, expires)
+        self._write_disk(key, frame)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._memory), "hits": dict(self.hits), "misses": self.misses}
+
+    # ---- داخلي -----------------------------------------------------------------
+    def _remember(self, key, frame: bytes, expires):
+        with self._lock:
+            self._memory[key] = (expires, frame)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.dtsf")
+
+    def _read_disk(self, key: str):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, data: bytes):
+        if not self.disk_dir:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except Exception as e:
+            logging.debug(f"تعذّرت كتابة {key} على القرص: {e}")
+            return
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+            else:
+                self._disk_bytes += len(data)
+            if self._disk_bytes > self.disk_max_bytes:
+                self._prune_disk()
+
+    def _disk_files(self):
+        for root, _, names in os.walk(self.disk_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _prune_disk(self):
+        """حذف الأقدم حتى ينزل الحجم إلى 80% من الحد"""
+        files = sorted(self._disk_files(), key=lambda f: f[2])
+        total = sum(size for _, size, _ in files)
+        for path, size, _ in files:
+            if total <= self.disk_max_bytes * 0.8:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._disk_bytes = total
+
+    def _ask_peers(self, key: str, peers):
+        headers = {"Accept": f"{wire.CONTENT_TYPE}, {wire.JSON_TYPE}"}
+
+        def ask(peer):
+            with observe(peer):
+                response = http_pool.get(f"http://{http_pool.peer_key(peer)}/cache/{key}",
+                                         timeout=PEER_TIMEOUT, headers=headers)
+            if response.status_code != 200:
+                return MISS
+            return wire.decode_response(response)["result"]
+
+        pool = ThreadPoolExecutor(max_workers=min(8, len(peers)))
+        try:
+            for future in as_completed([pool.submit(ask, p) for p in peers]):
+                try:
+                    value = future.result()
+                except Exception:
+                    continue
+                if value is not MISS:
+                    return value
+            return MISS
+        finally:
+            pool.shutdown(wait=False)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
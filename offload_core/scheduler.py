@@ -0,0 +1,145 @@
+# scheduler.py
+"""
+جدولة مبنية على نموذج كلفة: لكل خيار (جهاز بعيد أو "هنا") يُقدَّر زمن الإكمال:
+
+    الإكمال = النقل (حجم الحمولة ÷ عرض النطاق) + RTT + الانتظار في الطابور + زمن التنفيذ
+
+- زمن التنفيذ: تنبؤ complexity بدلالة وحدات العمل عند توفره، وإلا متوسط متحرك (EWMA)
+  لقيم took المُقاسة لكل (جهاز، دالة).
+- الانتظار: زمن التنفيذ × (المهام الجارية منّا + الحمل المُعلَن) ÷ عدد المنافذ.
+- التنفيذ المحلي يُضخَّم حسب انشغال المعالج الحالي من load_sampler.
+- data: بيانات مشار إليها بمراجع كائنات {المالك: بايتات}؛ ما ليس على الجهاز نفسه يُضاف
+  إلى حجم النقل، فتُفضَّل الأجهزة التي تملك البيانات (offload_core.object_store).
+- صحة الأجهزة (offload_core.peer_health): ذو القاطع المفتوح لا يُرشَّح أصلاً، وزمن البقية
+  يُقسم على نسبة نجاحها (الكلفة المتوقعة مع إعادة المحاولة).
+يتعلّم النموذج أثناء العمل من كل نتيجة عبر record().
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from collections import Counter
+
+from offload_core import http_pool, load_sampler, complexity
+from offload_core.complexity import LOCAL
+from offload_core.peer_health import get_health
+
+ALPHA = 0.3                 # وزن العيّنة الجديدة في EWMA
+DEFAULT_SERVICE = 1.0       # ثوانٍ لدالة لم تُقَس بعد على أي جهاز
+DEFAULT_RTT = 0.005         # ثوانٍ
+DEFAULT_BANDWIDTH = 10e6    # بايت/ثانية
+SMALL_PAYLOAD = 64 * 1024   # أقل من هذا يُعتبر الحمل الإضافي RTT فقط
+
+
+def _ewma(old, sample, alpha=ALPHA):
+    return sample if old is None else (1 - alpha) * old + alpha * sample
+
+
+class CostModelScheduler:
+    def __init__(self, local_slots: int = os.cpu_count() or 1):
+        self.local_slots = local_slots
+        self._service = {}      # (node, func) → EWMA زمن التنفيذ
+        self._rtt = {}          # node → EWMA
+        self._bandwidth = {}    # node → EWMA بايت/ثانية
+        self._advertised = {}   # node → الحمل المُعلَن (طول الطابور التقريبي)
+        self._slots = {}        # node → عدد المنافذ المُعلَن
+        self._inflight = Counter()
+        self._lock = threading.Lock()
+
+    # ---- التقدير ---------------------------------------------------------------
+    def service_time(self, node: str, func: str, work: float = None) -> float:
+        """زمن التنفيذ المتوقع؛ عند غياب القياس يُستخدم متوسط بقية الأجهزة لنفس الدالة"""
+        if work is not None:
+            predicted = complexity.get_estimator().predict(func, work, node)
+            if predicted is not None:
+                return predicted
+        known = self._service.get((node, func))
+        if known is not None:
+            return known
+        others = [t for (n, f), t in self._service.items() if f == func]
+        return sum(others) / len(others) if others else DEFAULT_SERVICE
+
+    def estimate(self, node: str, func: str, payload_bytes: int = 0, work: float = None,
+                 data: dict = None) -> float:
+        """زمن الإكمال المتوقع بالثواني لتنفيذ func على node (work: وحدات العمل إن عُرفت)"""
+        node = self._key(node)
+        service = self.service_time(node, func, work)
+        remote_data = {self._key(o): b for o, b in (data or {}).items() if self._key(o) != node}
+        if node == LOCAL:
+            busy = load_sampler.snapshot()["instant"]["cpu"]
+            queue = self._inflight[LOCAL] / self.local_slots
+            fetch = sum(b / self._bandwidth.get(o, DEFAULT_BANDWIDTH) for o, b in remote_data.items())
+            return fetch + service * (1 + queue) / max(0.1, 1.0 - busy)
+        payload_bytes += sum(remote_data.values())
+        slots = self._slots.get(node, 1)
+        wait = service * (self._inflight[node] + self._advertised.get(node, 0.0)) / slots
+        transfer = payload_bytes / self._bandwidth.get(node, DEFAULT_BANDWIDTH)
+        return (transfer + self._rtt.get(node, DEFAULT_RTT) + wait + service) / get_health().success_rate(node)
+
+    def rank(self, func: str, peers, payload_bytes: int = 0, include_local: bool = True, work: float = None,
+             data: dict = None):
+        """قائمة [(الزمن المتوقع، الخيار)] مرتبة تصاعدياً؛ الخيار إما عنصر من peers أو LOCAL"""
+        options = get_health().healthy(peers) + ([LOCAL] if include_local else [])
+        return sorted(((self.estimate(p, func, payload_bytes, work, data), p) for p in options),
+                      key=lambda item: item[0])
+
+    def choose(self, func: str, peers, payload_bytes: int = 0, include_local: bool = True, work: float = None,
+               data: dict = None):
+        """أسرع خيار متوقع: عنصر من peers أو LOCAL (أو None إن لم يوجد أي خيار)"""
+        ranked = self.rank(func, peers, payload_bytes, include_local, work, data)
+        return ranked[0][1] if ranked else None
+
+    # ---- التعلّم ----------------------------------------------------------------
+    def record(self, node, func: str, took: float, wall: float = None, payload_bytes: int = 0,
+               work: float = None):
+        """تحديث النموذج بنتيجة فعلية: took زمن التنفيذ، wall الزمن الكلي من جهة المرسل"""
+        node = self._key(node)
+        if work is not None:
+            complexity.observe(func, work, took, node)
+        with self._lock:
+            self._service[(node, func)] = _ewma(self._service.get((node, func)), took)
+            if node == LOCAL or wall is None:
+                return
+            overhead = max(0.0, wall - took)
+            if payload_bytes < SMALL_PAYLOAD:
+                self._rtt[node] = _ewma(self._rtt.get(node), overhead)
+            else:
+                transfer = max(overhead - self._rtt.get(node, DEFAULT_RTT), 1e-3)
+                self._bandwidth[node] = _ewma(self._bandwidth.get(node), payload_bytes / transfer)
+
+    def advertise(self, node, load: float = None, slots: int = None):
+        """تسجيل ما يعلنه الجهاز عن حمله أو منافذه"""
+        node = self._key(node)
+        if load is not None:
+            self._advertised[node] = load
+        if slots is not None:
+            self._slots[node] = max(1, slots)
+
+    @contextmanager
+    def track(self, node):
+        """احتساب مهمة جارية على node طوال مدة التنفيذ"""
+        node = self._key(node)
+        with self._lock:
+            self._inflight[node] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._inflight[node] -= 1
+
+    @staticmethod
+    def _key(node):
+        return LOCAL if node == LOCAL else http_pool.peer_key(node)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> CostModelScheduler:
+    """الجدولة المشتركة على مستوى العملية"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = CostModelScheduler()
+        return _scheduler
@@ -0,0 +1,181 @@
+# shm.py
+"""
+تمرير مصفوفات NumPy الكبيرة بين خادم العقدة وعمّال مجمّع العمليات عبر ذاكرة مشتركة
+(multiprocessing.shared_memory فوق mmap) بدل تسلسلها بـ pickle.
+
+- المصفوفة الأكبر من MIN_BYTES تُنسخ مرة واحدة إلى كتلة مشتركة ويُمرَّر اسمها فقط:
+      {"__shm__": <name>, "dtype": ..., "shape": [...]}
+- العامل يقرأ المدخلات دون نسخ (np.ndarray فوق الكتلة نفسها)، ويضع المصفوفات الكبيرة في نتيجته
+  في كتل جديدة يتسلّمها الأب.
+- الأب يملك كل الكتل ويعدّ مراجعها: كتل المدخلات تُحرَّر عند اكتمال المهمة، وكتل النتائج
+  عندما تُجمع المصفوفة المبنية فوقها (weakref.finalize) ثم تُحذف (unlink).
+"""
+
+import os
+import logging
+import threading
+import weakref
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+
+ENABLED = os.getenv("DTS_SHM", "1") == "1"
+MIN_BYTES = int(os.getenv("DTS_SHM_MIN_BYTES", str(1 << 20)))   # أصغر من هذا يُرسل عبر pickle
+SHM_KEY = "__shm__"
+
+
+def _eligible(obj) -> bool:
+    return isinstance(obj, np.ndarray) and obj.nbytes >= MIN_BYTES and not obj.dtype.hasobject
+
+
+def _walk(obj, fn):
+    """تطبيق fn على كل عنصر ورقي (مع الحفاظ على بنية القواميس والقوائم)"""
+    if isinstance(obj, dict) and SHM_KEY not in obj:
+        return {k: _walk(v, fn) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_walk(v, fn) for v in obj)
+    return fn(obj)
+
+
+def _write_block(arr: np.ndarray) -> dict:
+    """نسخ arr إلى كتلة مشتركة جديدة وإرجاع وصفها (الكتلة تبقى بعد إغلاق هذا المقبض)"""
+    block = shared_memory.SharedMemory(create=True, size=arr.nbytes)
+    view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=block.buf)
+    view[...] = arr
+    del view
+    block.close()
+    return {SHM_KEY: block.name, "dtype": arr.dtype.str, "shape": list(arr.shape)}
+
+
+def _is_desc(obj) -> bool:
+    return isinstance(obj, dict) and SHM_KEY in obj
+
+
+# ---- جهة الأب (خادم العقدة) ---------------------------------------------------
+
+class SharedArrayRegistry:
+    """الكتل المشتركة المملوكة لهذه العملية مع عدّاد مراجع لكل كتلة"""
+
+    def __init__(self):
+        self._blocks = {}   # name → [SharedMemory | None, refs]
+        self._lock = threading.Lock()
+
+    def export(self, obj, names: list):
+        """استبدال المصفوفات الكبيرة في obj بأوصاف كتل مشتركة (تُضاف أسماؤها إلى names)"""
+        def put(value):
+            if not _eligible(value):
+                return value
+            desc = _write_block(value)
+            with self._lock:
+                self._blocks[desc[SHM_KEY]] = [None, 1]
+            names.append(desc[SHM_KEY])
+            return desc
+        return _walk(obj, put)
+
+    def adopt(self, obj):
+        """تحويل أوصاف الكتل في نتيجة عامل إلى مصفوفات فوق الذاكرة المشتركة دون نسخ"""
+        def attach(value):
+            if not _is_desc(value):
+                return value
+            name = value[SHM_KEY]
+            block = shared_memory.SharedMemory(name=name)
+            with self._lock:
+                self._blocks[name] = [block, 1]
+            arr = np.ndarray(value["shape"], dtype=np.dtype(value["dtype"]), buffer=block.buf)
+            weakref.finalize(arr, self.release, name)
+            return arr
+        return _walk(obj, attach)
+
+    def release(self, name: str):
+        with self._lock:
+            entry = self._blocks.get(name)
+            if entry is None:
+                return
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del self._blocks[name]
+        block = entry[0] or shared_memory.SharedMemory(name=name)
+        try:
+            block.close()
+        except BufferError:
+            pass   # ما زال هناك مرجع للذاكرة؛ تُغلق عند جمعه
+        try:
+            block.unlink()
+        except FileNotFoundError:
+            pass
+
+    def release_all(self, names):
+        for name in names:
+            self.release(name)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"blocks": len(self._blocks)}
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> SharedArrayRegistry:
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = SharedArrayRegistry()
+        return _registry
+
+
+def submit(pool, fn, args=(), kwargs=None) -> Future:
+    """إرسال fn إلى مجمّع العمليات pool مع تمرير المصفوفات الكبيرة (ذهاباً وإياباً) بالاسم"""
+    registry = get_registry()
+    names = []
+    args, kwargs = registry.export([tuple(args), kwargs or {}], names)
+    try:
+        inner = pool.submit(call_in_worker, fn, args, kwargs)
+    except BaseException:
+        registry.release_all(names)
+        raise
+    outer = Future()
+
+    def done(future):
+        registry.release_all(names)
+        if future.cancelled():
+            outer.cancel()
+            return
+        try:
+            outer.set_result(registry.adopt(future.result()))
+        except BaseException as e:
+            outer.set_exception(e)
+
+    inner.add_done_callback(done)
+    return outer
+
+
+# ---- جهة العامل ----------------------------------------------------------------
+
+def call_in_worker(fn, args, kwargs):
+    """يُنفَّذ داخل عامل مجمّع العمليات: ربط المدخلات المشتركة ثم تصدير النتيجة"""
+    handles = []
+
+    def attach(value):
+        if not _is_desc(value):
+            return value
+        block = shared_memory.SharedMemory(name=value[SHM_KEY])
+        handles.append(block)
+        return np.ndarray(value["shape"], dtype=np.dtype(value["dtype"]), buffer=block.buf)
+
+    args, kwargs = _walk([args, kwargs], attach)
+    try:
+        result = fn(*args, **kwargs)
+        # النتيجة قد تشير إلى ذاكرة المدخلات: تصديرها ينسخ المصفوفات الكبيرة إلى كتل جديدة،
+        # وما دون ذلك يُنسخ لأن pickle يسلسله
+        return _walk(result, lambda v: _write_block(np.ascontiguousarray(v)) if _eligible(v) else v)
+    finally:
+        args = kwargs = result = None
+        for block in handles:
+            try:
+                block.close()
+            except BufferError:
+                logging.debug(f"كتلة {block.name} ما زالت مستخدمة في العامل")
@@ -0,0 +1,132 @@
+# single_flight.py
+"""
+توحيد الاستدعاءات المتطابقة الجارية (single-flight).
+الاستدعاءات المتزامنة لنفس (func, args, kwargs) تشترك في تنفيذ واحد ونتيجة واحدة،
+ولا يبقى المفتاح محجوزاً بعد انتهاء التنفيذ (هذا ليس ذاكرة نتائج؛ انظر result_cache).
+
+- SingleFlight: للمسارات المتزامنة (offload_lib / DistributedExecutor / خوادم Flask).
+- AsyncSingleFlight: لخادم العقدة داخل حلقة الأحداث.
+- المفتاح هوية الدالة لا اسمها وحده في مسارات العميل (دالتان بنفس الاسم لا تُدمجان)، واسمها المسجّل
+  في الخوادم؛ الاستدعاء بمعاملات لا صيغة قانونية لها (تُمثَّل بـ repr فقط) يُنفَّذ دون توحيد.
+- لا توحيد إلا لما أُعلن حتمياً صراحة (offload_core.tasks.is_deterministic): مهمة مسجّلة بـ
+  deterministic=True (والدالة هي المسجّلة نفسها)، أو دالة @offload(deterministic=True)؛
+  غير ذلك (دوال عشوائية أو ذات آثار جانبية) ينتظر كل مستدعٍ نتيجته الخاصة.
+- استدعاء متداخل بنفس المفتاح على نفس الخيط (مهمة @offload داخل عامل DistributedExecutor)
+  يُنفَّذ مباشرة بدل انتظار نفسه.
+ملاحظة: من ينضم إلى تنفيذ جارٍ يستلم نفس كائن النتيجة.
+"""
+
+import os
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Optional
+
+from offload_core.result_cache import cache_key
+
+ENABLED = os.getenv("DTS_SINGLE_FLIGHT", "1") == "1"
+
+
+def func_id(func) -> str:
+    """هوية الدالة: الاسم المسجّل كما هو، أو الوحدة والاسم المؤهَّل وعنوان الكائن لدالة Python"""
+    if isinstance(func, str):
+        return func
+    return f"{getattr(func, '__module__', '')}.{getattr(func, '__qualname__', func.__name__)}@{id(func):x}"
+
+
+def coalescable(func) -> bool:
+    """التوحيد للدوال المعلنة حتمية فقط"""
+    from offload_core import tasks
+    return tasks.is_deterministic(func)
+
+
+def flight_key(func, args=(), kwargs=None) -> Optional[str]:
+    """مفتاح الاستدعاء، أو None إن تعذّر تمثيل المعاملات بصيغة قانونية"""
+    try:
+        return cache_key(func_id(func), "", args, kwargs, strict=True)
+    except (TypeError, ValueError):
+        return None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}   # key → Future
+        self._lock = threading.Lock()
+        self._local = threading.local()   # المفاتيح التي يقودها الخيط الحالي
+        self.shared = 0
+
+    def do(self, key: str, fn, *args, **kwargs):
+        """تنفيذ fn مرة واحدة لكل key جارٍ؛ البقية ينتظرون نفس النتيجة أو الاستثناء"""
+        held = getattr(self._local, "keys", None)
+        if held is None:
+            held = self._local.keys = set()
+        if key in held:
+            return fn(*args, **kwargs)   # متداخل داخل تنفيذنا لنفس المفتاح: انتظاره قفل ميت
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result()
+        held.add(key)
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            held.discard(key)
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def __len__(self):
+        return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """نفس الفكرة داخل حلقة أحداث واحدة؛ إلغاء أحد المنتظرين لا يلغي التنفيذ المشترك"""
+
+    def __init__(self):
+        self._tasks = {}
+        self.shared = 0
+
+    async def do(self, key: str, coro_fn, *args, **kwargs):
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(coro_fn(*args, **kwargs))
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def __len__(self):
+        return len(self._tasks)
+
+
+_flight = None
+_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """المنسّق المشترك على مستوى العملية للمسارات المتزامنة"""
+    global _flight
+    with _flight_lock:
+        if _flight is None:
+            _flight = SingleFlight()
+        return _flight
+
+
+def do(func, args, kwargs, fn, *fn_args, **fn_kwargs):
+    """fn(*fn_args, **fn_kwargs) موحَّدة بمفتاح الاستدعاء (func, args, kwargs)، أو مباشرة إن كانت معطّلة
+    أو كانت المهمة غير حتمية أو تعذّر المفتاح. func: الدالة نفسها في مسارات العميل، أو اسمها المسجّل."""
+    key = flight_key(func, args, kwargs) if ENABLED and coalescable(func) else None
+    if key is None:
+        return fn(*fn_args, **fn_kwargs)
+    return get_single_flight().do(key, fn, *fn_args, **fn_kwargs)
@@ -2,20 +2,51 @@ import math
 import numpy as np
 import time
 
+from offload_core import engines, tiled_matmul
+
 def prime_calculation(n: int):
     """ترجع قائمة الأعداد الأوليّة حتى n مع عددها"""
+    return prime_calculation_range(2, n)
+
+def prime_calculation_range(low: int, high: int):
+    """الأعداد الأوليّة في المجال [low, high] مع عددها (جزء من prime_calculation)"""
+    primes = engines.pick("primes", _primes_reference, _primes_sieve, sample=(2, 5000))(low, high)
+    return {"count": len(primes), "primes": primes}
+
+def prime_count(n: int):
+    """عدد الأعداد الأوليّة حتى n دون إرجاعها (ذاكرة ثابتة مهما كبر n)"""
+    return prime_count_range(2, n)
+
+def prime_count_range(low: int, high: int):
+    """عدد الأعداد الأوليّة في المجال [low, high] (جزء من prime_count)"""
+    engine = engines.pick("prime_count", lambda lo, hi: len(_primes_reference(lo, hi)), engines.count_primes,
+                          sample=(2, 5000))
+    return {"count": engine(low, high)}
+
+def _primes_reference(low, high):
     primes = []
-    for num in range(2, n + 1):
+    for num in range(max(2, low), high + 1):
         if all(num % p != 0 for p in range(2, int(math.sqrt(num)) + 1)):
             primes.append(num)
-    return {"count": len(primes), "primes": primes}
+    return primes
+
+def _primes_sieve(low, high):
+    return engines.primes_in_range(low, high).tolist()
 
 def matrix_multiply(size: int):
-    """ضرب مصفوفات عشوائيّة (size × size)"""
+    """ضرب مصفوفات عشوائيّة (size × size)؛ ما لا يتسع للذاكرة يُضرب بالبلاطات على القرص،
+    ويُرجع وصف ملف الناتج يحوّله الخادم إلى مرجع كائن (tiled_matmul.adopt)"""
+    if tiled_matmul.needs_tiling(size):
+        result = tiled_matmul.random_product(size)
+        return {"result": tiled_matmul.file_result(result), "shape": list(result.shape)}
     A = np.random.rand(size, size)
     B = np.random.rand(size, size)
     result = np.dot(A, B)  # يمكن أيضًا: A @ B
-    return {"result": result.tolist()}
+    return {"result": result}  # تُرسل كمصفوفة ثنائية عبر offload_core.wire
+
+def matmul_tile(a, b):
+    """حاصل ضرب بلاطتين (مهمة فرعية لـ tiled_matmul)"""
+    return np.dot(a, b)
 
 def data_processing(data_size: int):
     """تنفيذ معالجة بيانات بسيطة كتجربة"""
@@ -26,12 +57,22 @@ def data_processing(data_size: int):
 
 def image_processing_emulation(iterations):
     """محاكاة معالجة الصور"""
+    engine = engines.pick("image_processing", _image_reference, _image_vectorized, sample=(5,))
+    return {"iterations": iterations, "results": engine(iterations)}
+
+def _image_reference(iterations, start=0):
     results = []
-    for i in range(iterations):
+    for i in range(start, iterations):
         fake_processing = sum(math.sqrt(x) for x in range(i * 100, (i + 1) * 100))
         results.append(fake_processing)
         time.sleep(0.01)
-    return {"iterations": iterations, "results": results}
+    return results
+
+def _image_vectorized(iterations, start=0):
+    # نفس القيم دفعة واحدة؛ زمن المحاكاة (0.01s لكل تكرار) يبقى كما هو في انتظار واحد
+    values = engines.sqrt_blocks(iterations - start, start=start).tolist()
+    time.sleep(0.01 * len(values))
+    return values
 
 # مهام معالجة الفيديو والألعاب ثلاثية الأبعاد
 def video_format_conversion(duration_seconds, quality_level, input_format="mp4", output_format="avi"):
@@ -135,4 +176,31 @@ def game_ai_processing(ai_agents_count, decision_complexity, game_state_size):
         "total_operations": total_operations,
         "processing_time": time.time() - start_time,
         "server_processed": True
-    }
\ No newline at end of file
+    }
+
+# نسخ مولِّدة تبث نتائجها الجزئية عبر /run_stream (offload_core.streaming)
+def prime_calculation_stream(n: int, chunk_size: int = None):
+    """الأعداد الأوليّة حتى n على دفعات: لكل نافذة غربال (chunk_size عدداً) قائمة أولياتها.
+    لا تُحفظ في الذاكرة إلا نافذة واحدة، فيصلح لـ n أكبر من أن تُجمع أولياته في قائمة."""
+    span = chunk_size or engines.segment_span()
+    for low in range(2, n + 1, span):
+        high = min(low + span - 1, n)
+        yield {"from": low, "to": high, **prime_calculation_range(low, high)}
+
+def data_processing_stream(data_size: int, chunk_size: int = 100000):
+    """إحصاءات تراكمية لبيانات عشوائية تُولَّد على أجزاء دون حجزها كاملة في الذاكرة"""
+    count, total, total_sq = 0, 0.0, 0.0
+    for offset in range(0, data_size, chunk_size):
+        data = np.random.rand(min(chunk_size, data_size - offset))
+        count += data.size
+        total += float(data.sum())
+        total_sq += float(np.square(data).sum())
+        mean = total / count
+        yield {"processed": count, "mean": mean, "std_dev": math.sqrt(max(0.0, total_sq / count - mean ** 2))}
+
+def image_processing_emulation_stream(iterations, chunk_size: int = 10):
+    """محاكاة معالجة الصور مع بث نتائج كل chunk_size تكرارات"""
+    engine = engines.pick("image_processing", _image_reference, _image_vectorized, sample=(5,))
+    for start in range(0, iterations, chunk_size):
+        count = min(chunk_size, iterations - start)
+        yield {"done": start + count, "results": engine(start + count, start)}
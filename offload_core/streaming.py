@@ -0,0 +1,128 @@
+# streaming.py
+"""
+بث النتائج الجزئية للمهام الطويلة عبر /run_stream.
+المهمة المولِّدة (generator) تُرجع (yield) أجزاءها تباعاً، وتصل كل دفعة للعميل فور إنتاجها
+بصيغة Server-Sent Events فوق HTTP مقسَّم (chunked):
+
+    event: chunk\\ndata: <JSON>\\n\\n     (لكل جزء)
+    event: end\\ndata: {"host","took","chunks"}\\n\\n
+    event: error\\ndata: {"error": ...}\\n\\n
+
+- جهة الخادم: aiter_chunks يشغّل المولّد في خيط ويمرّر أجزاءه عبر طابور محدود (backpressure)،
+  و iter_sse / sse_event للترميز.
+- جهة العميل: stream_call يُرجع مكرِّراً (iterator) للأجزاء.
+"""
+
+import os
+import json
+import time
+import socket
+import asyncio
+import threading
+
+from offload_core import http_pool, wire
+
+SSE = "text/event-stream"
+BUFFER = int(os.getenv("DTS_STREAM_BUFFER", "8"))   # أجزاء منتظرة قبل إيقاف المولّد مؤقتاً
+STREAM_TIMEOUT = 60                                  # مهلة القراءة بين جزأين (ثوانٍ)
+
+_END = object()
+
+
+class StreamError(RuntimeError):
+    """خطأ أرسله الخادم أثناء البث"""
+
+
+# ---- جهة الخادم -------------------------------------------------------------
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(wire.to_jsonable(data), separators=(',', ':'))}\n\n"
+
+
+def iter_sse(chunks):
+    """ترميز مكرِّر أجزاء متزامن إلى أحداث SSE (لخوادم Flask)"""
+    start, count = time.time(), 0
+    try:
+        for chunk in chunks:
+            count += 1
+            yield sse_event("chunk", chunk)
+    except Exception as e:
+        yield sse_event("error", {"error": str(e)})
+        return
+    yield sse_event("end", {"host": socket.gethostname(), "took": round(time.time() - start, 3),
+                            "chunks": count})
+
+
+async def aiter_chunks(fn, args=(), kwargs=None, buffer: int = BUFFER):
+    """تشغيل المولّد fn في خيط وإرجاع أجزائه دون حجز حلقة الأحداث.
+    عند توقف المستهلك (انقطاع العميل) يُغلق المولّد في الجزء التالي."""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=buffer)
+    stop = threading.Event()
+
+    def produce():
+        try:
+            generator = fn(*args, **(kwargs or {}))
+            try:
+                for chunk in generator:
+                    if stop.is_set():
+                        break
+                    asyncio.run_coroutine_threadsafe(queue.put(chunk), loop).result()
+            finally:
+                generator.close()
+            item = _END
+        except BaseException as e:
+            item = e
+        if not stop.is_set():
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    threading.Thread(target=produce, name="dts-stream", daemon=True).start()
+    try:
+        while True:
+            item = await queue.get()
+            if item is _END:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        while not queue.empty():   # تحرير المنتج إن كان ينتظر مكاناً في الطابور
+            queue.get_nowait()
+
+
+# ---- جهة العميل -------------------------------------------------------------
+
+def _events(response):
+    event, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].lstrip())
+
+
+def stream_call(peer, func: str, args=(), kwargs=None, timeout: float = STREAM_TIMEOUT, summary: dict = None):
+    """مكرِّر للأجزاء التي تبثها المهمة func على peer.
+    summary (اختياري) يُملأ بحدث النهاية {host, took, chunks}."""
+    url = f"http://{http_pool.peer_key(peer)}/run_stream"
+    payload = {"func": func, "args": list(args), "kwargs": kwargs or {}}
+    with http_pool.post(url, json=wire.to_jsonable(payload), stream=True, timeout=timeout,
+                        headers={"Accept": SSE}) as response:
+        response.raise_for_status()
+        for event, data in _events(response):
+            if event == "chunk":
+                yield data
+            elif event == "error":
+                raise StreamError(data.get("error"))
+            elif event == "end":
+                if summary is not None:
+                    summary.update(data)
+                return
+    raise StreamError(f"انقطع البث من {url} قبل نهايته")
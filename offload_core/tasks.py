@@ -1,138 +1,165 @@
+# tasks.py
+"""
+سجل المهام القابلة للتنفيذ عن بُعد (dispatch registry) فوق offload_core.smart_tasks.
+كل مهمة مسجّلة تحمل بيانات وصفية يستخدمها خادم العقدة:
+- kind: نوع الحمل ("cpu" حسابية، "io" انتظار، "inline" خفيفة جداً) لتوجيهها إلى خلفية التنفيذ المناسبة.
+- max_concurrency: حد التوازي الخاص بها.
+- resource: فئة الموارد التي تحجز منها منفذاً على العقدة (offload_core.admission):
+  "cpu" أو "memory" أو "io"؛ الافتراضي من kind، والمهام inline بلا فئة.
+- deterministic / version: نتيجة تعتمد على المعاملات وحدها فتُحفظ في offload_core.result_cache؛
+  تغيير version يُبطل النتائج المحفوظة للنسخة السابقة.
+- streaming: الدالة مولِّدة (generator) تُبث أجزاؤها عبر /run_stream.
+- splitter: كيفية تقسيم مجال المهمة ودمج نتائجها للتوزيع بأسلوب map/reduce (offload_core.map_reduce).
+"""
+
+import os
 import math
-import numpy as np
-import time
-
-def prime_calculation(n: int):
-    """ترجع قائمة الأعداد الأوليّة حتى n مع عددها"""
-    primes = []
-    for num in range(2, n + 1):
-        if all(num % p != 0 for p in range(2, int(math.sqrt(num)) + 1)):
-            primes.append(num)
+import inspect
+from typing import Callable, Dict, Optional
+
+from offload_core import smart_tasks, tiled_matmul
+from offload_core.map_reduce import Splitter, split_range
+
+CPU_COUNT = os.cpu_count() or 1
+KINDS = ("cpu", "io", "inline")
+RESOURCES = ("cpu", "memory", "io")
+
+
+class TaskSpec:
+    """وصف مهمة مسجّلة"""
+
+    def __init__(self, name: str, func: Callable, kind: str = "cpu",
+                 max_concurrency: Optional[int] = None, deterministic: bool = False,
+                 version: str = "1", splitter: Optional[Splitter] = None, resource: Optional[str] = None):
+        if kind not in KINDS:
+            raise ValueError(f"نوع مهمة غير معروف: {kind}")
+        resource = resource or (None if kind == "inline" else kind)
+        if resource is not None and resource not in RESOURCES:
+            raise ValueError(f"فئة موارد غير معروفة: {resource}")
+        self.name = name
+        self.func = func
+        self.kind = kind
+        self.deterministic = deterministic
+        self.version = version
+        self.streaming = inspect.isgeneratorfunction(func)
+        self.splitter = splitter
+        self.resource = resource
+        # الحد الافتراضي: عدد الأنوية للمهام الحسابية، وعدد أكبر لمهام الانتظار
+        self.max_concurrency = max_concurrency or (CPU_COUNT if self.cpu_bound else 4 * CPU_COUNT)
+
+    @property
+    def cpu_bound(self) -> bool:
+        return self.kind == "cpu"
+
+    def __repr__(self):
+        return (f"TaskSpec({self.name!r}, kind={self.kind!r}, resource={self.resource!r}, "
+                f"max_concurrency={self.max_concurrency})")
+
+
+REGISTRY: Dict[str, TaskSpec] = {}
+
+
+def register(func: Callable = None, *, name: str = None, **meta):
+    """تسجيل دالة في السجل؛ يُستخدم مباشرة أو كديكوراتور"""
+    def _register(fn):
+        spec = TaskSpec(name or fn.__name__, fn, **meta)
+        REGISTRY[spec.name] = spec
+        return fn
+    return _register(func) if func is not None else _register
+
+
+def get(name: str) -> Optional[TaskSpec]:
+    return REGISTRY.get(name)
+
+
+def spec_for(func) -> Optional[TaskSpec]:
+    """وصف func المسجّل: بالاسم لسلسلة نصية، وللدالة فقط إن كانت الدالة المسجّلة نفسها"""
+    if isinstance(func, str):
+        return get(func)
+    spec = get(getattr(func, "__name__", ""))
+    return spec if spec is not None and spec.func is getattr(func, "__wrapped__", func) else None
+
+
+def mark_deterministic(func: Callable) -> Callable:
+    """إعلان دالة غير مسجّلة حتمية (مثل @offload(deterministic=True))"""
+    func.__dts_deterministic__ = True
+    return func
+
+
+def is_deterministic(func) -> bool:
+    """هل نتيجة func تعتمد على معاملاتها وحدها؟ لا إلا بإعلان صريح: في السجل أو بـ mark_deterministic"""
+    spec = spec_for(func)
+    if spec is not None:
+        return spec.deterministic
+    return getattr(func, "__dts_deterministic__", False) is True
+
+
+def dispatch(req):
+    """تنفيذ طلب {func,args,kwargs} (قاموس أو كائن) بشكل متزامن وإرجاع {"result": ...}"""
+    field = req.get if isinstance(req, dict) else (lambda key, default=None: getattr(req, key, default))
+    spec = get(field("func"))
+    if spec is None:
+        raise KeyError(f"function-not-found: {field('func')}")
+    return {"result": tiled_matmul.adopt(spec.func(*(field("args") or []), **(field("kwargs") or {})))}
+
+
+# ---- تقسيم المهام (map/reduce) ------------------------------------------------
+
+MIN_PRIME_SHARD = 5000      # أقل عدد أعداد في جزء من prime_calculation
+MIN_DATA_SHARD = 100000     # أقل عدد عناصر في جزء من data_processing
+
+
+def _split_primes(args, kwargs, parts):
+    n = kwargs.get("n", args[0] if args else 0)
+    return [((low, high), {}) for low, high in split_range(2, n, parts, MIN_PRIME_SHARD)]
+
+
+def _merge_primes(calls, results):
+    primes = [p for result in results for p in result["primes"]]
     return {"count": len(primes), "primes": primes}
 
-def matrix_multiply(size: int):
-    """ضرب مصفوفات عشوائيّة (size × size)"""
-    A = np.random.rand(size, size)
-    B = np.random.rand(size, size)
-    result = np.dot(A, B)  # يمكن أيضًا: A @ B
-    return {"result": result.tolist()}
-
-def data_processing(data_size: int):
-    """تنفيذ معالجة بيانات بسيطة كتجربة"""
-    data = np.random.rand(data_size)
-    mean = np.mean(data)
-    std_dev = np.std(data)
-    return {"mean": mean, "std_dev": std_dev}
-
-def image_processing_emulation(iterations):
-    """محاكاة معالجة الصور"""
-    results = []
-    for i in range(iterations):
-        fake_processing = sum(math.sqrt(x) for x in range(i * 100, (i + 1) * 100))
-        results.append(fake_processing)
-        time.sleep(0.01)
-    return {"iterations": iterations, "results": results}
-
-# مهام معالجة الفيديو والألعاب ثلاثية الأبعاد
-def video_format_conversion(duration_seconds, quality_level, input_format="mp4", output_format="avi"):
-    """تحويل صيغة الفيديو"""
-    import time
-    start_time = time.time()
-    processing_time = duration_seconds * quality_level * 0.05  # معالجة أسرع للخادم
-    time.sleep(min(processing_time, 1))  # محدود بثانية واحدة
-
-    return {
-        "status": "success",
-        "input_format": input_format,
-        "output_format": output_format,
-        "duration": duration_seconds,
-        "quality": quality_level,
-        "processing_time": time.time() - start_time,
-        "server_processed": True
-    }
-
-def video_effects_processing(video_length, effects_count, resolution="1080p"):
-    """معالجة تأثيرات الفيديو"""
-    import time
-    start_time = time.time()
-
-    resolution_multiplier = {"480p": 1, "720p": 2, "1080p": 3, "4K": 5}
-    multiplier = resolution_multiplier.get(resolution, 2)
-    processing_time = video_length * effects_count * multiplier * 0.03
-
-    time.sleep(min(processing_time, 1.5))
-
-    return {
-        "status": "success",
-        "video_length": video_length,
-        "effects_count": effects_count,
-        "resolution": resolution,
-        "processing_time": time.time() - start_time,
-        "server_processed": True
-    }
-
-def render_3d_scene(objects_count, resolution_width, resolution_height, 
-                   lighting_quality="medium", texture_quality="high"):
-    """رندر مشهد ثلاثي الأبعاد"""
-    import time
-    start_time = time.time()
-
-    complexity = objects_count * (resolution_width * resolution_height) / 2000000  # تقليل التعقيد للخادم
-    processing_time = complexity * 0.02
-
-    time.sleep(min(processing_time, 2))
-
-    fps = max(30, 120 - (complexity * 5))  # أداء أفضل للخادم
-
-    return {
-        "status": "success",
-        "objects_rendered": objects_count,
-        "resolution": f"{resolution_width}x{resolution_height}",
-        "lighting_quality": lighting_quality,
-        "texture_quality": texture_quality,
-        "estimated_fps": round(fps, 1),
-        "processing_time": time.time() - start_time,
-        "server_processed": True
-    }
-
-def physics_simulation(objects_count, frames_count, physics_quality="medium"):
-    """محاكاة الفيزياء"""
-    import time
-    start_time = time.time()
-
-    quality_multiplier = {"low": 1, "medium": 2, "high": 4, "ultra": 8}
-    multiplier = quality_multiplier.get(physics_quality, 2)
-
-    calculations = objects_count * frames_count * multiplier
-    processing_time = calculations / 200000  # أسرع للخادم
-
-    time.sleep(min(processing_time, 1.5))
-
-    return {
-        "status": "success",
-        "objects_simulated": objects_count,
-        "frames_processed": frames_count,
-        "physics_quality": physics_quality,
-        "calculations_performed": calculations,
-        "processing_time": time.time() - start_time,
-        "server_processed": True
-    }
-
-def game_ai_processing(ai_agents_count, decision_complexity, game_state_size):
-    """معالجة ذكاء اصطناعي للألعاب"""
-    import time
-    start_time = time.time()
-
-    total_operations = ai_agents_count * decision_complexity * game_state_size
-    processing_time = total_operations / 100000  # أسرع للخادم
-
-    time.sleep(min(processing_time, 1))
-
-    return {
-        "status": "success",
-        "ai_agents": ai_agents_count,
-        "decision_complexity": decision_complexity,
-        "total_operations": total_operations,
-        "processing_time": time.time() - start_time,
-        "server_processed": True
-    }
\ No newline at end of file
+
+def _merge_counts(calls, results):
+    return {"count": sum(result["count"] for result in results)}
+
+
+def _split_data(args, kwargs, parts):
+    size = kwargs.get("data_size", args[0] if args else 0)
+    return [((high - low + 1,), {}) for low, high in split_range(0, size - 1, parts, MIN_DATA_SHARD)]
+
+
+def _merge_data(calls, results):
+    """دمج المتوسطات والانحرافات بأوزان أحجام الأجزاء"""
+    sizes = [args[0] for args, _ in calls]
+    total = sum(sizes)
+    mean = sum(n * r["mean"] for n, r in zip(sizes, results)) / total
+    square = sum(n * (r["std_dev"] ** 2 + r["mean"] ** 2) for n, r in zip(sizes, results)) / total
+    return {"mean": mean, "std_dev": math.sqrt(max(0.0, square - mean ** 2))}
+
+
+# ---- المهام المسجّلة ---------------------------------------------------------
+
+# مهام حسابية تُرسل إلى مجمّع العمليات (matrix_multiply و data_processing تولّد بيانات عشوائية)
+register(smart_tasks.prime_calculation, deterministic=True,
+         splitter=Splitter(_split_primes, _merge_primes, shard_func="prime_calculation_range"))
+register(smart_tasks.prime_calculation_range, deterministic=True)
+register(smart_tasks.prime_count, deterministic=True,
+         splitter=Splitter(_split_primes, _merge_counts, shard_func="prime_count_range"))
+register(smart_tasks.prime_count_range, deterministic=True)
+register(smart_tasks.matrix_multiply, resource="memory")
+# بلاطات مصفوفات عشوائية لا تتكرر: حفظها في ذاكرة النتائج يكلّف تجزئتها وكتابتها دون أي إصابة
+register(smart_tasks.matmul_tile, resource="memory")
+register(smart_tasks.data_processing, resource="memory", splitter=Splitter(_split_data, _merge_data))
+register(smart_tasks.image_processing_emulation, deterministic=True)
+
+# مهام الفيديو والألعاب (محاكاة تعتمد على الانتظار) تكفيها الخيوط
+register(smart_tasks.video_format_conversion, kind="io")
+register(smart_tasks.video_effects_processing, kind="io")
+register(smart_tasks.render_3d_scene, kind="io")
+register(smart_tasks.physics_simulation, kind="io")
+register(smart_tasks.game_ai_processing, kind="io")
+
+# مهام مولِّدة تُبث نتائجها الجزئية عبر /run_stream
+register(smart_tasks.prime_calculation_stream)
+register(smart_tasks.data_processing_stream)
+register(smart_tasks.image_processing_emulation_stream, kind="io")
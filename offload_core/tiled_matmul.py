@@ -0,0 +1,222 @@
+# tiled_matmul.py
+"""
+ضرب مصفوفات مُبلَّط (tiled) بذاكرة محدودة يتجاوز حجم ذاكرة جهاز واحد.
+
+- المعاملات والناتج يمكن أن تكون np.memmap على القرص؛ لا يُقرأ منها إلا بلاطة في كل مرة.
+- الناتج C[i,j] = Σ_k A[i,k] · B[k,j]: كل حاصل ضرب بلاطتين مهمة فرعية (matmul_tile)
+  تُسحب من طابور مشترك: عامل لكل جهاز متاح وعامل (BLAS) محلي، فيأخذ الأسرع أكثر.
+- تُجمع حواصل كل بلاطة ناتج في مراكم واحد وتُكتب إلى C فور اكتمال k كلها؛
+  عدد المهام الجارية محدود (max_inflight) فتبقى الذاكرة O(max_inflight × tile²).
+- الناتج المحسوب لجهاز آخر لا يُرجع مسار ملفه (لا يصل إليه المرسِل): المهمة تُرجع وصفاً للملف
+  (file_result)، والخادم يحوّله بـ adopt إلى مرجع كائن يملكه (object_store) يُحذف ملفه مع
+  حذف المرجع أو انتهاء صلاحيته، أو يقرؤه إلى الذاكرة ويحذف الملف إن لم يكن لديه مخزن كائنات.
+"""
+
+import os
+import time
+import logging
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import psutil
+
+from offload_core import wire
+from offload_core.peer_health import get_health, observe
+from offload_core.scheduler import LOCAL, get_scheduler
+
+TILE = int(os.getenv("DTS_MATMUL_TILE", "2048"))
+WORKDIR = os.getenv("DTS_MATMUL_DIR", tempfile.gettempdir())
+DENSE_FRACTION = 0.5     # أقصى نسبة من الذاكرة المتاحة لضرب كثيف عادي
+TILE_TIMEOUT = 120       # ثوانٍ لكل مهمة فرعية بعيدة
+FILE_KEY = "__matfile__"
+
+
+def needs_tiling(size: int, dtype=np.float64) -> bool:
+    """هل تتجاوز ثلاث مصفوفات size×size نصيب الضرب الكثيف من الذاكرة المتاحة؟"""
+    dense = 3 * size * size * np.dtype(dtype).itemsize
+    return dense > psutil.virtual_memory().available * DENSE_FRACTION
+
+
+def _blocks(n: int, tile: int):
+    return [(start, min(start + tile, n)) for start in range(0, n, tile)]
+
+
+def create(shape, dtype=np.float64, path: str = None) -> np.memmap:
+    """مصفوفة على القرص (ملف مؤقت في WORKDIR إن لم يُحدَّد path)"""
+    if path is None:
+        fd, path = tempfile.mkstemp(prefix="dts-matrix-", suffix=".bin", dir=WORKDIR)
+        os.close(fd)
+    if path.endswith(".npy"):
+        return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=tuple(shape))
+    return np.memmap(path, mode="w+", dtype=dtype, shape=tuple(shape))
+
+
+def random_matrix(size: int, tile: int = TILE, path: str = None, seed: int = None) -> np.memmap:
+    """مصفوفة عشوائية size×size تُملأ صفاً من البلاطات بعد صف (بذاكرة tile × size)"""
+    out = create((size, size), path=path)
+    rng = np.random.default_rng(seed)
+    for r0, r1 in _blocks(size, tile):
+        out[r0:r1] = rng.random((r1 - r0, size))
+    out.flush()
+    return out
+
+
+def multiply(a, b, out=None, tile: int = TILE, peers=(), local_workers: int = 1, max_inflight: int = None):
+    """C = a @ b بالبلاطات؛ a و b مصفوفات أو memmap، و out (اختياري) مصفوفة الناتج.
+    peers: أجهزة host:port تنفّذ matmul_tile. يُرجع out (memmap على القرص إن لم يُعطَ)."""
+    n, m = a.shape
+    m2, p = b.shape
+    if m != m2:
+        raise ValueError(f"أبعاد غير متوافقة: {a.shape} × {b.shape}")
+    dtype = np.result_type(a.dtype, b.dtype)
+    out = create((n, p), dtype) if out is None else out
+    peers = get_health().healthy(peers)
+    workers = list(peers) + [LOCAL] * max(1, local_workers)
+    max_inflight = max_inflight or 2 * len(workers)
+
+    rows, cols, inner = _blocks(n, tile), _blocks(p, tile), _blocks(m, tile)
+    jobs = deque((i, j, k) for i in range(len(rows)) for j in range(len(cols)) for k in range(len(inner)))
+    total = len(jobs)
+    accumulators = {}      # (i, j) → [مراكم، عدد k المتبقي]
+    lock = threading.Lock()
+    slots = threading.BoundedSemaphore(max_inflight)
+    failed = []
+
+    def take():
+        slots.acquire()
+        with lock:
+            if not jobs or failed:
+                slots.release()
+                return None
+            return jobs.popleft()
+
+    def accumulate(i, j, product):
+        with lock:
+            entry = accumulators.get((i, j))
+            if entry is None:
+                entry = accumulators[(i, j)] = [np.zeros(product.shape, dtype=dtype), len(inner)]
+            entry[0] += product
+            entry[1] -= 1
+            done = entry[1] == 0
+            if done:
+                del accumulators[(i, j)]
+        if done:
+            (r0, r1), (c0, c1) = rows[i], cols[j]
+            out[r0:r1, c0:c1] = entry[0]
+
+    def work(node):
+        while True:
+            job = take()
+            if job is None:
+                return
+            i, j, k = job
+            (r0, r1), (c0, c1), (k0, k1) = rows[i], cols[j], inner[k]
+            try:
+                a_tile = np.ascontiguousarray(a[r0:r1, k0:k1])
+                b_tile = np.ascontiguousarray(b[k0:k1, c0:c1])
+                accumulate(i, j, _tile_product(node, a_tile, b_tile))
+            except Exception as e:
+                with lock:
+                    jobs.appendleft(job)
+                    if node == LOCAL:
+                        failed.append(e)
+                if node == LOCAL:
+                    return
+                logging.warning(f"⚠️ فشل بلاطة {job} على {node}: {e} - إخراجه من التوزيع")
+                return
+            finally:
+                slots.release()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(workers), thread_name_prefix="dts-tile") as pool:
+        for future in [pool.submit(work, node) for node in workers]:
+            future.result()
+    if failed:
+        raise failed[0]
+    while jobs:   # بلاطات أعادها جهاز فشل بعد انتهاء العمّال المحليين
+        i, j, k = jobs.popleft()
+        (r0, r1), (c0, c1), (k0, k1) = rows[i], cols[j], inner[k]
+        accumulate(i, j, np.dot(a[r0:r1, k0:k1], b[k0:k1, c0:c1]))
+    if isinstance(out, np.memmap):
+        out.flush()
+    logging.info(f"🧱 ضرب {a.shape}×{b.shape}: {total} بلاطة على {len(peers)} جهاز "
+                 f"في {time.perf_counter() - start:.2f}s")
+    return out
+
+
+def _tile_product(node, a_tile, b_tile):
+    scheduler = get_scheduler()
+    start = time.perf_counter()
+    if node == LOCAL:
+        with scheduler.track(LOCAL):
+            product = np.dot(a_tile, b_tile)
+        scheduler.record(LOCAL, "matmul_tile", time.perf_counter() - start)
+        return product
+    payload = {"func": "matmul_tile", "args": [a_tile, b_tile], "kwargs": {}}
+    with scheduler.track(node), observe(node):
+        response = wire.post(f"http://{node}/run", payload, timeout=TILE_TIMEOUT)
+    if "error" in response:
+        raise RuntimeError(response["error"])
+    wall = time.perf_counter() - start
+    scheduler.record(node, "matmul_tile", response.get("took", wall), wall, a_tile.nbytes + b_tile.nbytes)
+    return np.asarray(response["result"])
+
+
+def random_product(size: int, tile: int = TILE, peers=(), seed: int = None) -> np.memmap:
+    """ما يفعله matrix_multiply(size) لكن بالبلاطات: A و B عشوائيتان على القرص، والناتج memmap"""
+    rng = np.random.default_rng(seed)
+    a = random_matrix(size, tile, seed=int(rng.integers(1 << 31)))
+    b = random_matrix(size, tile, seed=int(rng.integers(1 << 31)))
+    paths = [a.filename, b.filename]
+    try:
+        return multiply(a, b, tile=tile, peers=peers)
+    finally:
+        del a, b
+        for path in paths:
+            try:
+                os.remove(path)   # الملف يُحذف من القرص فور إغلاق آخر ربط له
+            except OSError:
+                pass
+
+
+# ---- نواتج على القرص لأجهزة أخرى ----------------------------------------------
+
+def file_result(matrix: np.memmap) -> dict:
+    """وصف ملف الناتج (يعبر حدود العمليات بدل المصفوفة نفسها)"""
+    matrix.flush()
+    return {FILE_KEY: matrix.filename, "shape": list(matrix.shape), "dtype": matrix.dtype.str,
+            "offset": int(matrix.offset)}
+
+
+def is_file_result(obj) -> bool:
+    return isinstance(obj, dict) and FILE_KEY in obj
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def adopt(obj, owner: str = None):
+    """استبدال كل وصف ملف في obj: بمرجع كائن مالكه owner (يُحذف الملف مع المرجع)،
+    أو بمصفوفة في الذاكرة مع حذف الملف فوراً إن لم يُعطَ owner"""
+    if is_file_result(obj):
+        path = obj[FILE_KEY]
+        matrix = np.memmap(path, mode="r", dtype=np.dtype(obj["dtype"]), shape=tuple(obj["shape"]),
+                           offset=obj.get("offset", 0))
+        if owner is None:
+            value = np.array(matrix)
+            del matrix
+            _remove(path)
+            return value
+        from offload_core import object_store
+        return object_store.keep(matrix, owner, on_drop=lambda: _remove(path), resident=False)
+    if isinstance(obj, dict):   # الأوصاف داخل قواميس النتائج فقط؛ القوائم الكبيرة لا تُمسح
+        return {k: adopt(v, owner) for k, v in obj.items()}
+    return obj
+
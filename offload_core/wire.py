@@ -0,0 +1,183 @@
+# wire.py
+"""
+صيغة نقل ثنائية للمهام ونتائجها مع دعم مصفوفات NumPy دون تحويلها إلى نص.
+
+إطار DTSF:
+    MAGIC(4) | VERSION(1) | طول الترويسة uint32 LE | ترويسة JSON | بيانات المصفوفات الخام (محاذاة 64 بايت)
+
+تحمل الترويسة البنية الأصلية مع مواضع {"__ndarray__": i} لكل مصفوفة، وتُقرأ المصفوفات
+عبر np.frombuffer دون نسخ كل مصفوفة على حدة؛ المصفوفات الناتجة قابلة للكتابة دائماً
+(إطار في bytes للقراءة فقط يُنسخ مرة واحدة إلى bytearray خاص بالنتيجة).
+يبقى JSON هو الصيغة الاحتياطية عند عدم دعم الطرف الآخر:
+الجهاز الذي يرد على الإطار بـ 415 أو 400 (Flask get_json يرفض ما ليس JSON بـ 400) يُعاد إليه
+الطلب بصيغة JSON، وإن نجح يُرسل إليه JSON مباشرة بعد ذلك.
+"""
+
+import json
+import struct
+from urllib.parse import urlsplit
+
+import numpy as np
+
+CONTENT_TYPE = "application/x-dts-frame"
+JSON_TYPE = "application/json"
+MAGIC = b"DTSF"
+VERSION = 1
+ALIGN = 64
+_PREFIX = struct.Struct("<4sBI")
+FRAME_REJECTED = (400, 415)   # ردود طرف لا يفهم الإطار الثنائي
+_json_only = set()            # host:port لأجهزة ثبت أنها لا تقبل إلا JSON
+
+
+# ---- الترميز / فك الترميز ---------------------------------------------------
+
+def dumps(obj) -> bytes:
+    """ترميز كائن (قد يحتوي مصفوفات NumPy) إلى إطار DTSF"""
+    arrays = []
+    body = _extract(obj, arrays)
+
+    buffers, specs, offset = [], [], 0
+    for arr in arrays:
+        pad = -offset % ALIGN
+        if pad:
+            buffers.append(b"\0" * pad)
+            offset += pad
+        specs.append({"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset})
+        buffers.append(memoryview(arr).cast("B") if arr.size else b"")
+        offset += arr.nbytes
+
+    header = json.dumps({"body": body, "buffers": specs}, separators=(",", ":")).encode()
+    head = _PREFIX.pack(MAGIC, VERSION, len(header)) + header
+    head += b"\0" * (-len(head) % ALIGN)
+    return b"".join([head, *buffers])
+
+
+def loads(data):
+    """فك إطار DTSF؛ المصفوفات الناتجة قابلة للكتابة: تشير إلى data إن كان قابلاً للكتابة
+    (bytearray مثلاً)، وإلا إلى نسخة واحدة منه"""
+    view = memoryview(data)
+    magic, version, header_len = _PREFIX.unpack_from(view)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("إطار DTSF غير صالح")
+    start = _PREFIX.size
+    header = json.loads(bytes(view[start:start + header_len]))
+    base = start + header_len
+    base += -base % ALIGN
+    if header["buffers"] and view.readonly:
+        view = memoryview(bytearray(view))
+
+    arrays = []
+    for spec in header["buffers"]:
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        arr = np.frombuffer(view, dtype=dtype, count=count, offset=base + spec["offset"])
+        arrays.append(arr.reshape(spec["shape"]))
+    return _restore(header["body"], arrays)
+
+
+def is_frame(data) -> bool:
+    return bytes(data[:4]) == MAGIC
+
+
+def to_jsonable(obj):
+    """تحويل المصفوفات وأعداد NumPy إلى أنواع JSON (الصيغة الاحتياطية)"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, dict):
+        return {k: to_jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_jsonable(v) for v in obj]
+    return obj
+
+
+def has_arrays(obj) -> bool:
+    if isinstance(obj, np.ndarray):
+        return True
+    if isinstance(obj, dict):
+        return any(has_arrays(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(has_arrays(v) for v in obj)
+    return False
+
+
+def estimate_size(obj) -> int:
+    """تقدير سريع لحجم الحمولة بالبايت (دون ترميزها) لاستخدامه في الجدولة"""
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sum(estimate_size(v) + len(str(k)) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return sum(estimate_size(v) for v in obj) + 2
+    if isinstance(obj, (str, bytes)):
+        return len(obj)
+    return 8
+
+
+def _extract(obj, arrays):
+    if isinstance(obj, np.ndarray):
+        arrays.append(np.ascontiguousarray(obj))
+        return {"__ndarray__": len(arrays) - 1}
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, dict):
+        return {k: _extract(v, arrays) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_extract(v, arrays) for v in obj]
+    return obj
+
+
+def _restore(obj, arrays):
+    if isinstance(obj, dict):
+        if len(obj) == 1 and "__ndarray__" in obj:
+            return arrays[obj["__ndarray__"]]
+        return {k: _restore(v, arrays) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_restore(v, arrays) for v in obj]
+    return obj
+
+
+# ---- التفاوض عبر HTTP --------------------------------------------------------
+
+def accepts_frame(accept_header) -> bool:
+    return CONTENT_TYPE in (accept_header or "")
+
+
+def decode_body(content_type, raw: bytes):
+    """قراءة جسم طلب/استجابة حسب Content-Type"""
+    if CONTENT_TYPE in (content_type or "") or is_frame(raw):
+        return loads(raw)
+    return json.loads(raw or b"null")
+
+
+def encode_body(obj, accept_header):
+    """ترميز الاستجابة بالإطار الثنائي إن قبله العميل، وإلا JSON؛ تُرجع (body, content_type)"""
+    if accepts_frame(accept_header):
+        return dumps(obj), CONTENT_TYPE
+    return json.dumps(to_jsonable(obj)), JSON_TYPE
+
+
+def post(url: str, payload, timeout=10, **kwargs):
+    """إرسال مهمة مع التفاوض على الصيغة؛ تُرجع الاستجابة بعد فك ترميزها"""
+    from offload_core import http_pool
+
+    headers = {"Accept": f"{CONTENT_TYPE}, {JSON_TYPE}"}
+    peer = urlsplit(url).netloc
+    framed = has_arrays(payload) and peer not in _json_only
+    if framed:
+        response = http_pool.post(url, data=dumps(payload), timeout=timeout,
+                                  headers={**headers, "Content-Type": CONTENT_TYPE}, **kwargs)
+        if response.status_code not in FRAME_REJECTED:
+            response.raise_for_status()
+            return decode_response(response)
+        # ربما لا يدعم الطرف الآخر الإطار الثنائي: أعد المحاولة بصيغة JSON
+    response = http_pool.post(url, json=to_jsonable(payload), timeout=timeout, headers=headers, **kwargs)
+    response.raise_for_status()
+    if framed:
+        _json_only.add(peer)   # رفض الإطار وقبل JSON نفسه
+    return decode_response(response)
+
+
+def decode_response(response):
+    return decode_body(response.headers.get("Content-Type"), response.content)
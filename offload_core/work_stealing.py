@@ -0,0 +1,153 @@
+# work_stealing.py
+"""
+سرقة المهام بين العقد (pull-based) لموازنة زمن الإنجاز في شبكة غير متجانسة.
+
+- الضحية: كل استدعاء ينتظر منفذاً حراً في خادم العقدة يُسجَّل في StealQueue،
+  ويبقى الطلب الأصلي منتظراً نتيجته أياً كان منفّذه.
+- السارق: عقدة لديها منافذ حرة تسحب مهام منتظرة عبر POST /steal بعقد إيجار (lease)،
+  تنفّذها ثم تُرجع النتيجة عبر POST /steal/complete.
+- إيجار منتهٍ دون نتيجة يُعيد المهمة إلى رأس الطابور لتُنفَّذ محلياً أو تُسرق مجدداً.
+- تُعلن كل عقدة منافذها الحرة (slots) وطول طابورها (queued) في خصائص mDNS للخدمة التي سجّلتها
+  (PeerRegistry.register_service أو offload_core.peer_discovery) عبر offload_core.admission.publish.
+
+StealQueue تعمل داخل حلقة أحداث خادم العقدة فقط، لذا لا تحتاج قفلاً.
+"""
+
+import os
+import time
+import uuid
+import socket
+import asyncio
+import logging
+from collections import OrderedDict
+
+from offload_core import http_pool, wire
+
+ENABLED = os.getenv("DTS_WORK_STEALING", "0") == "1"
+LEASE = float(os.getenv("DTS_STEAL_LEASE", "30"))        # ثوانٍ قبل استعادة مهمة مسروقة
+INTERVAL = float(os.getenv("DTS_STEAL_INTERVAL", "0.5"))  # دورة البحث عن عمل عند الفراغ
+MAX_STEAL = int(os.getenv("DTS_STEAL_MAX", "4"))          # أقصى عدد مهام في سحبة واحدة
+
+QUEUED, LOCAL, LEASED, DONE = "queued", "local", "leased", "done"
+
+
+class Entry:
+    """استدعاء ينتظر منفذاً: إما يأخذه الخادم محلياً أو يُسرق"""
+
+    __slots__ = ("id", "func", "call", "state", "future", "thief", "lease_until", "queued_at")
+
+    def __init__(self, func: str, call: dict, future: asyncio.Future):
+        self.id = uuid.uuid4().hex
+        self.func = func
+        self.call = call
+        self.state = QUEUED
+        self.future = future
+        self.thief = None
+        self.lease_until = 0.0
+        self.queued_at = time.monotonic()
+
+    def remaining(self) -> float:
+        return max(0.0, self.lease_until - time.monotonic())
+
+
+class StealQueue:
+    def __init__(self, lease: float = LEASE):
+        self.lease = lease
+        self._queued = OrderedDict()   # id → Entry بترتيب الوصول
+        self._leased = {}
+
+    def __len__(self):
+        return len(self._queued)
+
+    def put(self, func: str, call: dict) -> Entry:
+        entry = Entry(func, call, asyncio.get_running_loop().create_future())
+        self._queued[entry.id] = entry
+        return entry
+
+    def claim_local(self, entry: Entry) -> bool:
+        """حجز المهمة للتنفيذ المحلي؛ False إن كانت مسروقة حالياً"""
+        if entry.state != QUEUED:
+            return False
+        self._queued.pop(entry.id, None)
+        entry.state = LOCAL
+        return True
+
+    def discard(self, entry: Entry):
+        self._queued.pop(entry.id, None)
+        self._leased.pop(entry.id, None)
+
+    def steal(self, thief: str, max_tasks: int, funcs=None) -> list:
+        """تأجير حتى max_tasks من أقدم المهام المنتظرة إلى thief"""
+        self.reap()
+        taken = []
+        for entry in list(self._queued.values()):
+            if len(taken) >= max_tasks:
+                break
+            if funcs is not None and entry.func not in funcs:
+                continue
+            del self._queued[entry.id]
+            entry.state, entry.thief = LEASED, thief
+            entry.lease_until = time.monotonic() + self.lease
+            self._leased[entry.id] = entry
+            taken.append(entry)
+        return taken
+
+    def complete(self, lease_id: str, item: dict) -> bool:
+        """تسليم نتيجة مهمة مسروقة؛ False إن انتهى الإيجار أو لم يوجد"""
+        entry = self._leased.pop(lease_id, None)
+        if entry is None:
+            return False
+        entry.state = DONE
+        if not entry.future.done():
+            entry.future.set_result(item)
+        return True
+
+    def reap(self):
+        """إعادة المهام ذات الإيجار المنتهي إلى رأس الطابور"""
+        now = time.monotonic()
+        for entry in [e for e in self._leased.values() if e.lease_until <= now]:
+            del self._leased[entry.id]
+            logging.warning(f"⏰ انتهى إيجار {entry.func} لدى {entry.thief} - إعادة للطابور")
+            entry.state, entry.thief = QUEUED, None
+            self._queued[entry.id] = entry
+            self._queued.move_to_end(entry.id, last=False)
+
+    def stats(self) -> dict:
+        return {"queued": len(self._queued), "leased": len(self._leased)}
+
+
+# ---- جهة السارق ---------------------------------------------------------------
+
+def local_ip() -> str:
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.connect(("8.8.8.8", 80))
+        return s.getsockname()[0]
+    except OSError:
+        return "127.0.0.1"
+    finally:
+        s.close()
+
+
+def victims(peers, exclude=()) -> list:
+    """الأجهزة المتوافقة التي أعلنت مهام منتظرة، الأطول طابوراً أولاً"""
+    busy = [p for p in peers
+            if p.get("compatible") and p.get("queued", 0) > 0 and p["key"] not in exclude]
+    return [p["key"] for p in sorted(busy, key=lambda p: -p["queued"])]
+
+
+def steal_from(victim: str, thief: str, max_tasks: int, funcs) -> dict:
+    """طلب مهام من victim؛ يُرجع {"tasks": [...], "queued": المتبقي لديه}"""
+    return wire.post(f"http://{http_pool.peer_key(victim)}/steal",
+                     {"thief": thief, "max": max_tasks, "funcs": list(funcs)}, timeout=5)
+
+
+def complete_on(victim: str, lease_id: str, item: dict) -> bool:
+    """إرجاع نتيجة مهمة مسروقة إلى صاحبها"""
+    try:
+        wire.post(f"http://{http_pool.peer_key(victim)}/steal/complete",
+                  {"lease_id": lease_id, **item}, timeout=10)
+        return True
+    except Exception as e:
+        logging.warning(f"⚠️ تعذّر تسليم نتيجة {lease_id} إلى {victim}: {e}")
+        return False
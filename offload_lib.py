@@ -1,16 +1,18 @@
 #!/usr/bin/env python3
 # offload_lib.py
 
+import os
 import time
 import math
-import random
-import psutil
-import requests
-import socket
 from functools import wraps
-from zeroconf import Zeroconf, ServiceBrowser
 import logging
 
+from offload_core import batching, wire, load_sampler, complexity, single_flight, streaming, tasks
+from offload_core import map_reduce, engines, tiled_matmul, resilience
+from offload_core.scheduler import LOCAL, get_scheduler
+from offload_core.peer_health import get_health
+from offload_core.peer_table import get_peer_table, check_compatibility
+
 # إعداد السجل
 logging.basicConfig(
     level=logging.INFO,
@@ -19,76 +21,25 @@ logging.basicConfig(
 
 # إعدادات التحميل
 MAX_CPU = 0.6  # عتبة استخدام CPU فقط
-
-class PeerListener:
-    def __init__(self):
-        self.peers = []
-
-    def add_service(self, zc, type, name):
-        info = zc.get_service_info(type, name)
-        if info:
-            ip = socket.inet_ntoa(info.addresses[0])
-            self.peers.append(f"{ip}:{info.port}")
-            logging.info(f"🔗 جهاز مكتشف: {ip}:{info.port}")
-
-    def update_service(self, zc, type, name):
-        logging.debug(f"🔄 تم تحديث الخدمة: {name}")
-        pass  # هنا فقط لتفادي التحذير
+BATCH_OFFLOAD = os.getenv("DTS_BATCH_OFFLOAD", "0") == "1"  # تجميع الاستدعاءات في دفعات /run_batch
+MAP_REDUCE = os.getenv("DTS_MAP_REDUCE", "0") == "1"        # تقسيم مهام السجل القابلة للتقسيم على كل الأجهزة
 
 def discover_peers(timeout=1.5):
-    """اكتشاف الأجهزة المتاحة - أولوية LAN ثم WAN ثم الإنترنت مع فحص المشروع"""
-    import peer_discovery
-    from project_identifier import verify_project_compatibility
-
-    zc = Zeroconf()
-    listener = PeerListener()
-    ServiceBrowser(zc, "_http._tcp.local.", listener)
-    time.sleep(timeout)
-    zc.close()
-
-    lan_peers = []
-    wan_peers = []
-    internet_peers = []
-
-    for peer in listener.peers:
-        ip = peer.split(':')[0]
-        if verify_peer_project(ip):
-            if is_local_network(ip):
-                lan_peers.append(peer)
-            else:
-                wan_peers.append(peer)
-
-    all_discovered = list(peer_discovery.PEERS)
-    for peer_url in all_discovered:
-        peer_ip = peer_url.split("://")[1].split(":")[0]
-        if verify_peer_project(peer_ip):
-            if is_local_network(peer_ip):
-                if peer_url not in lan_peers:
-                    lan_peers.append(peer_url)
-            else:
-                if peer_url not in wan_peers:
-                    internet_peers.append(peer_url)
-
-    all_peers = lan_peers + wan_peers + internet_peers
-    logging.info(f"اكتُشف {len(all_peers)} جهاز DTS متوافق - LAN: {len(lan_peers)}, WAN: {len(wan_peers)}, Internet: {len(internet_peers)}")
+    """الأجهزة المتوافقة من جدول الأجهزة المشترك - أولوية LAN ثم WAN ثم الإنترنت
+    (أجهزة peer_discovery.PEERS يسحبها الجدول نفسه).
+    لا يُنتظر إلا عند عدم وجود أي جهاز بعد (أول استدعاء)."""
+    table = get_peer_table()
+
+    # الأجهزة ذات القاطع المفتوح (إخفاقات متتالية حديثة) لا تُعرض حتى موعد محاولتها التجريبية
+    all_peers = get_health().healthy(table.peers() or table.wait_for_peers(timeout))
+    lan = sum(1 for p in all_peers if is_local_network(p.split(':')[0]))
+    logging.info(f"اكتُشف {len(all_peers)} جهاز DTS متوافق - LAN: {lan}, WAN/Internet: {len(all_peers) - lan}")
 
     return all_peers
 
 def verify_peer_project(ip, port=7520):
     """فحص إذا كان الجهاز يحتوي على نفس المشروع"""
-    try:
-        from project_identifier import verify_project_compatibility
-
-        project_url = f"http://{ip}:{port}/project_info"
-        response = requests.get(project_url, timeout=2)
-
-        if response.status_code == 200:
-            remote_info = response.json()
-            return verify_project_compatibility(remote_info)
-
-    except:
-        pass
-    return False
+    return check_compatibility(ip, port)
 
 def is_local_network(ip):
     """فحص إذا كان IP في الشبكة المحلية"""
@@ -104,74 +55,157 @@ def is_local_network(ip):
     except:
         return False
 
-def try_offload(peer, payload, max_retries=3):
-    """محاولة إرسال المهمة إلى جهاز آخر"""
-    url = f"http://{peer}/run"
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(url, json=payload, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            logging.warning(f"فشل المحاولة {attempt + 1} لـ {peer}: {str(e)}")
-            time.sleep(0.5 * (attempt + 1))
-    raise ConnectionError(f"فشل جميع المحاولات لـ {peer}")
-
-def estimate_complexity(func, args, kwargs):
-    """تقدير تعقيد المهمة"""
-    if func.__name__ == "matrix_multiply":
-        return args[0] ** 2
-    elif func.__name__ == "prime_calculation":
-        return args[0] / 100
-    elif func.__name__ == "data_processing":
-        return args[0] / 10
-    elif func.__name__ == "image_processing_emulation":
-        return args[0] * 5
-    return 1  # قيمة افتراضية
-
-def offload(func):
-    """ديكوراتور لتوزيع المهام"""
+def try_offload(peer, payload, max_retries=None, alternates=()):
+    """إرسال المهمة إلى peer مع التحوّط والانتقال إلى alternates عند البطء أو الفشل
+    (offload_core.resilience)؛ الرد يحمل "peer" الذي أجاب فعلاً"""
+    policy = resilience.Policy(attempts=max_retries)
+    answered, response = resilience.call([peer, *[p for p in alternates if p != peer]], payload, policy)
+    if answered != peer:
+        logging.info(f"أجاب {answered} بدلاً من {peer}")
+    return {**response, "peer": answered}
+
+def try_offload_batched(peer, payload, timeout=batching.BATCH_TIMEOUT):
+    """إرسال المهمة ضمن دفعة مجمّعة إلى /run_batch لتقليل كلفة HTTP للمهام الصغيرة"""
+    response = batching.get_coalescer(peer).submit(payload).result(timeout=timeout)
+    if "error" in response:
+        raise RuntimeError(f"{peer}: {response['error']}")
+    return response
+
+# دوال الكلفة (وحدات عمل) للمهام المعرّفة هنا؛ الزمن الفعلي يتعلّمه complexity من القياسات
+complexity.register_cost("matrix_multiply", lambda size: size ** 2)
+complexity.register_cost("prime_calculation", lambda n: n / 100)
+complexity.register_cost("data_processing", lambda data_size: data_size / 10)
+complexity.register_cost("image_processing_emulation", lambda iterations: iterations * 5)
+
+def offload(func=None, *, deterministic=False):
+    """ديكوراتور لتوزيع المهام؛ deterministic=True يعلن أن النتيجة تعتمد على المعاملات وحدها
+    فتشترك الاستدعاءات المتطابقة المتزامنة في تنفيذ واحد"""
+    if func is None:
+        return lambda f: offload(f, deterministic=deterministic)
+    if deterministic:
+        tasks.mark_deterministic(func)
+
     @wraps(func)
     def wrapper(*args, **kwargs):
-        cpu = psutil.cpu_percent(interval=0.5) / 100.0
-        mem = psutil.virtual_memory().available / (1024**2)
-        complexity = estimate_complexity(func, args, kwargs)
+        # الاستدعاءات المتطابقة المتزامنة لدالة حتمية تشترك في قرار وتنفيذ واحد
+        return single_flight.do(func, args, kwargs, dispatch, *args, **kwargs)
+
+    def dispatch(*args, **kwargs):
+        load = load_sampler.snapshot()
+        cpu = load["instant"]["cpu"]
+        mem = load["instant"]["mem"]
+        estimate = complexity.estimate(func.__name__, args, kwargs, default=1)
+        work = estimate["work"]
 
-        logging.info(f"حمل النظام - CPU: {cpu:.2f}, الذاكرة: {mem:.1f}MB, تعقيد المهمة: {complexity}")
+        logging.info(f"حمل النظام - CPU: {cpu:.2f}, الذاكرة: {mem:.1f}MB, تعقيد المهمة: {work}"
+                     + (f", الزمن المتوقع: {estimate['seconds']:.3f}s" if estimate["seconds"] is not None else ""))
 
-        if complexity > 50 or cpu > MAX_CPU:
+        if complexity.is_heavy(estimate, 50) or cpu > MAX_CPU:
             try:
-                peers = discover_peers()
+                peers = get_peer_table().peers()
+                if peers and MAP_REDUCE and map_reduce.splittable(func.__name__, func):
+                    logging.info(f"تقسيم المهمة على {len(peers)} جهاز والأنوية المحلية")
+                    start = time.perf_counter()
+                    result = map_reduce.run(func.__name__, args, kwargs, peers)
+                    return {"result": result, "took": round(time.perf_counter() - start, 3), "map_reduce": True}
                 if peers:
                     payload = {
                         "func": func.__name__,
                         "args": args,
                         "kwargs": kwargs,
-                        "complexity": complexity
+                        "complexity": work
                     }
-                    selected_peer = random.choice(peers)
-                    logging.info(f"إرسال المهمة إلى {selected_peer}")
-                    return try_offload(selected_peer, payload)
+                    scheduler = get_scheduler()
+                    payload_bytes = wire.estimate_size(payload)
+                    ranked = [p for _, p in scheduler.rank(func.__name__, peers, payload_bytes, work=work)]
+                    selected_peer = ranked[0]
+                    if selected_peer != LOCAL:
+                        logging.info(f"إرسال المهمة إلى {selected_peer}")
+                        # بدائل التحوّط والانتقال: الأجهزة المتوقع أن تسبق التنفيذ المحلي
+                        alternates = ranked[1:ranked.index(LOCAL) if LOCAL in ranked else len(ranked)]
+                        start = time.perf_counter()
+                        with scheduler.track(selected_peer):
+                            if BATCH_OFFLOAD:
+                                response = try_offload_batched(selected_peer, payload)
+                            else:
+                                response = try_offload(selected_peer, payload, alternates=alternates)
+                        wall = time.perf_counter() - start
+                        if not response.get("cached"):
+                            scheduler.record(response.get("peer", selected_peer), func.__name__,
+                                             response.get("took", wall), wall, payload_bytes, work=work)
+                        return response
+                    logging.info("نموذج الكلفة يفضّل التنفيذ المحلي")
             except Exception as e:
                 logging.error(f"خطأ في التوزيع: {str(e)}")
 
         logging.info("تنفيذ المهمة محلياً")
-        return func(*args, **kwargs)
+        return run_locally(func, args, kwargs, work)
     return wrapper
 
+def run_locally(func, args, kwargs, work=None):
+    """تنفيذ محلي مع تسجيل الزمن في نموذج الكلفة"""
+    scheduler = get_scheduler()
+    start = time.perf_counter()
+    with scheduler.track(LOCAL):
+        result = func(*args, **kwargs)
+    scheduler.record(LOCAL, func.__name__, time.perf_counter() - start, work=work)
+    return result
+
+def offload_stream(func_name, *args, **kwargs):
+    """مكرِّر لأجزاء مهمة مولِّدة مسجّلة (مثل prime_calculation_stream):
+    تُبث من أسرع جهاز متوقع عبر /run_stream، أو تُنفَّذ محلياً عند التعذّر"""
+    spec = tasks.get(func_name)
+    if spec is None or not spec.streaming:
+        raise ValueError(f"ليست مهمة مولِّدة مسجّلة: {func_name}")
+    scheduler = get_scheduler()
+    peers = get_peer_table().peers()
+    selected_peer = scheduler.choose(func_name, peers) if peers else LOCAL
+    start = time.perf_counter()
+    if selected_peer != LOCAL:
+        logging.info(f"بث المهمة من {selected_peer}")
+        summary, started = {}, False
+        try:
+            with scheduler.track(selected_peer):
+                for chunk in streaming.stream_call(selected_peer, func_name, args, kwargs, summary=summary):
+                    started = True
+                    yield chunk
+            wall = time.perf_counter() - start
+            scheduler.record(selected_peer, func_name, summary.get("took", wall), wall)
+            return
+        except Exception as e:
+            if started:
+                raise
+            logging.error(f"خطأ في البث من {selected_peer}: {str(e)}")
+    logging.info("بث المهمة محلياً")
+    with scheduler.track(LOCAL):
+        yield from spec.func(*args, **kwargs)
+    scheduler.record(LOCAL, func_name, time.perf_counter() - start)
+
 # المهام القابلة للتوزيع:
 
-@offload
 def matrix_multiply(size):
-    """ضرب مصفوفتين عشوائيتين بالحجم"""
+    """ضرب مصفوفتين عشوائيتين بالحجم؛ ما لا يتسع للذاكرة يُضرب بالبلاطات على الأجهزة المتاحة
+    ويُرجع np.memmap على القرص"""
+    if tiled_matmul.needs_tiling(size):
+        return tiled_matmul.random_product(size, peers=get_peer_table().peers())
+    return _dense_matrix_multiply(size)
+
+def _dense_matrix_multiply(size):
     import numpy as np
     A = np.random.rand(size, size)
     B = np.random.rand(size, size)
-    return np.dot(A, B).tolist()
+    return np.dot(A, B)
 
-@offload
+_dense_matrix_multiply.__name__ = "matrix_multiply"   # الاسم المسجّل لدى الأجهزة ونموذج الكلفة
+_dense_matrix_multiply = offload(_dense_matrix_multiply)
+
+@offload(deterministic=True)
 def prime_calculation(n):
     """حساب الأعداد الأولية"""
+    primes = engines.pick("primes_upto", _primes_reference, _primes_sieve, sample=(5000,))(n)
+    return {"primes_count": len(primes), "primes": primes}
+
+def _primes_reference(n):
     primes = []
     for num in range(2, n + 1):
         is_prime = True
@@ -181,23 +215,42 @@ def prime_calculation(n):
                 break
         if is_prime:
             primes.append(num)
-    return {"primes_count": len(primes), "primes": primes}
+    return primes
+
+def _primes_sieve(n):
+    # غربال مقطّع بذاكرة محدودة (DTS_SIEVE_MEMORY_MB) بدل مصفوفة n+1 بايت دفعة واحدة
+    return engines.primes_in_range(2, n).tolist()
 
 @offload
 def data_processing(data_size):
     """معالجة بيانات كبيرة"""
+    processed_data = engines.pick("sin_cos_windows", _sin_cos_reference, engines.sin_cos_windows,
+                                  sample=(200,))(data_size)
+    return {"processed_items": len(processed_data)}
+
+def _sin_cos_reference(data_size):
     processed_data = []
     for i in range(data_size):
         result = sum(math.sin(x) * math.cos(x) for x in range(i, i + 100))
         processed_data.append(result)
-    return {"processed_items": len(processed_data)}
+    return processed_data
 
-@offload
+@offload(deterministic=True)
 def image_processing_emulation(iterations):
     """محاكاة معالجة الصور"""
+    results = engines.pick("image_processing_local", _image_reference, _image_vectorized, sample=(5,))(iterations)
+    return {"iterations": iterations, "results": results}
+
+def _image_reference(iterations):
     results = []
     for i in range(iterations):
         fake_processing = sum(math.sqrt(x) for x in range(i * 100, (i + 1) * 100))
         results.append(fake_processing)
         time.sleep(0.01)
-    return {"iterations": iterations, "results": results}
+    return results
+
+def _image_vectorized(iterations):
+    # زمن المحاكاة (0.01s لكل تكرار) يبقى كما هو في انتظار واحد
+    values = engines.sqrt_blocks(iterations).tolist()
+    time.sleep(0.01 * len(values))
+    return values
@@ -1,11 +1,11 @@
 # peer_server.py
 
-from flask import Flask, request, jsonify  # استيراد request و jsonify مع Flask
+from flask import Flask, Response, request, jsonify, stream_with_context  # استيراد request و jsonify مع Flask
 import psutil
-import smart_tasks
 import time
 import socket
 import peer_discovery  # إذا كان يستخدم لاحقًا
+from offload_core import admission, batching, executors, single_flight, streaming, tasks, tiled_matmul, wire
 
 app = Flask(__name__)  # إنشاء التطبيق
 
@@ -16,22 +16,77 @@ def cpu():
 
 @app.route("/run", methods=["POST"])
 def run():
-    data = request.get_json(force=True)
-    fn_name = data.get("func")
-    fn = getattr(smart_tasks, fn_name, None)
-    if not fn:
+    data = wire.decode_body(request.content_type, request.get_data())
+    spec = tasks.get(data.get("func"))
+    if not spec:
         return jsonify(error="function-not-found"), 404
     try:
         start = time.time()
-        result = fn(*data.get("args", []), **data.get("kwargs", {}))
-        return jsonify(
+        # التنفيذ عبر خلفية العقدة (مجمّع عمليات للمهام الحسابية) بدل خيط الطلب
+        # الطلبات المتطابقة المتزامنة تشترك في تنفيذ واحد، والمنفِّذ يحجز منفذاً من فئة موارد المهمة
+        args, kwargs = data.get("args", []), data.get("kwargs", {})
+        result = single_flight.do(spec.name, args, kwargs, _run_in_slot, spec, args, kwargs)
+        return _reply(dict(
             result=result,
             host=socket.gethostname(),
             took=round(time.time() - start, 3)
-        )
+        ))
+    except admission.Busy:
+        return jsonify(error="busy"), 429, {"Retry-After": "1"}
     except Exception as e:
         return jsonify(error=str(e)), 500
 
+def _run_in_slot(spec, args, kwargs, reject=True):
+    with admission.get_node_slots().slot(spec, reject):
+        result = executors.get_router().submit(spec, args, kwargs).result()
+    # لا مخزن كائنات هنا: نواتج القرص تُقرأ إلى الرد وتُحذف ملفاتها
+    return tiled_matmul.adopt(result)
+
+def _resolve(name):
+    spec = tasks.get(name)
+    if spec is None:
+        return None
+    # عناصر الدفعة تنتظر دورها بدل الرفض
+    return lambda *args, **kwargs: _run_in_slot(spec, args, kwargs, reject=False)
+
+def _reply(payload, status=200):
+    # إطار ثنائي إن طلبه العميل في Accept، وإلا JSON
+    body, content_type = wire.encode_body(payload, request.headers.get("Accept"))
+    return Response(body, status=status, content_type=content_type)
+
+@app.route("/run_batch", methods=["POST"])
+def run_batch():
+    # مصفوفة استدعاءات {func,args,kwargs}؛ تُعاد النتائج سطراً بسطر (NDJSON) فور اكتمالها
+    data = wire.decode_body(request.content_type, request.get_data())
+    calls = data.get("calls", [])
+    results = batching.run_batch(calls, _resolve)
+    return Response(stream_with_context(batching.iter_ndjson(results)), mimetype=batching.NDJSON)
+
+@app.route("/run_stream", methods=["POST"])
+def run_stream():
+    # مهمة مولِّدة: تُبث أجزاؤها (SSE) فور إنتاجها بدل تجميعها في قائمة واحدة
+    data = wire.decode_body(request.content_type, request.get_data())
+    spec = tasks.get(data.get("func"))
+    if not spec:
+        return jsonify(error="function-not-found"), 404
+    if not spec.streaming:
+        return jsonify(error="not-a-streaming-task: use /run"), 400
+    slots = admission.get_node_slots()
+    try:
+        pool = slots.acquire(spec)
+    except admission.Busy:
+        return jsonify(error="busy"), 429, {"Retry-After": "1"}
+
+    def chunks():
+        # المنفذ محجوز طوال البث
+        try:
+            yield from spec.func(*data.get("args", []), **data.get("kwargs", {}))
+        finally:
+            slots.release(pool)
+
+    return Response(stream_with_context(streaming.iter_sse(chunks())), mimetype=streaming.SSE,
+                    headers={"Cache-Control": "no-cache"})
+
 if __name__ == "__main__":  # التصحيح هنا
     app.run(host="0.0.0.0", port=7520)
 
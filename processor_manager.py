@@ -1,28 +1,26 @@
 # processor_manager.py
 
 import psutil
-from collections import deque
 import logging
 
+from offload_core import load_sampler
+
 logging.basicConfig(level=logging.INFO)
 
 class ResourceMonitor:
+    """واجهة على القائس المشترك: القراءة فورية دون انتظار عيّنة جديدة"""
     def __init__(self):
-        self.cpu_history = deque(maxlen=10)
-        self.mem_history = deque(maxlen=10)
+        self._sampler = load_sampler.get_sampler()
+        self.cpu_history = self._sampler.cpu_history
+        self.mem_history = self._sampler.mem_history
 
     def current_load(self):
-        cpu = psutil.cpu_percent(interval=0.5) / 100.0  # كنسبة (0.0 - 1.0)
-        mem = psutil.virtual_memory().available / (1024**2)  # MB
-
-        self.cpu_history.append(cpu)
-        self.mem_history.append(mem)
-
-        avg_cpu = sum(self.cpu_history) / len(self.cpu_history)
-        avg_mem = sum(self.mem_history) / len(self.mem_history)
+        status = self._sampler.snapshot()
+        cpu, mem = status["instant"]["cpu"], status["instant"]["mem"]
+        avg_cpu, avg_mem = status["average"]["cpu"], status["average"]["mem"]
 
-        logging.info(f"Instant CPU: {cpu:.2%}, Instant MEM: {mem:.1f}MB")
-        logging.info(f"Avg CPU: {avg_cpu:.2%}, Avg MEM: {avg_mem:.1f}MB")
+        logging.debug(f"Instant CPU: {cpu:.2%}, Instant MEM: {mem:.1f}MB")
+        logging.debug(f"Avg CPU: {avg_cpu:.2%}, Avg MEM: {avg_mem:.1f}MB")
 
         return {
             "instant": {"cpu": cpu, "mem": mem},
@@ -35,8 +33,7 @@ def trigger_offload():
     print("⚠️ تم استدعاء توزيع المهام (اختباري)")
 
 def should_offload(task_complexity=0):
-    monitor = ResourceMonitor()
-    status = monitor.current_load()
+    status = load_sampler.snapshot()
 
     if (
         status['average']['cpu'] > 0.6 or
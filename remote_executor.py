@@ -3,11 +3,12 @@
 # يرسل المهمّة إلى سيرفر RPC خارجي مع تشفير + توقيع، أو يعمل بوضع JSON صافٍ لو لم يكن SecurityManager مفعَّل.
 # ============================================================
 
-import requests
 import json
 import os
 from typing import Any
 
+from offload_core import http_pool, wire
+
 # عنوان الخادم البعيد (يمكن تعيينه بمتغير بيئي)
 REMOTE_SERVER = os.getenv("REMOTE_SERVER", "http://89.111.171.92:7520/run")
 
@@ -38,25 +39,21 @@ def execute_remotely(func_name: str, args: list[Any] | None = None, kwargs: dict
 
     try:
         if SECURITY_ENABLED:
-            # 1) وقّع المهمة ثم شفّرها
-            signed_task = security.sign_task(task)
+            # 1) وقّع المهمة ثم شفّرها (التوقيع يُحسب على JSON لذا تُحوَّل المصفوفات)
+            signed_task = security.sign_task(wire.to_jsonable(task))
             encrypted   = security.encrypt_data(json.dumps(signed_task).encode())
 
             headers = {
                 "X-Signature": security.signature_hex,
-                "Content-Type": "application/octet-stream"
+                "Content-Type": "application/octet-stream",
+                "Accept": f"{wire.CONTENT_TYPE}, {wire.JSON_TYPE}"
             }
-            payload = encrypted  # خام ثنائي
+            response = http_pool.post(REMOTE_SERVER, headers=headers, data=encrypted, timeout=15)
+            response.raise_for_status()
+            data = wire.decode_response(response)
         else:
-            # وضع التطوير: أرسل JSON صريح
-            headers = {"Content-Type": "application/json"}
-            payload = task
-
-        response = requests.post(REMOTE_SERVER, headers=headers, json=payload if not SECURITY_ENABLED else None,
-                                 data=payload if SECURITY_ENABLED else None,
-                                 timeout=15)
-        response.raise_for_status()
-        data = response.json()
+            # وضع التطوير: إطار ثنائي عند وجود مصفوفات NumPy، وإلا JSON صريح
+            data = wire.post(REMOTE_SERVER, task, timeout=15)
         return data.get("result", "⚠️ لا يوجد نتيجة")
 
     except Exception as e:
@@ -5,10 +5,11 @@
 #   • وإلا إن وصل JSON خام في Content‑Type: application/json → ينفّذ مباشرة (وضع تطويـر).
 # ============================================================
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 import smart_tasks  # «your_tasks» تمّ استيراده تحت هذا الاسم فى main.py
-import logging, json
+import logging
 from security_layer import SecurityManager
+from offload_core import batching, wire
 
 SECURITY = SecurityManager("my_shared_secret_123")
 
@@ -18,37 +19,47 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
-app = Flask(name)
+app = Flask(__name__)
 
 # ------------------------------------------------------------------
 @app.route("/health")
 def health():
     return jsonify(status="ok")
 
+# ------------------------------------------------------------------
+def _read_payload():
+    """قراءة جسم الطلب (JSON أو مُشفَّر) والتحقق من التوقيع؛ تُرجع (data, error_response)"""
+    # 1) حاول قراءة كـ JSON مباشر (وضع التطويـر)
+    if request.is_json:
+        data = request.get_json()
+    elif request.mimetype == wire.CONTENT_TYPE:
+        data = wire.loads(request.get_data())
+    else:
+        # 2) وإلا اعتبره Payload مُشفَّر (وضع الإنتاج)
+        encrypted = request.get_data()
+        try:
+            decrypted = SECURITY.decrypt_data(encrypted)
+            data = wire.decode_body(None, decrypted)
+        except Exception as e:
+            logging.error(f"⚠️ فشل فك التشفير: {e}")
+            return None, (jsonify(error="Decryption failed"), 400)
+
+    # 3) التحقّق من التوقيع إن وُجد
+    if "_signature" in data:
+        if not SECURITY.verify_task(data):
+            logging.warning("❌ توقيع غير صالح")
+            return None, (jsonify(error="Invalid signature"), 403)
+        # أزل عناصر موقّعة إضافية
+        data = {k: v for k, v in data.items() if k not in ("_signature", "sender_id")}
+    return data, None
+
 # ------------------------------------------------------------------
 @app.route("/run", methods=["POST"])
 def run():
     try:
-        # 1) حاول قراءة كـ JSON مباشر (وضع التطويـر)
-        if request.is_json:
-            data = request.get_json()
-        else:
-            # 2) وإلا اعتبره Payload مُشفَّر (وضع الإنتاج)
-            encrypted = request.get_data()
-            try:
-                decrypted = SECURITY.decrypt_data(encrypted)
-                data = json.loads(decrypted.decode())
-            except Exception as e:
-                logging.error(f"⚠️ فشل فك التشفير: {e}")
-                return jsonify(error="Decryption failed"), 400
-
-        # 3) التحقّق من التوقيع إن وُجد
-        if "_signature" in data:
-            if not SECURITY.verify_task(data):
-                logging.warning("❌ توقيع غير صالح")
-                return jsonify(error="Invalid signature"), 403
-            # أزل عناصر موقّعة إضافية
-            data = {k: v for k, v in data.items() if k not in ("_signature", "sender_id")}
+        data, error = _read_payload()
+        if error:
+            return error
 
         func_name = data.get("func")
         args      = data.get("args", [])
@@ -61,13 +72,25 @@ def run():
 
         logging.info(f"⚙️ تنفيذ الدالة: {func_name} من جهاز آخر")
         result = fn(*args, **kwargs)
-        return jsonify(result=result)
+        body, content_type = wire.encode_body({"result": result}, request.headers.get("Accept"))
+        return Response(body, content_type=content_type)
 
     except Exception as e:
         logging.error(f"🔥 خطأ أثناء تنفيذ المهمة: {str(e)}")
         return jsonify(error=str(e)), 500
 
 # ------------------------------------------------------------------
-if name == "main":
+@app.route("/run_batch", methods=["POST"])
+def run_batch():
+    data, error = _read_payload()
+    if error:
+        return error
+    calls = data.get("calls", [])
+    logging.info(f"⚙️ تنفيذ دفعة من {len(calls)} مهمة من جهاز آخر")
+    results = batching.run_batch(calls, lambda name: getattr(smart_tasks, name, None))
+    return Response(stream_with_context(batching.iter_ndjson(results)), mimetype=batching.NDJSON)
+
+# ------------------------------------------------------------------
+if __name__ == "__main__":
     # تأكد أن المنفذ 7520 مفتوح
     app.run(host="0.0.0.0", port=7520)
@@ -11,7 +11,9 @@ setup(
         "psutil",
         "zeroconf",
         "flask_cors",
-        "numpy"
+        "numpy",
+        "fastapi",
+        "uvicorn"
     ],
     entry_points={
         "console_scripts": [
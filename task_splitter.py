@@ -1,16 +1,53 @@
 # task_splitter.py
+import time
+import queue
 from typing import Dict, Any, List
 import networkx as nx
 import hashlib
 
+
+class Dep:
+    """موضع في args/kwargs لمهمة يُستبدل بنتيجة المهمة task_id عند التنفيذ"""
+
+    def __init__(self, task_id: str):
+        self.task_id = task_id
+
+    def __repr__(self):
+        return f"Dep({self.task_id!r})"
+
+
+def _dep_ids(value) -> List[str]:
+    """معرّفات المهام المشار إليها بـ Dep داخل قيمة (بما فيها القوائم والقواميس المتداخلة)"""
+    if isinstance(value, Dep):
+        return [value.task_id]
+    if isinstance(value, (list, tuple)):
+        return [d for v in value for d in _dep_ids(v)]
+    if isinstance(value, dict):
+        return [d for v in value.values() for d in _dep_ids(v)]
+    return []
+
+
+class DagError(RuntimeError):
+    """فشل مهمة داخل الرسم البياني"""
+
+    def __init__(self, task_id: str, error: BaseException, results: Dict[str, Any]):
+        super().__init__(f"فشلت المهمة {task_id}: {error}")
+        self.task_id = task_id
+        self.error = error
+        self.results = results  # نتائج المهام التي اكتملت قبل الفشل
+
+
 class TaskSplitter:
     def __init__(self):
         self._dependency_graph = nx.DiGraph()
     
     def add_task(self, task_id: str, task: Dict[str, Any], deps: List[str] = []):
-        """إضافة مهمة مع تبعياتها"""
+        """إضافة مهمة مع تبعياتها.
+        task: {"func": دالة أو اسم مهمة مسجّلة, "args": [...], "kwargs": {...}}؛
+        يمكن أن تحتوي args/kwargs على Dep(dep_id) لتمرير نتيجة تبعية."""
         self._dependency_graph.add_node(task_id, task=task)
-        for dep in deps:
+        refs = _dep_ids(list(task.get('args', [])) + list(task.get('kwargs', {}).values()))
+        for dep in list(deps) + [d for d in refs if d not in deps]:
             self._dependency_graph.add_edge(dep, task_id)
     
     def split_tasks(self) -> Dict[str, List[Dict]]:
@@ -28,9 +65,117 @@ class TaskSplitter:
                         'task': self._dependency_graph.nodes[node]['task']
                     })
         return clusters
+
+    def run(self, executor, timeout: float = None, keep_intermediates: bool = True) -> Dict[str, Any]:
+        """تنفيذ الرسم البياني عبر executor وإرجاع {task_id: النتيجة}.
+        مع keep_intermediates تبقى نتائج المهام الوسيطة على الجهاز المنتِج كمراجع كائنات،
+        وتُحذف بعد أن تستهلكها كل توابعها فلا تظهر في النتائج. timeout مهلة للرسم كله."""
+        return DagRunner(self._dependency_graph, executor, keep_intermediates).run(timeout)
     
     def _generate_cluster_id(self, node: str, level: int) -> str:
         """إنشاء معرف فريد لكل مجموعة مهام"""
         deps = list(self._dependency_graph.predecessors(node))
         deps_hash = hashlib.md5(','.join(sorted(deps)).encode()).hexdigest()[:8]
         return f"L{level}-{deps_hash}"
+
+
+def _release_result(future):
+    from offload_core import object_store
+    if not future.cancelled() and future.exception() is None and object_store.is_ref(future.result()):
+        object_store.release(future.result())
+
+
+class DagRunner:
+    """ينفّذ رسم تبعيات TaskSplitter: كل مهمة تُرسل إلى DistributedExecutor فور اكتمال
+    تبعياتها، دون انتظار بقية مهام مستواها (topological generation).
+    المهام التي لها تابعون تُرسل عبر submit_ref (إن توفر) فتبقى نتائجها على الجهاز المنتِج،
+    وتفضّل الجدولة تشغيل التابع هناك بدل نقل البيانات عبر العميل؛ يُحذف كل مرجع من مالكه
+    فور اكتمال آخر تابع له، أو عند فشل الرسم أو انتهاء مهلته."""
+
+    def __init__(self, graph: nx.DiGraph, executor, keep_intermediates: bool = True):
+        missing = [n for n, data in graph.nodes(data=True) if 'task' not in data]
+        if missing:
+            raise ValueError(f"تبعيات غير معرّفة: {', '.join(map(str, missing))}")
+        if not nx.is_directed_acyclic_graph(graph):
+            raise ValueError(f"الرسم يحتوي على حلقة: {nx.find_cycle(graph)}")
+        self.graph = graph
+        self.executor = executor
+        self.keep_intermediates = keep_intermediates and hasattr(executor, 'submit_ref')
+
+    def run(self, timeout: float = None) -> Dict[str, Any]:
+        from offload_core import object_store
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        waiting = {node: self.graph.in_degree(node) for node in self.graph}
+        consumers = {node: self.graph.out_degree(node) for node in self.graph}
+        results, futures = {}, {}
+        done = queue.Queue()
+        finished = set()
+
+        def release(node):
+            value = results.pop(node)
+            if object_store.is_ref(value):
+                object_store.release(value)
+
+        def abandon():
+            """إلغاء ما لم يبدأ وحذف كل المراجع، بما فيها مراجع مهام تكتمل لاحقاً"""
+            for node, pending in futures.items():
+                if node not in finished and not pending.cancel():
+                    pending.add_done_callback(_release_result)
+            for node in [n for n, value in results.items() if object_store.is_ref(value)]:
+                release(node)
+
+        def submit(node):
+            task = self.graph.nodes[node]['task']
+            func = self._resolve(task['func'])
+            args = [self._fill(a, results) for a in task.get('args', [])]
+            kwargs = {k: self._fill(v, results) for k, v in task.get('kwargs', {}).items()}
+            keep = self.keep_intermediates and self.graph.out_degree(node) > 0
+            submit_fn = self.executor.submit_ref if keep else self.executor.submit
+            future = futures[node] = submit_fn(func, *args, **kwargs)
+            future.add_done_callback(lambda f: done.put((node, f)))
+
+        for node in [n for n, count in waiting.items() if count == 0]:
+            submit(node)
+        while len(finished) < len(waiting):
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                node, future = done.get(timeout=remaining)
+            except queue.Empty:
+                abandon()
+                raise TimeoutError(f"لم تكتمل {len(waiting) - len(finished)} مهمة خلال {timeout}s")
+            finished.add(node)
+            error = future.exception()
+            if error is not None:
+                abandon()
+                raise DagError(node, error, results)
+            results[node] = future.result()
+            for dep in self.graph.predecessors(node):
+                consumers[dep] -= 1
+                if consumers[dep] == 0 and self.keep_intermediates:
+                    release(dep)
+            for successor in self.graph.successors(node):
+                waiting[successor] -= 1
+                if waiting[successor] == 0:
+                    submit(successor)
+        return results
+
+    @staticmethod
+    def _resolve(func):
+        if callable(func):
+            return func
+        from offload_core import tasks
+        spec = tasks.get(func)
+        if spec is None:
+            raise KeyError(f"function-not-found: {func}")
+        return spec.func
+
+    @classmethod
+    def _fill(cls, value, results):
+        if isinstance(value, Dep):
+            return results[value.task_id]
+        if isinstance(value, (list, tuple)):
+            return [cls._fill(v, results) for v in value]
+        if isinstance(value, dict):
+            return {k: cls._fill(v, results) for k, v in value.items()}
+        return value
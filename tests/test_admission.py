@@ -0,0 +1,76 @@
+# test_admission.py
+import pytest
+
+from offload_core import admission
+
+
+@pytest.fixture
+def published(monkeypatch):
+    """خدمة mDNS وهمية مسجّلة كما يسجّل PeerRegistry.register_service نفسه"""
+    props = []
+    monkeypatch.setattr(admission, "_advertisers", [])
+    admission.register_advertiser(lambda **p: props.append(p) or True)
+    return props
+
+
+def test_publish_updates_registered_service(published):
+    props = admission.advertisement({"cpu": (4, 2, 4), "io": (1, 0, 8)}, queued=3)
+    assert admission.publish(props)
+    assert published == [{"load": 1.5, "capacity": 4, "free_cpu": 0, "free_io": 7, "queued": 3}]
+
+
+def test_publish_without_registered_service(monkeypatch):
+    monkeypatch.setattr(admission, "_advertisers", [])
+    assert not admission.publish({"load": 0.0})
+
+
+def test_idle_advertisement_has_no_load():
+    props = admission.idle_advertisement()
+    assert props["load"] == 0.0
+    assert props["capacity"] == admission.SLOTS["cpu"]
+
+
+def test_slot_pool_rejects_when_queue_is_full():
+    pool = admission.SlotPool(1, 0)
+    pool.acquire()
+    with pytest.raises(admission.Busy):
+        pool.acquire()
+    pool.release()
+    pool.acquire()
+
+
+def test_async_acquire_hands_released_slot_to_oldest_waiter():
+    import asyncio
+
+    async def scenario():
+        pool = admission.SlotPool(1, 1)
+        await pool.acquire_async()
+        waiter = asyncio.ensure_future(pool.acquire_async())
+        await asyncio.sleep(0)
+        assert pool.state() == (1, 1, 1)
+        with pytest.raises(admission.Busy):
+            await pool.acquire_async()
+        pool.release()
+        await asyncio.wait_for(waiter, 1)
+        assert pool.state() == (1, 0, 1)
+        pool.release()
+        assert pool.state() == (0, 0, 1)
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_async_waiter_does_not_leak_a_slot():
+    import asyncio
+
+    async def scenario():
+        pool = admission.SlotPool(1, 2)
+        await pool.acquire_async()
+        waiter = asyncio.ensure_future(pool.acquire_async())
+        await asyncio.sleep(0)
+        pool.release()        # سُلِّم المنفذ للمنتظر
+        waiter.cancel()       # ثم أُلغي قبل أن يستلمه
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert pool.state() == (0, 0, 1)
+        await asyncio.wait_for(pool.acquire_async(), 1)
+
+    asyncio.run(scenario())
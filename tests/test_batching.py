@@ -0,0 +1,62 @@
+# test_batching.py
+import json
+
+import pytest
+import requests
+
+from offload_core import batching, http_pool, peer_health
+from offload_core.peer_health import PeerHealth
+
+
+@pytest.fixture
+def health(monkeypatch):
+    health = PeerHealth(failures=1, cooldown=60)
+    monkeypatch.setattr(peer_health, "_health", health)
+    return health
+
+
+def test_failed_batch_is_recorded_against_the_peer(monkeypatch, health):
+    def refuse(url, **kwargs):
+        raise requests.ConnectionError("refused")
+
+    monkeypatch.setattr(http_pool, "post", refuse)
+    coalescer = batching.BatchCoalescer({"ip": "10.0.0.9", "port": 7520}, linger=0)
+    future = coalescer.submit({"func": "prime_calculation", "args": [10], "kwargs": {}})
+    with pytest.raises(requests.ConnectionError):
+        future.result(timeout=5)
+    assert health.state("10.0.0.9:7520") == peer_health.OPEN
+
+
+def test_run_batch_yields_every_call_with_its_index():
+    registry = {"square": lambda x: x * x}
+    calls = [{"func": "square", "args": [i]} for i in range(5)] + [{"func": "missing"}]
+    items = sorted(batching.run_batch(calls, registry.get), key=lambda item: item["index"])
+
+    assert [item.get("result") for item in items[:5]] == [0, 1, 4, 9, 16]
+    assert items[5] == {"error": "function-not-found", "index": 5}
+
+
+def test_coalescer_routes_streamed_results_to_their_calls(monkeypatch, health):
+    class Streamed:
+        def __init__(self, calls):
+            self.lines = [json.dumps({"index": i, "result": call["args"][0] * 10}).encode()
+                          for i, call in reversed(list(enumerate(calls)))]
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def raise_for_status(self):
+            pass
+
+        def iter_lines(self):
+            return iter(self.lines)
+
+    monkeypatch.setattr(http_pool, "post", lambda url, **kwargs: Streamed(kwargs["json"]["calls"]))
+    coalescer = batching.BatchCoalescer("10.0.0.8:7520", linger=0.05)
+    futures = [coalescer.submit({"func": "f", "args": [i], "kwargs": {}}) for i in range(4)]
+
+    assert [f.result(timeout=5)["result"] for f in futures] == [0, 10, 20, 30]
+    assert health.state("10.0.0.8:7520") == peer_health.CLOSED
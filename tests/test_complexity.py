@@ -0,0 +1,58 @@
+# test_complexity.py
+import numpy as np
+import pytest
+
+from offload_core import complexity
+from offload_core.complexity import LOCAL, ComplexityEstimator, RuntimeModel
+
+
+def test_linear_runtime_is_learned():
+    model = RuntimeModel()
+    for work in (10, 20, 40, 80):
+        model.observe(work, 0.5 + 0.01 * work)
+    assert model.predict(200) == pytest.approx(2.5)
+
+
+def test_single_work_size_scales_proportionally():
+    model = RuntimeModel()
+    model.observe(100, 1.0)
+    model.observe(100, 1.0)
+    assert model.predict(300) == pytest.approx(3.0)
+
+
+def test_old_samples_fade():
+    model = RuntimeModel(decay=0.5)
+    for _ in range(5):
+        model.observe(100, 1.0)
+    for _ in range(10):
+        model.observe(100, 2.0)
+    assert model.predict(100) == pytest.approx(2.0, rel=0.01)
+
+
+def test_predictions_wait_for_enough_samples():
+    estimator = ComplexityEstimator(min_samples=3)
+    estimator.observe("f", 10, 0.1)
+    estimator.observe("f", 20, 0.2)
+    assert estimator.predict("f", 40) is None
+    estimator.observe("f", 30, 0.3)
+    assert estimator.predict("f", 40) == pytest.approx(0.4)
+
+
+def test_unmeasured_node_uses_other_nodes():
+    estimator = ComplexityEstimator(min_samples=1)
+    estimator.observe("f", 10, 1.0, node="10.0.0.1:7520")
+    estimator.observe("f", 10, 3.0, node="10.0.0.2:7520")
+    assert estimator.predict("f", 10, node=LOCAL) == pytest.approx(2.0)
+
+
+def test_declared_cost_beats_the_generic_estimate(monkeypatch):
+    monkeypatch.setattr(complexity, "COSTS", {})
+    complexity.register_cost("sort", lambda items: len(items) * np.log2(max(2, len(items))))
+    estimator = ComplexityEstimator()
+    assert estimator.work("sort", ([0] * 8,)) == pytest.approx(24)
+    assert estimator.work("other", (3, np.zeros((2, 5))), {"flag": True, "name": "ab"}) == 3 * 10 * 2
+
+
+def test_heavy_uses_seconds_once_learned():
+    assert complexity.is_heavy({"work": 100, "seconds": None}, threshold=50)
+    assert not complexity.is_heavy({"work": 100, "seconds": 0.1}, threshold=50, seconds=0.5)
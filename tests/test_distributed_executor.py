@@ -0,0 +1,32 @@
+# test_distributed_executor.py
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("zeroconf")
+from distributed_executor import DistributedExecutor  # noqa: E402
+
+
+def _bare_executor(max_cached_results):
+    # بلا اكتشاف أجهزة ولا عمّال: يكفي لاختبار سجل النتائج
+    executor = object.__new__(DistributedExecutor)
+    executor.result_cache = OrderedDict()
+    executor._results_lock = threading.Lock()
+    executor.max_cached_results = max_cached_results
+    return executor
+
+
+def test_result_log_stays_bounded_under_concurrent_writers():
+    executor = _bare_executor(max_cached_results=50)
+
+    def write(worker):
+        for i in range(2000):
+            executor._cache_result(f"{worker}-{i}", i)
+            executor.get_result(f"{worker}-{i - 1}")
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(write, range(8)))
+
+    assert len(executor.result_cache) == 50
@@ -0,0 +1,24 @@
+# test_engines.py
+import time
+
+import pytest
+
+from offload_core import engines
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 3, 100, 10007])
+def test_segmented_primes_match_full_sieve(n):
+    assert engines.primes_in_range(2, n, span=64).tolist() == engines.sieve_primes(n).tolist()
+
+
+def test_count_matches_segmented_primes():
+    assert engines.count_primes(2, 100000, span=1000) == engines.primes_in_range(2, 100000).size == 9592
+
+
+def test_vectorized_image_emulation_keeps_values_and_latency():
+    from offload_core import smart_tasks
+
+    start = time.perf_counter()
+    vectorized = smart_tasks._image_vectorized(8, 3)
+    assert time.perf_counter() - start >= 0.05
+    assert vectorized == pytest.approx(smart_tasks._image_reference(8, 3))
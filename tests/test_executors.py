@@ -0,0 +1,44 @@
+# test_executors.py
+import operator
+
+import pytest
+
+from offload_core import executors, tasks
+
+
+@pytest.fixture
+def router():
+    router = executors.BackendRouter("auto")
+    yield router
+    router.shutdown()
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        executors.BackendRouter("gpu")
+
+
+@pytest.mark.parametrize("name, backend", [
+    ("prime_calculation", "processes"),
+    ("render_3d_scene", "threads"),
+])
+def test_auto_mode_routes_by_task_kind(monkeypatch, router, name, backend):
+    monkeypatch.setattr(executors.ProcessBackend, "warm", lambda self: None)
+    assert router.backend_for(tasks.get(name)).name == backend
+
+
+def test_fixed_mode_ignores_task_kind():
+    router = executors.BackendRouter("inline")
+    assert router.backend_for(tasks.get("prime_calculation")).name == "inline"
+
+
+def test_inline_backend_reports_errors_through_the_future():
+    future = executors.InlineBackend().submit(operator.truediv, (1, 0))
+    with pytest.raises(ZeroDivisionError):
+        future.result()
+
+
+def test_registered_task_runs_in_a_warm_process_pool(router):
+    spec = tasks.get("prime_count")
+    assert router.submit(spec, (1000,)).result(timeout=60) == {"count": 168}
+    assert router.backend("processes") is router.backend_for(spec)
@@ -0,0 +1,74 @@
+# test_http_pool.py
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from offload_core import http_pool
+from offload_core.http_pool import SessionPool
+
+
+@pytest.mark.parametrize("peer, key", [
+    ("192.168.1.5:7520", "192.168.1.5:7520"),
+    ("http://192.168.1.5:7520/run", "192.168.1.5:7520"),
+    ({"ip": "10.0.0.1", "port": 7520}, "10.0.0.1:7520"),
+    ("example.org", "example.org:80"),
+])
+def test_peer_key_normalizes_addresses(peer, key):
+    assert http_pool.peer_key(peer) == key
+
+
+def test_one_session_per_peer():
+    pool = SessionPool()
+    assert pool.session_for("http://10.0.0.1:7520/run") is pool.session_for("10.0.0.1:7520")
+    assert pool.session_for("10.0.0.2:7520") is not pool.session_for("10.0.0.1:7520")
+
+
+def test_least_recently_used_peer_is_closed_beyond_the_limit():
+    pool = SessionPool(max_peers=2)
+    first = pool.session_for("10.0.0.1:7520")
+    pool.session_for("10.0.0.2:7520")
+    pool.session_for("10.0.0.1:7520")
+    pool.session_for("10.0.0.3:7520")
+    assert pool.session_for("10.0.0.1:7520") is first
+    assert set(pool._sessions) == {"10.0.0.3:7520", "10.0.0.1:7520"}
+
+
+def test_idle_sessions_are_replaced():
+    pool = SessionPool(idle_timeout=0)
+    first = pool.session_for("10.0.0.1:7520")
+    assert pool.session_for("10.0.0.1:7520") is not first
+
+
+@pytest.fixture
+def server():
+    clients = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            clients.append(self.client_address)
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}", clients
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_requests_reuse_the_keep_alive_connection(server):
+    url, clients = server
+    pool = SessionPool()
+    for _ in range(5):
+        assert pool.request("POST", f"{url}/run", json={}, timeout=5).status_code == 200
+    pool.close()
+    assert len(set(clients)) == 1
@@ -0,0 +1,40 @@
+# test_load_sampler.py
+import time
+from collections import namedtuple
+
+import pytest
+
+from offload_core import load_sampler
+from offload_core.load_sampler import LoadSampler
+
+
+@pytest.fixture
+def readings(monkeypatch):
+    values = iter([50.0, 10.0, 30.0, 90.0])
+    memory = namedtuple("memory", "available")
+    monkeypatch.setattr(load_sampler.psutil, "cpu_percent", lambda interval=None: next(values))
+    monkeypatch.setattr(load_sampler.psutil, "virtual_memory", lambda: memory(2048 * 1024 ** 2))
+    return values
+
+
+def test_start_takes_a_first_sample_without_waiting(readings):
+    start = time.perf_counter()
+    sampler = LoadSampler(interval=60).start()
+    assert time.perf_counter() - start < 0.5
+    snapshot = sampler.snapshot()
+    assert snapshot["instant"] == {"cpu": 0.1, "mem": 2048.0}   # القراءة الأولى (50%) مرجعية فقط
+
+
+def test_average_covers_the_window(readings):
+    sampler = LoadSampler(interval=60, window=2)
+    for _ in range(3):
+        sampler._sample()
+    snapshot = sampler.snapshot()
+    assert snapshot["instant"]["cpu"] == pytest.approx(0.3)
+    assert snapshot["average"]["cpu"] == pytest.approx((0.1 + 0.3) / 2)
+
+
+def test_start_is_idempotent(readings):
+    sampler = LoadSampler(interval=60)
+    assert sampler.start() is sampler.start()
+    assert sampler.snapshot()["instant"]["cpu"] == pytest.approx(0.1)
@@ -0,0 +1,35 @@
+# test_map_reduce.py
+from offload_core import map_reduce, smart_tasks, tasks
+from offload_core.map_reduce import split_range
+
+
+def test_split_range_covers_the_range_without_gaps():
+    shards = split_range(2, 1001, 7, min_size=10)
+    assert shards[0][0] == 2 and shards[-1][1] == 1001
+    assert all(prev[1] + 1 == nxt[0] for prev, nxt in zip(shards, shards[1:]))
+    assert split_range(2, 30, 8, min_size=10) == [(2, 15), (16, 30)]
+    assert split_range(5, 4, 3) == []
+
+
+def test_splitter_round_trip_matches_unsplit_result():
+    spec = tasks.get("prime_calculation")
+    splitter = spec.splitter
+    calls = splitter.split((20000,), {}, 6)
+    assert len(calls) > 1
+    shard = tasks.get(splitter.shard_func).func
+    merged = splitter.merge(calls, [shard(*args, **kwargs) for args, kwargs in calls])
+    assert merged == smart_tasks.prime_calculation(20000)
+
+
+def test_run_locally_matches_unsplit_result():
+    assert map_reduce.run("prime_count", (50000,), local_workers=2) == smart_tasks.prime_count(50000)
+
+
+def test_only_the_registered_function_itself_is_split():
+    def prime_calculation(n):
+        return {"primes_count": 0, "primes": []}
+
+    assert map_reduce.splittable("prime_calculation")
+    assert map_reduce.splittable("prime_calculation", smart_tasks.prime_calculation)
+    assert not map_reduce.splittable("prime_calculation", prime_calculation)
+    assert not map_reduce.splittable("matrix_multiply")
@@ -0,0 +1,77 @@
+# test_object_store.py
+import numpy as np
+import pytest
+
+from offload_core import http_pool, object_store
+from offload_core.object_store import LOCAL, ObjectStore
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = ObjectStore(max_bytes=10 * 1024 * 1024, ttl=60)
+    monkeypatch.setattr(object_store, "_store", store)
+    return store
+
+
+def test_local_refs_resolve_inside_nested_arguments(store):
+    matrix = np.ones((4, 4))
+    ref = object_store.keep(matrix)
+
+    assert object_store.is_ref(ref) and ref["owner"] == LOCAL and ref["nbytes"] >= matrix.nbytes
+    args, kwargs = object_store.resolve([[1, ref], {"m": ref}])
+    assert args[1] is matrix and kwargs["m"] is matrix
+
+
+def test_locality_sums_bytes_per_owner():
+    refs = [object_store.make_ref("a", "10.0.0.1:7520", 100), object_store.make_ref("b", "10.0.0.1:7520", 50),
+            object_store.make_ref("c", LOCAL, 7)]
+    assert object_store.locality({"x": refs[:2], "y": (refs[2],)}) == {"10.0.0.1:7520": 150, LOCAL: 7}
+
+
+def test_inline_local_keeps_remote_refs(store):
+    remote = object_store.make_ref("r", "10.0.0.1:7520", 10)
+    local = object_store.keep([1, 2, 3])
+    assert object_store.inline_local([local, remote]) == [[1, 2, 3], remote]
+
+
+def test_release_drops_the_object_and_runs_its_cleanup(store):
+    dropped = []
+    ref = object_store.keep("value", on_drop=lambda: dropped.append(True))
+    object_store.release(ref)
+
+    assert dropped == [True]
+    with pytest.raises(KeyError):
+        object_store.resolve(ref)
+
+
+def test_remote_release_asks_the_owner(monkeypatch):
+    calls = []
+    monkeypatch.setattr(http_pool.POOL, "request", lambda method, url, **kw: calls.append((method, url)))
+    object_store.release(object_store.make_ref("abc", "10.0.0.1:7520", 1))
+    assert calls == [("DELETE", "http://10.0.0.1:7520/objects/abc")]
+
+
+def test_expired_objects_are_gone():
+    store = ObjectStore(ttl=-1)
+    object_id, _ = store.put("value")
+    with pytest.raises(KeyError):
+        store.get(object_id)
+
+
+def test_least_recently_used_objects_are_evicted_beyond_the_limit():
+    store = ObjectStore(max_bytes=2500, ttl=60)
+    first, _ = store.put(np.zeros(100))     # 800 بايت تقريباً لكل كائن
+    second, _ = store.put(np.zeros(100))
+    store.get(first)
+    store.put(np.zeros(100))
+    store.put(np.zeros(100))
+    assert store.stats()["objects"] == 3
+    assert store.get(first) is not None
+    with pytest.raises(KeyError):
+        store.get(second)
+
+
+def test_disk_backed_objects_do_not_count_against_memory():
+    store = ObjectStore(max_bytes=1000, ttl=60)
+    store.put(np.zeros(1000), resident=False)
+    assert store.stats()["bytes"] == 0
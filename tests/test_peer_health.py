@@ -0,0 +1,78 @@
+# test_peer_health.py
+import pytest
+import requests
+
+from offload_core import peer_health
+from offload_core.peer_health import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, PeerHealth
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failures=3, cooldown=5)
+    assert not breaker.failure(0) and not breaker.failure(0)
+    assert breaker.failure(0)
+    assert breaker.state == OPEN
+    assert not breaker.usable(4.9)
+
+
+def test_success_resets_the_failure_streak():
+    breaker = CircuitBreaker(failures=2, cooldown=5)
+    breaker.failure(0)
+    breaker.success()
+    assert not breaker.failure(0)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_allows_a_single_probe():
+    breaker = CircuitBreaker(failures=1, cooldown=5)
+    breaker.failure(0)
+    assert breaker.usable(5)
+    assert breaker.allow(5)
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow(5.1)       # الطلب التجريبي محجوز
+    breaker.success()
+    assert breaker.state == CLOSED and breaker.cooldown == 5
+
+
+def test_failed_probe_reopens_with_doubled_cooldown():
+    breaker = CircuitBreaker(failures=1, cooldown=5)
+    breaker.failure(0)
+    breaker.allow(5)
+    assert breaker.failure(5)
+    assert breaker.state == OPEN and breaker.cooldown == 10
+    assert not breaker.usable(14)
+    assert breaker.usable(15)
+
+
+def test_cooldown_is_capped():
+    breaker = CircuitBreaker(failures=1, cooldown=peer_health.MAX_COOLDOWN)
+    breaker.failure(0)
+    breaker.allow(peer_health.MAX_COOLDOWN)
+    breaker.failure(peer_health.MAX_COOLDOWN)
+    assert breaker.cooldown == peer_health.MAX_COOLDOWN
+
+
+@pytest.fixture
+def health(monkeypatch):
+    health = PeerHealth(failures=2, cooldown=60)
+    monkeypatch.setattr(peer_health, "_health", health)
+    return health
+
+
+def test_observe_counts_client_errors_as_alive(health):
+    response = requests.Response()
+    response.status_code = 404
+    with pytest.raises(requests.HTTPError):
+        with peer_health.observe("10.0.0.1:7520"):
+            raise requests.HTTPError(response=response)
+    assert health.state("10.0.0.1:7520") == CLOSED
+    assert health.snapshot()["10.0.0.1:7520"]["errors"] == 0
+
+
+def test_observe_opens_the_breaker_on_connection_errors(health):
+    peer = {"ip": "10.0.0.2", "port": 7520}
+    for _ in range(2):
+        with pytest.raises(requests.ConnectionError):
+            with peer_health.observe(peer):
+                raise requests.ConnectionError("refused")
+    assert health.state("10.0.0.2:7520") == OPEN
+    assert health.healthy([peer, "10.0.0.3:7520"]) == ["10.0.0.3:7520"]
@@ -0,0 +1,36 @@
+# test_peer_table.py
+import pytest
+
+pytest.importorskip("zeroconf")
+from offload_core import peer_table  # noqa: E402
+
+
+@pytest.fixture
+def table(monkeypatch):
+    monkeypatch.setattr(peer_table, "check_compatibility", lambda ip, port: True)
+    return peer_table.PeerTable()
+
+
+def test_source_peers_are_visible_to_every_reader(table):
+    wan = {"http://89.111.171.92:7520/run"}
+    table.add_source(lambda: wan)
+
+    assert table.wait_for_peers(timeout=2) == ("89.111.171.92:7520",)
+    wan.add("203.0.113.5:7520")
+    assert {info["key"] for info in table.all()} == {"89.111.171.92:7520", "203.0.113.5:7520"}
+
+
+def test_lan_peers_are_listed_before_wan(table):
+    table.add_source(lambda: ["89.111.171.92:7520", "192.168.1.20:7520"])
+    table.wait_for_peers(timeout=2)
+    table._checker.shutdown(wait=True)
+    assert table.peers() == ("192.168.1.20:7520", "89.111.171.92:7520")
+
+
+def test_a_failing_source_does_not_hide_the_others(table):
+    def broken():
+        raise OSError("غير متاح")
+
+    table.add_source(broken)
+    table.add_source(lambda: ["10.0.0.7:7520"])
+    assert table.wait_for_peers(timeout=2) == ("10.0.0.7:7520",)
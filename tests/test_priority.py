@@ -0,0 +1,77 @@
+# test_priority.py
+import math
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from offload_core.priority import (BATCH, INTERACTIVE, NORMAL, DeadlineExceeded, DeadlineQueue,
+                                   make_envelope)
+
+
+def _envelope(name, seq, priority, deadline):
+    return make_envelope({"task_id": name, "func": name}, None, Future(), seq, priority, deadline)
+
+
+def test_expired_interactive_task_is_dropped_before_it_starts():
+    queue = DeadlineQueue()
+    late = _envelope("frame", 0, INTERACTIVE, 0.01)
+    queue.put(late)
+    queue.put(_envelope("job", 1, NORMAL, math.inf))
+    time.sleep(0.02)
+
+    assert queue.get().task["task_id"] == "job"
+    with pytest.raises(DeadlineExceeded):
+        late.future.result(timeout=0)
+    assert queue.stats()["dropped"] == 1
+
+
+def test_expired_task_is_downgraded_to_batch_behind_live_work():
+    queue = DeadlineQueue()
+    late = _envelope("report", 0, NORMAL, 0.01)
+    queue.put(late)
+    time.sleep(0.02)
+    queue.put(_envelope("fresh", 1, NORMAL, 10))
+    queue.put(_envelope("old-batch", 2, BATCH, math.inf))
+
+    assert [queue.get().task["task_id"] for _ in range(3)] == ["fresh", "report", "old-batch"]
+    assert (late.priority, late.deadline) == (BATCH, math.inf)
+    assert not late.future.done()
+    assert queue.stats()["downgraded"] == 1
+
+
+def test_earliest_deadline_first_within_a_class():
+    queue = DeadlineQueue()
+    queue.put(_envelope("later", 0, NORMAL, 10))
+    queue.put(_envelope("sooner", 1, NORMAL, 5))
+    queue.put(_envelope("frame", 2, INTERACTIVE, 20))
+    assert [queue.get().task["task_id"] for _ in range(3)] == ["frame", "sooner", "later"]
+
+
+def test_cancelled_task_is_skipped_and_closed_queue_returns_none():
+    queue = DeadlineQueue()
+    cancelled = _envelope("gone", 0, NORMAL, math.inf)
+    queue.put(cancelled)
+    cancelled.future.cancel()
+    queue.close()
+    assert queue.get() is None
+
+
+def test_draining_a_large_queue_is_not_quadratic():
+    queue = DeadlineQueue()
+    count = 20000
+    for seq in range(count):
+        item = _envelope(f"t{seq}", seq, seq % 3, math.inf if seq % 2 else 60)
+        queue.put(item)
+        if seq % 10 == 0:
+            item.future.cancel()
+    assert len(queue) == count
+
+    queue.close()
+    start = time.perf_counter()
+    drained = []
+    while (item := queue.get()) is not None:
+        drained.append(item)
+    assert time.perf_counter() - start < 2
+    assert len(drained) == count - count // 10
+    assert [item.priority for item in drained] == sorted(item.priority for item in drained)
@@ -0,0 +1,43 @@
+# test_resilience.py
+import threading
+import time
+
+import pytest
+
+from offload_core import peer_health, resilience
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """_attempt بلا شبكة: الجهاز الأول بطيء والبقية سريعة؛ يسجّل كل إرسال"""
+    calls = []
+    lock = threading.Lock()
+
+    def attempt(peer, payload, timeout):
+        with lock:
+            calls.append(peer)
+            first = len(calls) == 1
+        time.sleep(0.5 if first else 0.01)
+        return {"result": peer}
+
+    history = resilience.LatencyHistory()
+    for _ in range(resilience.LatencyHistory.MIN_SAMPLES):
+        history.record("task", 0.01)
+    monkeypatch.setattr(resilience, "_attempt", attempt)
+    monkeypatch.setattr(resilience, "_history", history)
+    monkeypatch.setattr(peer_health, "_health", peer_health.PeerHealth())
+    return calls
+
+
+def test_hedge_never_resends_to_a_peer_already_in_flight(sent):
+    policy = resilience.Policy(attempts=1, hedge=True)
+    peer, response = resilience.call(["10.0.0.1:7520"], {"func": "task"}, policy)
+    assert (peer, response) == ("10.0.0.1:7520", {"result": "10.0.0.1:7520"})
+    assert sent == ["10.0.0.1:7520"]
+
+
+def test_hedge_goes_to_the_next_peer(sent):
+    policy = resilience.Policy(attempts=1, hedge=True)
+    peer, _ = resilience.call(["10.0.0.1:7520", "10.0.0.2:7520"], {"func": "task"}, policy)
+    assert peer == "10.0.0.2:7520"
+    assert sent == ["10.0.0.1:7520", "10.0.0.2:7520"]
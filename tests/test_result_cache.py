@@ -0,0 +1,62 @@
+# test_result_cache.py
+import numpy as np
+
+from offload_core import result_cache, smart_tasks
+from offload_core.result_cache import MISS, ResultCache
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ResultCache(max_entries=2, disk_dir=None)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1          # a أحدث استخداماً من b الآن
+    cache.put("c", 3)
+    assert cache.get("b") is MISS
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_expired_entries_are_misses():
+    cache = ResultCache(disk_dir=None)
+    cache.put("k", "v", ttl=-1)
+    assert cache.get("k") is MISS
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    value = {"primes": [2, 3, 5], "matrix": np.arange(6, dtype=np.float32).reshape(2, 3)}
+    ResultCache(disk_dir=str(tmp_path)).put("key", value)
+
+    fresh = ResultCache(disk_dir=str(tmp_path))
+    got = fresh.get("key")
+    assert got["primes"] == [2, 3, 5]
+    np.testing.assert_array_equal(got["matrix"], value["matrix"])
+    assert fresh.hits["disk"] == 1
+    fresh.get("key")
+    assert fresh.hits["memory"] == 1
+
+
+def test_callers_get_independent_copies():
+    cache = ResultCache(disk_dir=None)
+    value = {"items": [1, 2]}
+    cache.put("k", value)
+    value["items"].append("بعد الحفظ")
+
+    first = cache.get("k")
+    first["items"].append("تعديل مستدعٍ")
+    assert cache.get("k") == {"items": [1, 2]}
+
+
+def test_call_key_follows_the_registered_function(monkeypatch):
+    monkeypatch.setattr(result_cache, "ENABLED", True)
+    by_name = result_cache.key_for_call("prime_calculation", (100,), {})
+    assert by_name is not None
+    assert result_cache.key_for_call(smart_tasks.prime_calculation, (100,), {}) == by_name
+
+    def prime_calculation(n):           # نفس الاسم، دالة أخرى
+        return n
+
+    assert result_cache.key_for_call(prime_calculation, (100,), {}) is None
+
+
+def test_disabled_cache_has_no_keys(monkeypatch):
+    monkeypatch.setattr(result_cache, "ENABLED", False)
+    assert result_cache.key_for_call("prime_calculation", (100,), {}) is None
@@ -0,0 +1,67 @@
+# test_scheduler.py
+import pytest
+
+from offload_core import load_sampler, peer_health
+from offload_core.peer_health import PeerHealth
+from offload_core.scheduler import LOCAL, CostModelScheduler
+
+FAST, SLOW = "10.0.0.1:7520", "10.0.0.2:7520"
+
+
+@pytest.fixture(autouse=True)
+def idle_node(monkeypatch):
+    monkeypatch.setattr(load_sampler, "snapshot", lambda: {"instant": {"cpu": 0.0, "mem": 4096.0}})
+    monkeypatch.setattr(peer_health, "_health", PeerHealth(failures=1, cooldown=60))
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = CostModelScheduler(local_slots=4)
+    scheduler.record(LOCAL, "f", 1.0)
+    scheduler.record(FAST, "f", 0.1, wall=0.11)
+    scheduler.record(SLOW, "f", 0.5, wall=0.51)
+    return scheduler
+
+
+def _order(scheduler, **kwargs):
+    return [choice for _, choice in scheduler.rank("f", [SLOW, FAST], **kwargs)]
+
+
+def test_rank_orders_by_expected_completion(scheduler):
+    assert _order(scheduler) == [FAST, SLOW, LOCAL]
+    assert scheduler.choose("f", [SLOW, FAST]) == FAST
+
+
+def test_unmeasured_peer_borrows_the_average_of_measured_ones(scheduler):
+    assert scheduler.service_time("10.0.0.9:7520", "f") == pytest.approx((1.0 + 0.1 + 0.5) / 3)
+    assert CostModelScheduler().service_time(FAST, "never-run") == 1.0
+
+
+def test_advertised_load_and_inflight_tasks_add_queueing(scheduler):
+    scheduler.advertise(FAST, load=40, slots=2)
+    assert _order(scheduler)[0] == SLOW
+    with scheduler.track(SLOW), scheduler.track(SLOW):
+        assert _order(scheduler)[0] == LOCAL
+
+
+def test_large_payloads_favour_local_execution(scheduler):
+    assert _order(scheduler, payload_bytes=100 * 1024 * 1024)[0] == LOCAL
+
+
+def test_data_locality_favours_the_owner(scheduler):
+    data = {SLOW: 50 * 1024 * 1024}
+    assert _order(scheduler, data=data)[0] == SLOW
+
+
+def test_busy_local_cpu_pushes_work_away(monkeypatch):
+    scheduler = CostModelScheduler(local_slots=4)
+    scheduler.record(LOCAL, "f", 0.05)
+    scheduler.record(FAST, "f", 0.1, wall=0.11)
+    assert scheduler.choose("f", [FAST]) == LOCAL
+    monkeypatch.setattr(load_sampler, "snapshot", lambda: {"instant": {"cpu": 0.95, "mem": 0.0}})
+    assert scheduler.choose("f", [FAST]) == FAST
+
+
+def test_peers_with_an_open_breaker_are_not_candidates(scheduler):
+    peer_health.get_health().failure(FAST, "refused")
+    assert FAST not in _order(scheduler)
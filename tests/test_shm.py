@@ -0,0 +1,45 @@
+# test_shm.py
+import gc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+from offload_core import shm
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = shm.SharedArrayRegistry()
+    monkeypatch.setattr(shm, "_registry", registry)
+    return registry
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        yield pool
+
+
+def test_large_arrays_round_trip_through_shared_memory(registry, pool):
+    data = np.arange(shm.MIN_BYTES // 4, dtype=np.float64)
+    result = shm.submit(pool, np.multiply, (data, 2)).result(timeout=60)
+
+    np.testing.assert_array_equal(result, data * 2)
+    assert registry.stats() == {"blocks": 1}     # كتلة النتيجة وحدها؛ كتلة المدخل حُرّرت
+    del result
+    gc.collect()
+    assert registry.stats() == {"blocks": 0}
+
+
+def test_small_arrays_are_pickled(registry, pool):
+    result = shm.submit(pool, np.negative, (np.ones(8),)).result(timeout=60)
+    assert result.tolist() == [-1.0] * 8
+    assert registry.stats() == {"blocks": 0}
+
+
+def test_worker_errors_release_input_blocks(registry, pool):
+    future = shm.submit(pool, np.reshape, (np.zeros(shm.MIN_BYTES // 4), (3, 3)))
+    with pytest.raises(ValueError):
+        future.result(timeout=60)
+    assert registry.stats() == {"blocks": 0}
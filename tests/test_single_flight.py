@@ -0,0 +1,115 @@
+# test_single_flight.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from offload_core import single_flight, tasks
+
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    monkeypatch.setattr(single_flight, "ENABLED", True)
+
+
+def test_nested_same_key_call_does_not_wait_on_itself():
+    @tasks.mark_deterministic
+    def task(x):
+        # مثل مهمة @offload داخل عامل DistributedExecutor: نفس المفتاح على نفس الخيط
+        return single_flight.do(task, (x,), {}, lambda: x * 2)
+
+    def outer():
+        return single_flight.do(task, (21,), {}, task, 21)
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        assert pool.submit(outer).result(timeout=5) == 42
+
+
+def test_functions_with_the_same_name_are_not_merged():
+    start = threading.Barrier(3)
+
+    def make(factor):
+        def task(x):
+            return x * factor
+        return tasks.mark_deterministic(task)
+
+    def call(func):
+        start.wait(timeout=5)
+        return single_flight.do(func, (5,), {}, lambda: (time.sleep(0.2), func(5))[1])
+
+    funcs = [make(1), make(2), make(3)]
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        assert [f.result(timeout=5) for f in [pool.submit(call, f) for f in funcs]] == [5, 10, 15]
+
+
+def test_identical_concurrent_calls_share_one_execution():
+    start = threading.Barrier(4)
+    runs = []
+
+    @tasks.mark_deterministic
+    def task(x):
+        runs.append(x)
+        time.sleep(0.2)
+        return x + 1
+
+    def call():
+        start.wait(timeout=5)
+        return single_flight.do(task, (1,), {}, task, 1)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        assert [f.result(timeout=5) for f in [pool.submit(call) for _ in range(4)]] == [2] * 4
+    assert runs == [1]
+
+
+def test_arguments_without_canonical_form_are_not_coalesced():
+    class Opaque:
+        def __init__(self, value):
+            self.value = value
+
+        def __repr__(self):
+            return "Opaque()"
+
+    def task(obj):
+        return obj.value
+
+    assert single_flight.flight_key(task, (Opaque(1),)) is None
+    assert single_flight.flight_key(task, (1,)) != single_flight.flight_key(task, (2,))
+
+
+def test_non_deterministic_registered_tasks_are_not_coalesced():
+    assert not single_flight.coalescable("matrix_multiply")
+    assert single_flight.coalescable("prime_calculation")
+
+
+def test_only_declared_deterministic_functions_are_coalesced():
+    from offload_core import smart_tasks
+
+    def prime_calculation(n):   # نفس اسم مهمة مسجّلة حتمية لكنها دالة أخرى
+        return n
+
+    def random_task():
+        return object()
+
+    assert not single_flight.coalescable(prime_calculation)
+    assert not single_flight.coalescable(random_task)
+    assert single_flight.coalescable(smart_tasks.prime_calculation)
+    assert single_flight.coalescable(tasks.mark_deterministic(random_task))
+
+
+def test_undeclared_concurrent_calls_each_run():
+    start = threading.Barrier(3)
+    runs = []
+
+    def task():
+        runs.append(1)
+        time.sleep(0.1)
+        return object()
+
+    def call():
+        start.wait(timeout=5)
+        return single_flight.do(task, (), {}, task)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        results = [f.result(timeout=5) for f in [pool.submit(call) for _ in range(3)]]
+    assert len(runs) == 3 and len({id(r) for r in results}) == 3
@@ -0,0 +1,104 @@
+# test_streaming.py
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from offload_core import http_pool, streaming
+
+
+class SSEResponse:
+    def __init__(self, events):
+        self.lines = "".join(events).split("\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_lines(self, decode_unicode=False):
+        return iter(self.lines)
+
+
+def _serve(monkeypatch, chunks):
+    sent = []
+
+    def post(url, **kwargs):
+        sent.append(kwargs["json"])
+        return SSEResponse(streaming.iter_sse(chunks))
+
+    monkeypatch.setattr(http_pool, "post", post)
+    return sent
+
+
+def test_chunks_arrive_in_order_with_a_summary(monkeypatch):
+    sent = _serve(monkeypatch, ({"done": i, "values": np.arange(i)} for i in range(1, 4)))
+    summary = {}
+    chunks = list(streaming.stream_call("10.0.0.1:7520", "count", (3,), summary=summary))
+
+    assert [c["done"] for c in chunks] == [1, 2, 3]
+    assert chunks[-1]["values"] == [0, 1, 2]
+    assert summary["chunks"] == 3
+    assert sent == [{"func": "count", "args": [3], "kwargs": {}}]
+
+
+def test_server_errors_are_raised_after_earlier_chunks(monkeypatch):
+    def failing():
+        yield 1
+        raise ValueError("عطل في المنتصف")
+
+    _serve(monkeypatch, failing())
+    received = []
+    with pytest.raises(streaming.StreamError, match="عطل في المنتصف"):
+        for chunk in streaming.stream_call("10.0.0.1:7520", "f"):
+            received.append(chunk)
+    assert received == [1]
+
+
+def test_truncated_stream_is_an_error(monkeypatch):
+    monkeypatch.setattr(http_pool, "post", lambda url, **kwargs: SSEResponse([streaming.sse_event("chunk", 1)]))
+    with pytest.raises(streaming.StreamError):
+        list(streaming.stream_call("10.0.0.1:7520", "f"))
+
+
+def test_async_chunks_keep_order_and_propagate_errors():
+    def produce(n, fail=False):
+        yield from range(n)
+        if fail:
+            raise KeyError("x")
+
+    async def collect(*args):
+        return [chunk async for chunk in streaming.aiter_chunks(produce, args, buffer=2)]
+
+    assert asyncio.run(collect(20)) == list(range(20))
+    with pytest.raises(KeyError):
+        asyncio.run(collect(3, True))
+
+
+def test_consumer_stopping_early_closes_the_generator():
+    closed = threading.Event()
+
+    def endless():
+        try:
+            n = 0
+            while True:
+                yield n
+                n += 1
+        finally:
+            closed.set()
+
+    async def take_three():
+        chunks = []
+        async for chunk in streaming.aiter_chunks(endless, buffer=1):
+            chunks.append(chunk)
+            if len(chunks) == 3:
+                break
+        return chunks
+
+    assert asyncio.run(take_three()) == [0, 1, 2]
+    assert closed.wait(2)
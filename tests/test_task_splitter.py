@@ -0,0 +1,110 @@
+# test_task_splitter.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("networkx")
+from offload_core import object_store  # noqa: E402
+from task_splitter import Dep, DagError, TaskSplitter  # noqa: E402
+
+
+class RefExecutor:
+    """منفّذ محلي بواجهة DistributedExecutor: submit و submit_ref (مراجع في مخزن هذه العملية)"""
+
+    def __init__(self):
+        self.pool = ThreadPoolExecutor(max_workers=4)
+        self.order = []
+        self.released = []
+        self._lock = threading.Lock()
+
+    def _call(self, func, args, kwargs, keep):
+        args, kwargs = object_store.resolve([list(args), kwargs])
+        result = func(*args, **kwargs)
+        with self._lock:
+            self.order.append(func.__name__)
+        if keep:
+            return object_store.keep(result, on_drop=lambda: self.released.append(func.__name__))
+        return result
+
+    def submit(self, func, *args, **kwargs):
+        return self.pool.submit(self._call, func, args, kwargs, False)
+
+    def submit_ref(self, func, *args, **kwargs):
+        return self.pool.submit(self._call, func, args, kwargs, True)
+
+
+def load():
+    return [1, 2, 3]
+
+
+def double(xs):
+    return [2 * x for x in xs]
+
+
+def square(xs):
+    return [x * x for x in xs]
+
+
+def combine(a, b):
+    return sum(a) + sum(b)
+
+
+def _diamond():
+    splitter = TaskSplitter()
+    splitter.add_task("load", {"func": load})
+    splitter.add_task("double", {"func": double, "args": [Dep("load")]})
+    splitter.add_task("square", {"func": square, "args": [Dep("load")]})
+    splitter.add_task("combine", {"func": combine, "args": [Dep("double"), Dep("square")]})
+    return splitter
+
+
+def test_tasks_run_after_their_dependencies():
+    executor = RefExecutor()
+    results = _diamond().run(executor, timeout=5)
+
+    assert results == {"combine": 12 + 14}
+    assert executor.order[0] == "load" and executor.order[-1] == "combine"
+
+
+def test_intermediate_refs_are_released_once_consumed():
+    executor = RefExecutor()
+    _diamond().run(executor, timeout=5)
+    assert sorted(executor.released) == ["double", "load", "square"]
+
+
+def test_without_kept_intermediates_all_results_are_returned():
+    results = _diamond().run(RefExecutor(), timeout=5, keep_intermediates=False)
+    assert results["load"] == [1, 2, 3] and results["combine"] == 26
+
+
+def test_failure_releases_kept_results():
+    def broken(xs):
+        raise ValueError("عطل")
+
+    executor = RefExecutor()
+    splitter = TaskSplitter()
+    splitter.add_task("load", {"func": load})
+    splitter.add_task("broken", {"func": broken, "args": [Dep("load")]})
+    splitter.add_task("double", {"func": double, "args": [Dep("load")]})
+    with pytest.raises(DagError) as info:
+        splitter.run(executor, timeout=5)
+    assert info.value.task_id == "broken"
+    executor.pool.shutdown(wait=True)
+    assert "load" in executor.released
+
+
+def test_timeout_covers_the_whole_graph():
+    def slow(*_):
+        time.sleep(0.3)
+        return 1
+
+    splitter = TaskSplitter()
+    splitter.add_task("a", {"func": slow})
+    splitter.add_task("b", {"func": slow, "args": [Dep("a")]})
+    splitter.add_task("c", {"func": slow, "args": [Dep("b")]})
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        splitter.run(RefExecutor(), timeout=0.5)
+    assert time.monotonic() - start < 0.8
@@ -0,0 +1,56 @@
+# test_tasks.py
+import pytest
+
+from offload_core import smart_tasks, tasks
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(tasks, "REGISTRY", dict(tasks.REGISTRY))
+    return tasks.REGISTRY
+
+
+def test_builtin_tasks_are_registered_by_kind():
+    assert tasks.get("prime_calculation").kind == "cpu"
+    assert tasks.get("render_3d_scene").kind == "io"
+    assert tasks.get("matrix_multiply").resource == "memory"
+    assert tasks.get("prime_calculation_stream").streaming
+
+
+def test_register_as_decorator(registry):
+    @tasks.register(kind="io", name="echo", max_concurrency=2)
+    def echo(x):
+        return x
+
+    spec = registry["echo"]
+    assert spec.func is echo and spec.resource == "io" and spec.max_concurrency == 2
+    assert not spec.cpu_bound and not spec.deterministic
+
+
+def test_inline_tasks_hold_no_resource_slots(registry):
+    tasks.register(lambda: 1, name="tiny", kind="inline")
+    assert registry["tiny"].resource is None
+
+
+@pytest.mark.parametrize("meta", [{"kind": "gpu"}, {"resource": "disk"}])
+def test_unknown_kind_or_resource_is_rejected(registry, meta):
+    with pytest.raises(ValueError):
+        tasks.register(lambda: 1, name="bad", **meta)
+
+
+def test_spec_for_matches_only_the_registered_function():
+    assert tasks.spec_for("prime_calculation") is tasks.get("prime_calculation")
+    assert tasks.spec_for(smart_tasks.prime_calculation) is tasks.get("prime_calculation")
+
+    def prime_calculation(n):
+        return n
+
+    assert tasks.spec_for(prime_calculation) is None
+    assert not tasks.is_deterministic(prime_calculation)
+    assert tasks.is_deterministic(tasks.mark_deterministic(prime_calculation))
+
+
+def test_dispatch_runs_the_registered_function():
+    assert tasks.dispatch({"func": "prime_count", "args": [100]})["result"]["count"] == 25
+    with pytest.raises(KeyError):
+        tasks.dispatch({"func": "missing"})
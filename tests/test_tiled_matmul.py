@@ -0,0 +1,42 @@
+# test_tiled_matmul.py
+import os
+
+import numpy as np
+
+from offload_core import object_store, tiled_matmul
+
+
+def test_tiled_product_matches_dense(tmp_path):
+    rng = np.random.default_rng(0)
+    a, b = rng.random((70, 50)), rng.random((50, 90))
+    out = tiled_matmul.create((70, 90), path=str(tmp_path / "c.bin"))
+    result = tiled_matmul.multiply(a, b, out=out, tile=16, local_workers=2)
+    np.testing.assert_allclose(result, a @ b)
+
+
+def _file_result(tmp_path):
+    matrix = tiled_matmul.random_matrix(40, tile=16, path=str(tmp_path / "m.bin"), seed=1)
+    expected = np.array(matrix)
+    return {"result": tiled_matmul.file_result(matrix), "shape": [40, 40]}, expected
+
+
+def test_adopted_result_is_a_ref_that_deletes_its_file_on_release(tmp_path):
+    result, expected = _file_result(tmp_path)
+    path = result["result"][tiled_matmul.FILE_KEY]
+
+    adopted = tiled_matmul.adopt(result, owner="10.0.0.1:7520")
+    ref = adopted["result"]
+    assert object_store.is_ref(ref) and ref["owner"] == "10.0.0.1:7520"
+    assert path not in repr(adopted)
+    np.testing.assert_array_equal(object_store.get_store().get(ref[object_store.REF_KEY]), expected)
+
+    assert object_store.get_store().delete(ref[object_store.REF_KEY])
+    assert not os.path.exists(path)
+
+
+def test_adopt_without_object_store_returns_array_and_removes_file(tmp_path):
+    result, expected = _file_result(tmp_path)
+    path = result["result"][tiled_matmul.FILE_KEY]
+    adopted = tiled_matmul.adopt(result)
+    np.testing.assert_array_equal(adopted["result"], expected)
+    assert not os.path.exists(path)
@@ -0,0 +1,66 @@
+# test_wire.py
+import json
+
+import numpy as np
+import pytest
+import requests
+
+from offload_core import http_pool, wire
+
+
+def _response(status, body, content_type=wire.JSON_TYPE):
+    response = requests.Response()
+    response.status_code = status
+    response._content = body
+    response.headers["Content-Type"] = content_type
+    return response
+
+
+@pytest.fixture
+def json_only_peer(monkeypatch):
+    """طرف مثل Flask get_json(force=True): 400 لما ليس JSON"""
+    sent = []
+
+    def post(url, data=None, headers=None, **kwargs):
+        sent.append(headers.get("Content-Type", wire.JSON_TYPE))
+        if data is not None:
+            return _response(400, b'{"error": "bad request"}')
+        matrix = kwargs["json"]["args"][0]
+        return _response(200, json.dumps({"result": sum(map(sum, matrix))}).encode())
+
+    monkeypatch.setattr(http_pool, "post", post)
+    monkeypatch.setattr(wire, "_json_only", set())
+    return sent
+
+
+def test_round_trip_keeps_arrays():
+    payload = {"func": "f", "args": [np.arange(6, dtype=np.float32).reshape(2, 3)], "kwargs": {"n": 1}}
+    decoded = wire.loads(wire.dumps(payload))
+    np.testing.assert_array_equal(decoded["args"][0], payload["args"][0])
+    assert decoded["kwargs"] == {"n": 1}
+
+
+def test_frame_rejected_with_400_falls_back_to_json(json_only_peer):
+    payload = {"func": "f", "args": [np.ones((2, 2))], "kwargs": {}}
+    assert wire.post("http://10.0.0.1:7520/run", payload) == {"result": 4.0}
+    assert json_only_peer == [wire.CONTENT_TYPE, wire.JSON_TYPE]
+
+    # بعد ذلك يُرسل JSON مباشرة إلى نفس الجهاز
+    assert wire.post("http://10.0.0.1:7520/run", payload) == {"result": 4.0}
+    assert json_only_peer[2:] == [wire.JSON_TYPE]
+
+
+def test_decoded_arrays_are_writable_and_private():
+    frame = wire.dumps({"a": np.zeros(4), "b": np.ones((2, 2), dtype=np.int32)})
+    first = wire.loads(frame)
+    first["a"][0] = 7
+    first["b"] += 1
+    second = wire.loads(frame)
+    assert second["a"][0] == 0 and second["b"].sum() == 4
+
+
+def test_writable_buffers_are_decoded_without_a_copy():
+    frame = bytearray(wire.dumps({"a": np.arange(3, dtype=np.float64)}))
+    decoded = wire.loads(frame)
+    decoded["a"][:] = 0
+    assert wire.loads(frame)["a"].tolist() == [0, 0, 0]
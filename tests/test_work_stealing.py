@@ -0,0 +1,35 @@
+# test_work_stealing.py
+import pytest
+
+from offload_core import admission, work_stealing
+
+
+@pytest.fixture
+def txt(monkeypatch):
+    """خصائص TXT كما تصل إلى الأجهزة الأخرى من الخدمة المسجّلة"""
+    records = {}
+    monkeypatch.setattr(admission, "_advertisers", [])
+    admission.register_advertiser(lambda **p: records.update({k: str(v) for k, v in p.items()}) or True)
+    return records
+
+
+def _peer(key, records):
+    # كما يقرأ peer_table خصائص الجهاز
+    return {"key": key, "compatible": True, "queued": int(float(records.get("queued", 0)))}
+
+
+def test_queued_tasks_are_advertised_and_make_the_node_a_victim(txt):
+    idle = {"cpu": (0, 0, 4)}
+    assert admission.publish(admission.advertisement(idle, slots=4, queued=0))
+    assert work_stealing.victims([_peer("10.0.0.1:7520", txt)]) == []
+
+    assert admission.publish(admission.advertisement({"cpu": (4, 3, 4)}, slots=0, queued=3))
+    assert work_stealing.victims([_peer("10.0.0.1:7520", txt)]) == ["10.0.0.1:7520"]
+
+
+def test_victims_longest_queue_first_excluding_self():
+    peers = [{"key": "a:7520", "compatible": True, "queued": 1},
+             {"key": "b:7520", "compatible": True, "queued": 5},
+             {"key": "c:7520", "compatible": False, "queued": 9},
+             {"key": "me:7520", "compatible": True, "queued": 7}]
+    assert work_stealing.victims(peers, exclude={"me:7520"}) == ["b:7520", "a:7520"]
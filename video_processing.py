@@ -7,6 +7,7 @@ import logging
 from functools import wraps
 from processor_manager import should_offload
 from remote_executor import execute_remotely
+from offload_core import complexity, priority
 
 logging.basicConfig(level=logging.INFO)
 
@@ -14,29 +15,34 @@ def video_offload(func):
     """ديكوراتور خاص بمعالجة الفيديو"""
     @wraps(func)
     def wrapper(*args, **kwargs):
-        complexity = estimate_video_complexity(func, args, kwargs)
+        estimate = complexity.estimate(func.__name__, args, kwargs, default=50)
         
-        if complexity > 80 or should_offload(complexity):
+        if complexity.is_heavy(estimate, 80) or should_offload():
             logging.info(f"📹 إرسال مهمة الفيديو {func.__name__} للمعالجة الموزعة")
             return execute_remotely(func.__name__, args, kwargs)
         
         logging.info(f"📹 معالجة الفيديو محلياً: {func.__name__}")
-        return func(*args, **kwargs)
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        complexity.observe(func.__name__, estimate["work"], time.perf_counter() - start)
+        return result
     return wrapper
 
-def estimate_video_complexity(func, args, kwargs):
-    """تقدير تعقيد معالجة الفيديو"""
-    if func.__name__ == "video_format_conversion":
-        return args[0] * args[1] / 1000  # الطول × الجودة
-    elif func.__name__ == "video_effects_processing":
-        return args[1] * 15  # عدد التأثيرات × 15
-    elif func.__name__ == "video_compression":
-        return args[0] / 5  # حجم الملف / 5
-    elif func.__name__ == "render_3d_scene":
-        return args[0] * args[1] / 100  # عدد الكائنات × دقة الصورة
-    elif func.__name__ == "physics_simulation":
-        return args[0] * args[1] / 50  # عدد الكائنات × الإطارات
-    return 50  # قيمة افتراضية متوسطة
+# دوال الكلفة (وحدات عمل) لمهام الفيديو؛ المهام غير المعلنة تأخذ 50
+complexity.register_cost("video_format_conversion",
+                         lambda duration_seconds, quality_level, *a, **k: duration_seconds * quality_level / 1000)
+complexity.register_cost("video_effects_processing",
+                         lambda video_length, effects_count, *a, **k: effects_count * 15)
+complexity.register_cost("video_compression", lambda file_size_mb, *a, **k: file_size_mb / 5)
+complexity.register_cost("render_3d_scene",
+                         lambda objects_count, resolution_width, *a, **k: objects_count * resolution_width / 100)
+complexity.register_cost("physics_simulation",
+                         lambda objects_count, frames_count, *a, **k: objects_count * frames_count / 50)
+
+# معالجة الملفات والمشاهد أعمال خلفية (batch) تفسح الطريق للمهام التفاعلية
+for _name in ("video_format_conversion", "video_effects_processing", "video_compression",
+              "render_3d_scene", "physics_simulation"):
+    priority.register_class(_name, priority.BATCH)
 
 @video_offload
 def video_format_conversion(duration_seconds, quality_level, input_format="mp4", output_format="avi"):
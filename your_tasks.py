@@ -40,13 +40,8 @@ def data_processing(size):
     time.sleep(size / 10000)  # محاكاة معالجة
     return {"processed": size, "status": "completed"}
 
-@offload
-def matrix_multiply(size):
-    """ضرب المصفوفات"""
-    import numpy as np
-    A = np.random.rand(size, size)
-    B = np.random.rand(size, size)
-    return np.dot(A, B)
+# ضرب المصفوفات (بالبلاطات وعلى القرص عندما لا يتسع للذاكرة)
+from offload_lib import matrix_multiply
 
 @offload
 def prime_calculation(n):